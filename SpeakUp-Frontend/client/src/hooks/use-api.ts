@@ -89,10 +89,13 @@ export function useAptitudeHistory(userId: string) {
   });
 }
 
-export function useAptitudeQuestions(topic: string, count: number = 20, aiPowered: boolean = false) {
+export function useAptitudeQuestions(topic: string, count: number = 20, aiPowered: boolean = false, userId?: string) {
   return useQuery({
-    queryKey: ['aptitude', 'questions', topic, count, aiPowered],
-    queryFn: () => apiCall<AptitudeQuestionsResponse>(`/api/aptitude/questions/${topic}?count=${count}&ai_powered=${aiPowered}`),
+    queryKey: ['aptitude', 'questions', topic, count, aiPowered, userId],
+    // userId lets AI mode skip questions this user has already been served
+    queryFn: () => apiCall<AptitudeQuestionsResponse>(
+      `/api/aptitude/questions/${topic}?count=${count}&ai_powered=${aiPowered}${userId ? `&userId=${encodeURIComponent(userId)}` : ""}`
+    ),
     enabled: !!topic,
   });
 }
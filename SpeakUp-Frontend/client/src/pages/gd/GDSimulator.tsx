@@ -113,6 +113,15 @@ export default function GDSimulator() {
 
   const handleStartDiscussion = () => {
     setPhase('discussion');
+    if (sessionId) {
+        // Start the server clock now rather than when prep would have run out
+        sendMessage.mutateAsync({
+            sessionId,
+            userId: user?.uid || "",
+            message: "",
+            action: "start"
+        }).then(res => setTimeLeft(res.timeRemaining)).catch(err => console.error(err));
+    }
     setChats([
         { 
             speaker: "Moderator", 
@@ -285,6 +294,18 @@ export default function GDSimulator() {
         }
     } else {
         setIsPaused(false);
+        try {
+            // The server clock stands still until it hears we are back
+            const res = await sendMessage.mutateAsync({
+                sessionId,
+                userId: user?.uid || "",
+                message: "",
+                action: "resume"
+            });
+            setTimeLeft(res.timeRemaining);
+        } catch(err) {
+            console.error(err);
+        }
     }
   };
 
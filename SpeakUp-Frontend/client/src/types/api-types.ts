@@ -76,7 +76,7 @@ export interface GDMessageRequest {
   sessionId: string;
   userId: string;
   message: string;
-  action?: "speak" | "pause" | "conclude" | "silence_break";
+  action?: "speak" | "pause" | "resume" | "start" | "conclude" | "silence_break";
 }
 
 export interface GDMessageResponse {
@@ -89,9 +89,12 @@ export interface GDMessageResponse {
   timeRemaining: number;
   canConclude: boolean;
   turnCounts: Record<string, number>;
-  status?: string; // for pause
+  status?: string; // for pause / resume / start
   pauseCount?: number;
   shouldEndSession?: boolean;
+  phase?: "prep" | "discussion" | "conclusion" | "ended";
+  deadline?: number | null; // epoch seconds, null while paused
+  paused?: boolean;
 }
 
 export interface GDFeedbackRequest {
@@ -140,12 +143,12 @@ export interface GDEndResponse {
 }
 
 export interface AptitudeQuestionsResponse {
+  sessionId: string; // Pass back to /api/aptitude/submit
   topic: string;
   questions: {
     id: number;
     question: string; // "q" in mock
     options: string[];
-    correctAnswer: number; // "correct" in mock
     difficulty: string;
   }[];
 }
@@ -204,15 +207,8 @@ export interface CompletionMetrics {
 }
 
 export interface SubmitAptitudeReq {
+  sessionId: string;
   userId: string;
-  topic: string;
-  questions: {
-    id?: number;
-    question: string;
-    options: string[];
-    correctAnswer: number;
-    explanation?: string;
-  }[];
   answers: (number | null)[];
   timeTaken: number;
 }
@@ -1,10 +1,13 @@
 import os
-import requests
+import json
+import asyncio
+import httpx
 from typing import List, Optional, Dict
 from datetime import datetime
-from fastapi import FastAPI, APIRouter, UploadFile, File, Form, HTTPException, Depends, Header
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, UploadFile, File, Form, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -17,12 +20,34 @@ from models import (
 )
 from services import (
     interview_service, gd_service, resume_service, 
-    aptitude_service, dashboard_service, auth_service
+    aptitude_service, dashboard_service, auth_service, llm_client, background,
+    metrics, session_store, gd_events, question_bank
 )
+from services.session_backends import SessionConflict
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-generate generic interview question sets off the request path
+    interview_service.warm_question_pools()
+    gd_service.warm_opening_statements()
+    question_bank.load_bank()
+    question_bank.start_watcher()
+    aptitude_service.warm_ai_question_pools()
+    session_store.start_sweeper()
+    yield
+    # Stop background work, then release pooled upstream connections
+    await background.cancel_all()
+    await llm_client.aclose()
+    await session_store.close_all()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(SessionConflict)
+async def session_conflict_handler(request: Request, exc: SessionConflict):
+    # Another request updated the session first; the client can simply retry
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
 
 # CORS
 app.add_middleware(
@@ -59,6 +84,13 @@ async def get_current_user(authorization: str = Header(None)):
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Authentication failed: {str(e)}")
 
+# ---------- SERVER-SENT EVENTS ----------
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 # ---------- REQUEST MODELS ----------
 class StartInterviewReq(BaseModel):
     userId: str  # Firebase UID
@@ -151,12 +183,14 @@ class SaveAptitudeReq(BaseModel):
     timeTaken: int
 
 class SubmitAptitudeReq(BaseModel):
+    sessionId: str  # From GET /aptitude/questions
     userId: str  # Firebase UID
-    topic: str
-    questions: List[dict]
     answers: List[Optional[int]]  # Array of selected option indices (or None for unanswered)
     timeTaken: int
 
+class BulkSubmitAptitudeReq(BaseModel):
+    submissions: List[SubmitAptitudeReq]
+
 class SaveResumeReq(BaseModel):
     userId: str  # Firebase UID
     atsScore: int
@@ -223,24 +257,25 @@ async def update_user(uid: str, req: UpdateUserReq, current_user: dict = Depends
 
 # --- INTERVIEW ---
 @interview_router.post("/start")
-def start_interview(req: StartInterviewReq):
-    result = interview_service.start_new_session(
+async def start_interview(req: StartInterviewReq):
+    result = await interview_service.start_new_session(
         req.userId, 
         req.interviewType, 
         req.difficulty, 
         req.mode, 
-        req.resumeData
+        jobRole=req.jobRole,
+        resumeData=req.resumeData
     )
     if not result:
         raise HTTPException(status_code=500, detail="Failed to start interview session")
     return result
 
 @interview_router.post("/message")
-def interview_message(req: MessageInterviewReq):
+async def interview_message(req: MessageInterviewReq):
     if req.action == "greet":
-        result = interview_service.process_greeting(req.sessionId, req.message)
+        result = await interview_service.process_greeting(req.sessionId, req.message)
     elif req.action == "answer":
-        result = interview_service.process_answer(req.sessionId, req.message)
+        result = await interview_service.process_answer(req.sessionId, req.message)
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
     
@@ -249,15 +284,23 @@ def interview_message(req: MessageInterviewReq):
     return result
 
 @interview_router.post("/end")
-def end_interview(req: EndInterviewReq):
-    result = interview_service.end_interview(req.sessionId, req.userId)
+async def end_interview(req: EndInterviewReq):
+    result = await interview_service.end_interview(req.sessionId, req.userId)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
 
+@interview_router.post("/end/stream")
+async def end_interview_stream(req: EndInterviewReq):
+    """Server-sent events variant of /end: feedback, metrics and breakdown items as they are generated"""
+    async def events():
+        async for event, data in interview_service.stream_end_interview(req.sessionId, req.userId):
+            yield sse_event(event, data)
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @interview_router.post("/teach-me")
-def teach_me(req: TeachMeReq):
-    result = interview_service.get_teach_me(req.questionId, req.questionText, req.userAnswer)
+async def teach_me(req: TeachMeReq):
+    result = await interview_service.get_teach_me(req.questionId, req.questionText, req.userAnswer)
     if not result:
         raise HTTPException(status_code=500, detail="Failed to generate explanation")
     return result
@@ -274,29 +317,42 @@ async def get_interview_history(userId: str, current_user: dict = Depends(get_cu
 
 # --- GD ---
 @gd_router.post("/start")
-def start_gd(req: StartGdReq):
-    result = gd_service.start_gd_session(req.userId, req.topic, req.difficulty, req.duration)
+async def start_gd(req: StartGdReq):
+    result = await gd_service.start_gd_session(req.userId, req.topic, req.difficulty, req.duration)
     if not result:
         raise HTTPException(status_code=500, detail="Failed to start GD session")
     return result
 
 @gd_router.post("/message")
-def gd_message(req: GdMessageReq):
-    result = gd_service.process_message(req.sessionId, req.userId, req.message, req.action)
+async def gd_message(req: GdMessageReq):
+    result = await gd_service.process_message(req.sessionId, req.userId, req.message, req.action)
     if result is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return result
 
+@gd_router.get("/{sessionId}/events")
+async def gd_events_stream(sessionId: str):
+    """Server-sent events for a GD session: each bot message (and its tokens) as it is generated"""
+    if await gd_service.GD_SESSIONS.get(sessionId) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    async def events():
+        async for event, data in gd_events.subscribe(sessionId):
+            if event == "keepalive":
+                yield ": keepalive\n\n"
+            else:
+                yield sse_event(event, data)
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @gd_router.post("/feedback")
-def gd_feedback(req: GdFeedbackReq):
-    result = gd_service.generate_gd_feedback(req.sessionId, req.userId)
+async def gd_feedback(req: GdFeedbackReq):
+    result = await gd_service.generate_gd_feedback(req.sessionId, req.userId)
     if result is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return result
 
 @gd_router.post("/end")
-def gd_end(req: GdEndReq):
-    result = gd_service.generate_gd_end_summary(req.sessionId, req.userId, req.userMessages)
+async def gd_end(req: GdEndReq):
+    result = await gd_service.generate_gd_end_summary(req.sessionId, req.userId, req.userMessages)
     if result is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return result
@@ -315,54 +371,46 @@ async def get_gd_history(userId: str, current_user: dict = Depends(get_current_u
 
 # --- APTITUDE ---
 @aptitude_router.get("/questions/{topic}")
-def get_aptitude_questions(topic: str, count: int = 20, ai_powered: bool = False):
+async def get_aptitude_questions(topic: str, count: int = 20, ai_powered: bool = False, userId: Optional[str] = None):
     """
-    Get aptitude questions
-    - Regular mode: returns 'count' random questions (15-30) with shuffled options
-    - AI mode: generates 3 hard questions via GPT-4.0 Mini
+    Start an aptitude test: returns a sessionId and the questions (without answers)
+    - Regular mode: 'count' random questions (15-30) with shuffled options
+    - AI mode: 3 hard GPT-4.0 Mini questions from the pre-generated pool, none the user (if given) has seen
     """
-    if ai_powered:
-        questions = aptitude_service.get_ai_powered_questions(topic)
-    else:
-        questions = aptitude_service.get_random_questions(topic, count)
-    
-    return {"topic": topic, "questions": questions}
-
-# Global processing locks for idempotency
-APTITUDE_PROCESSING = {} # userId_topic -> timestamp
+    if not aptitude_service.has_topic(topic):
+        raise HTTPException(status_code=404, detail=f"Unknown aptitude topic: {topic}")
+    return await aptitude_service.start_test(topic, count, ai_powered, userId)
 
 @aptitude_router.post("/submit")
-def submit_aptitude_test(req: SubmitAptitudeReq):
-    # IDEMPOTENCY CHECK
-    lock_key = f"{req.userId}_{req.topic}"
-    import time
-    current_time = time.time()
-    
-    # Check if this test is currently being processed (within last 10s)
-    if lock_key in APTITUDE_PROCESSING:
-        last_process_time = APTITUDE_PROCESSING[lock_key]
-        if current_time - last_process_time < 10: # 10 second lockout
-            print(f"⚠️ Aptitude {req.topic} already submitting. Rejecting duplicate.")
-            # Unlike resume, we might want to return the previous result if we had it,
-            # but for now, preventing the double database write is the priority.
-            # Frontend should handle the error gracefully or we can return a 202.
-            raise HTTPException(status_code=429, detail="Submission already in progress.")
-            
-    # Set lock
-    APTITUDE_PROCESSING[lock_key] = current_time
-
+async def submit_aptitude_test(req: SubmitAptitudeReq):
     """
     Submit aptitude test answers and get comprehensive results
+    - IDEMPOTENCY: the session is claimed before grading (on any worker); while
+      it is being graded a duplicate gets 429, afterwards the stored result
     """
-    result = aptitude_service.submit_test(
+    result = await aptitude_service.submit_test(
         userId=req.userId,
-        topic=req.topic,
-        questions=req.questions,
+        sessionId=req.sessionId,
         answers=req.answers,
         timeTaken=req.timeTaken
     )
+    if "error" in result:
+        if result.get("status") == 429:
+            print(f"⚠️ Aptitude session {req.sessionId} already submitting. Rejecting duplicate.")
+        raise HTTPException(status_code=result.get("status", 404), detail=result["error"])
     return result
 
+@aptitude_router.post("/submit/bulk")
+async def submit_aptitude_bulk(req: BulkSubmitAptitudeReq):
+    """
+    Grade a batch of proctored submissions in one pass
+    - Each submission is graded against its own test session, like /submit
+    - Returns per-submission summaries, per-question accuracy and throughput
+    """
+    if len(req.submissions) > aptitude_service.APTITUDE_BULK_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {aptitude_service.APTITUDE_BULK_MAX} submissions per request")
+    return await aptitude_service.submit_bulk([s.model_dump() for s in req.submissions])
+
 @aptitude_router.post("")
 def save_aptitude(req: SaveAptitudeReq):
     res = AptitudeResult(**req.model_dump())
@@ -404,7 +452,7 @@ async def upload_resume(userId: str = Form(...), file: UploadFile = File(...)):
                 print(f"⚠️ Resume {file.filename} already analyzed recently. Returning existing result.")
                 return data
     
-    result = resume_service.analyze_resume_content(content)
+    result = await resume_service.analyze_resume_content(content)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     
@@ -499,16 +547,17 @@ app.include_router(resume_router, prefix="/api")
 app.include_router(dashboard_router, prefix="/api")
 app.include_router(ai_router, prefix="/api")
 
+# ---------- OPERATIONAL METRICS ----------
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return metrics.render()
+
 
 # ---------- EXISTING AZURE INTEGRATIONS (PRESERVED) ----------
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
 GPT_MINI_MODEL = os.getenv("GPT_MINI_MODEL")
 GPT_FULL_MODEL = os.getenv("GPT_FULL_MODEL")
 SPEECH_KEY = os.getenv("SPEECH_KEY")
 SPEECH_REGION = os.getenv("SPEECH_REGION")
-DOC_KEY = os.getenv("DOC_KEY")
-DOC_ENDPOINT = os.getenv("DOC_ENDPOINT")
 
 @app.get("/")
 def root():
@@ -520,24 +569,49 @@ class SimpleChatReq(BaseModel):
 class TtsReq(BaseModel):
     text: str
 
+# Seconds between client-disconnect checks while an upstream call is in flight
+DISCONNECT_POLL_INTERVAL = 0.5
+
+async def run_until_disconnect(request: Request, coro):
+    """
+    Await an upstream coroutine, cancelling it if the client goes away first,
+    so abandoned requests stop consuming upstream capacity.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                print(f"⚠️ Client disconnected from {request.url.path}. Upstream call cancelled.")
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def passthrough_chat(request: Request, model: str, message: str):
+    """Forward a single-message chat completion and return Azure's raw JSON"""
+    # Through the shared client: interactive dispatch slot plus the model's retry policy.
+    # Azure's default temperature, as before when the body carried none
+    result = await run_until_disconnect(request, llm_client.aget_gpt_response(
+        [{"role": "user", "content": message}], model=model, max_tokens=None, temperature=1.0, priority="interactive"
+    ))
+    if result is None:
+        raise HTTPException(status_code=502, detail="Azure OpenAI request failed")
+    return result
+
 @app.post("/chat-mini")
-async def chat_mini(req: SimpleChatReq):
-    url = f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
-    headers = {"api-key": AZURE_OPENAI_KEY, "Content-Type": "application/json"}
-    body = {"model": GPT_MINI_MODEL, "messages": [{"role": "user", "content": req.message}]}
-    r = requests.post(url, headers=headers, json=body)
-    return r.json()
+async def chat_mini(req: SimpleChatReq, request: Request):
+    return await passthrough_chat(request, GPT_MINI_MODEL, req.message)
 
 @app.post("/chat-full")
-async def chat_full(req: SimpleChatReq):
-    url = f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
-    headers = {"api-key": AZURE_OPENAI_KEY, "Content-Type": "application/json"}
-    body = {"model": GPT_FULL_MODEL, "messages": [{"role": "user", "content": req.message}]}
-    r = requests.post(url, headers=headers, json=body)
-    return r.json()
+async def chat_full(req: SimpleChatReq, request: Request):
+    return await passthrough_chat(request, GPT_FULL_MODEL, req.message)
 
 @app.post("/stt")
-async def speech_to_text(audio: UploadFile = File(...)):
+async def speech_to_text(request: Request, audio: UploadFile = File(...)):
     url = f"https://{SPEECH_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language=en-US"
     headers = {
         "Ocp-Apim-Subscription-Key": SPEECH_KEY,
@@ -545,14 +619,16 @@ async def speech_to_text(audio: UploadFile = File(...)):
         "Accept": "application/json"
     }
     audio_bytes = await audio.read()
-    resp = requests.post(url, headers=headers, data=audio_bytes)
+    client = llm_client.get_async_client()
+    try:
+        resp = await run_until_disconnect(request, client.post(url, headers=headers, content=audio_bytes, timeout=30))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Speech request failed: {str(e) or type(e).__name__}")
     try:
         return resp.json()
-    except:
+    except ValueError:
         return {"status": resp.status_code, "text": resp.text}
 
-from io import BytesIO
-
 @app.post("/tts")
 async def text_to_speech(req: TtsReq):
     url = f"https://{SPEECH_REGION}.tts.speech.microsoft.com/cognitiveservices/v1"
@@ -562,24 +638,28 @@ async def text_to_speech(req: TtsReq):
         "X-Microsoft-OutputFormat": "audio-16khz-32kbitrate-mono-mp3"
     }
     ssml = f"<speak version='1.0' xml:lang='en-US'><voice xml:lang='en-US' name='en-US-JennyNeural'>{req.text}</voice></speak>"
-    resp = requests.post(url, headers=headers, data=ssml.encode("utf-8"))
-    return StreamingResponse(BytesIO(resp.content), media_type="audio/mpeg")
+    
+    async def audio_stream():
+        # Relay audio chunks as they arrive; Starlette stops iterating (and closes
+        # the upstream stream) when the client disconnects.
+        client = llm_client.get_async_client()
+        async with client.stream("POST", url, headers=headers, content=ssml.encode("utf-8"), timeout=30) as resp:
+            async for chunk in resp.aiter_bytes():
+                yield chunk
+    
+    return StreamingResponse(audio_stream(), media_type="audio/mpeg")
 
 @app.post("/resume")
-async def resume_extract(file: UploadFile = File(...)):
-    submit_url = f"{DOC_ENDPOINT}/documentintelligence/documentModels/prebuilt-read:analyze?api-version=2024-02-29-preview"
-    headers = {"Ocp-Apim-Subscription-Key": DOC_KEY, "Content-Type": "application/pdf"}
+async def resume_extract(request: Request, file: UploadFile = File(...)):
     data = await file.read()
-    resp = requests.post(submit_url, headers=headers, data=data)
-    if resp.status_code != 202:
-        return {"status": resp.status_code, "response": resp.text}
-    operation_url = resp.headers["Operation-Location"]
-    import time
-    while True:
-        result = requests.get(operation_url, headers={"Ocp-Apim-Subscription-Key": DOC_KEY})
-        result_json = result.json()
-        status = result_json["status"]
-        if status in ["succeeded", "failed"]:
-            break
-        time.sleep(1)
-    return result_json
+    
+    async def extract():
+        resp = await resume_service.submit_document(data)
+        if resp.status_code != 202:
+            return {"status": resp.status_code, "response": resp.text}
+        return await resume_service.poll_document_analysis(resp.headers["Operation-Location"])
+    
+    try:
+        return await run_until_disconnect(request, extract())
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Document Intelligence request failed: {str(e) or type(e).__name__}")
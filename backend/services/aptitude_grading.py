@@ -0,0 +1,73 @@
+import numpy as np
+from typing import List, Optional, Sequence
+
+# Answer codes in the answer matrix (real answers are option indices >= 0)
+UNANSWERED = -1
+INVALID = -2
+
+
+class Grades:
+    """
+    Grading of N submissions of up to Q questions each. Row i covers
+    submission i; cells outside its own questions (valid == False) are
+    padding and belong to no mask.
+    """
+    def __init__(self, answers: np.ndarray, key: np.ndarray, valid: np.ndarray):
+        self.valid = valid
+        self.unanswered = valid & (answers == UNANSWERED)
+        self.correct = valid & (answers == key)
+        self.incorrect = valid & ~self.correct & ~self.unanswered
+        self.total = valid.sum(axis=1)
+        self.correct_count = self.correct.sum(axis=1)
+        self.incorrect_count = self.incorrect.sum(axis=1)
+        self.unanswered_count = self.unanswered.sum(axis=1)
+        # Same arithmetic as round((x / total) * 100) on Python floats (both round half to even)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.score = np.where(self.total > 0, np.round(self.correct_count / self.total * 100), 0).astype(int)
+            self.completion = np.where(
+                self.total > 0, np.round((self.total - self.unanswered_count) / self.total * 100), 0
+            ).astype(int)
+
+    def statuses(self, row: int) -> List[str]:
+        """Per-question status of one submission, in served order"""
+        count = int(self.total[row])
+        status = np.where(self.correct[row, :count], "correct",
+                          np.where(self.unanswered[row, :count], "unanswered", "incorrect"))
+        return status.tolist()
+
+
+def encode_answer(answer: Optional[int]) -> int:
+    if answer is None:
+        return UNANSWERED
+    return answer if answer >= 0 else INVALID
+
+def build_matrices(keys: Sequence[Sequence[int]], answers: Sequence[Sequence[Optional[int]]]):
+    """
+    Pad ragged answer keys and answer lists into (answers, key, valid) arrays.
+    Missing answers count as unanswered; extra answers are ignored.
+    """
+    rows = len(keys)
+    width = max((len(k) for k in keys), default=0)
+    answer_matrix = np.full((rows, width), UNANSWERED, dtype=np.int16)
+    key_matrix = np.full((rows, width), INVALID, dtype=np.int16)
+    valid = np.zeros((rows, width), dtype=bool)
+    for i, (key, row_answers) in enumerate(zip(keys, answers)):
+        n = len(key)
+        key_matrix[i, :n] = key
+        valid[i, :n] = True
+        given = [encode_answer(a) for a in row_answers[:n]]
+        answer_matrix[i, :len(given)] = np.clip(given, INVALID, np.iinfo(np.int16).max)
+    return answer_matrix, key_matrix, valid
+
+def grade(keys: Sequence[Sequence[int]], answers: Sequence[Sequence[Optional[int]]]) -> Grades:
+    return Grades(*build_matrices(keys, answers))
+
+def question_accuracy(codes: np.ndarray, grades: Grades, n_codes: int):
+    """
+    Per-question (served, correct) counts across the batch, where codes[i, j]
+    numbers the bank question behind cell (i, j).
+    """
+    cells = codes[grades.valid]
+    served = np.bincount(cells, minlength=n_codes)
+    correct = np.bincount(cells, weights=grades.correct[grades.valid], minlength=n_codes).astype(int)
+    return served, correct
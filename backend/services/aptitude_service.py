@@ -1,92 +1,102 @@
 import os
 import json
 import uuid
-import random
-import requests
 import sys
+import time
+import asyncio
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from models import AptitudeResult
 from datetime import datetime
 from dotenv import load_dotenv
 from firebase_config import firestore_client
+from services.llm_client import aget_gpt_response, GPT_MINI_MODEL
+from services import question_bank, aptitude_grading
+from services.question_bank import BankQuestion, ServedQuestion
+from services.question_pool import AIQuestionPool
+from services.session_store import SessionStore
+from typing import Dict, List, Optional
 
 # Load environment variables
 load_dotenv()
 
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
-GPT_MINI_MODEL = os.getenv("GPT_MINI_MODEL")
+APTITUDE_SESSION_TTL = float(os.getenv("APTITUDE_SESSION_TTL", "7200"))
+APTITUDE_SESSION_MAX = int(os.getenv("APTITUDE_SESSION_MAX", "20000"))
+# Questions per AI-mode test, and per generation call of the pool refill
+AI_QUESTION_COUNT = 3
+AI_GENERATION_BATCH = int(os.getenv("AI_GENERATION_BATCH", "5"))
+AI_GENERATION_MAX_TOKENS = 2500
+AI_QUESTION_POOL_WARM_ON_STARTUP = os.getenv("AI_QUESTION_POOL_WARM_ON_STARTUP", "true").lower() == "true"
+# Submissions accepted by one bulk grading request
+APTITUDE_BULK_MAX = int(os.getenv("APTITUDE_BULK_MAX", "2000"))
+# Firestore caps a write batch at 500 operations
+FIRESTORE_BATCH_SIZE = 500
+# A session claimed for grading can be claimed again after this long (its grader died)
+APTITUDE_GRADING_LEASE = float(os.getenv("APTITUDE_GRADING_LEASE", "30"))
 
-def get_gpt_response(messages, model=GPT_MINI_MODEL):
-    """Call Azure OpenAI GPT"""
-    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY:
-        print(f"❌ Azure credentials missing")
-        return None 
-    
-    print(f"🔵 Calling Azure OpenAI for aptitude questions")
-    url = f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
-    headers = {
-        "api-key": AZURE_OPENAI_KEY,
-        "Content-Type": "application/json"
-    }
-    body = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0.9
-    }
-    try:
-        r = requests.post(url, headers=headers, json=body)
-        print(f"🟢 Azure response status: {r.status_code}")
-        if r.status_code != 200:
-            print(f"❌ Azure error: {r.text}")
-        return r.json()
-    except Exception as e:
-        print(f"❌ Exception: {str(e)}")
-        return None
+# Tests in progress: question ids and option permutations only, the answer key stays on the server
+APTITUDE_SESSIONS = SessionStore("aptitude", APTITUDE_SESSION_TTL, APTITUDE_SESSION_MAX)
 
-def load_questions_from_json(topic: str):
-    """Load questions from JSON file"""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "data", f"{topic.lower()}_questions.json")
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"❌ Error loading questions from {file_path}: {e}")
-        return []
+def has_topic(topic: str) -> bool:
+    """Whether the question bank has this topic"""
+    return question_bank.get_bank().has_topic(topic.lower())
 
-def shuffle_question_options(question):
-    """Shuffle options and update correctAnswer index"""
-    q_copy = question.copy()
-    correct_text = q_copy['options'][q_copy['correctAnswer']]
-    
-    # Shuffle options
-    random.shuffle(q_copy['options'])
-    
-    # Update correctAnswer to new index
-    q_copy['correctAnswer'] = q_copy['options'].index(correct_text)
-    
-    return q_copy
+def session_item(served: ServedQuestion, inline: bool) -> Dict:
+    """How a served question is kept in a test session (AI questions are not in the bank, so they travel whole)"""
+    if inline:
+        return {"question": served.base.to_dict(), "perm": served.perm}
+    return {"id": served.base.id, "perm": served.perm}
 
-def get_random_questions(topic: str, count: int = 20):
-    """Get random questions with shuffled options"""
-    all_questions = load_questions_from_json(topic)
-    
-    if not all_questions:
-        return []
-    
-    # Select random questions (or all if count > available)
-    num_to_select = min(count, len(all_questions))
-    selected = random.sample(all_questions, num_to_select)
-    
-    # Shuffle options for each question
-    shuffled = [shuffle_question_options(q) for q in selected]
-    
-    return shuffled
+def resolve_item(topic: str, item: Dict) -> Optional[ServedQuestion]:
+    """The question a session item stands for, or None if the bank no longer has it"""
+    if "question" in item:
+        base = question_bank.parse_question(topic, item["question"])
+    else:
+        base = question_bank.get_bank().get(topic, item["id"])
+    if base is None or not question_bank.is_valid_permutation(base, item["perm"]):
+        return None
+    return ServedQuestion(base, item["perm"])
+
+async def start_test(topic: str, count: int = 20, ai_powered: bool = False, userId: Optional[str] = None):
+    """
+    Pick the questions for a test and open a session for it.
+    The client gets the questions without answers; submit_test grades against the session.
+    AI mode is served from the pool; bank questions make up any shortfall.
+    """
+    topic = topic.lower()
+    items = []
+    served = []
+    if ai_powered:
+        for q in await AI_QUESTIONS.take(topic, AI_QUESTION_COUNT, userId):
+            served.append(question_bank.shuffle(q))
+            items.append(session_item(served[-1], inline=True))
+        if len(served) < AI_QUESTION_COUNT:
+            print(f"⚠️ AI question pool short for {topic} ({len(served)}/{AI_QUESTION_COUNT}), topping up from the bank")
+        count = AI_QUESTION_COUNT - len(served)
+    for q in question_bank.get_bank().draw(topic, count):
+        served.append(q)
+        items.append(session_item(q, inline=False))
+
+    sessionId = str(uuid.uuid4())
+    await APTITUDE_SESSIONS.create(sessionId, {
+        "sessionId": sessionId,
+        "userId": userId,
+        "topic": topic,
+        "items": items,
+        "startTime": datetime.now().isoformat(),
+        "gradingSince": None,
+        "result": None
+    })
+    return {
+        "sessionId": sessionId,
+        "topic": topic,
+        "questions": [q.public_dict() for q in served]
+    }
 
-def get_ai_powered_questions(topic: str):
-    """Generate 3 hard questions using GPT-4.0 Mini"""
-    prompt = f"""Generate exactly 3 difficult {topic} aptitude test questions suitable for competitive exams.
+async def get_ai_powered_questions(topic: str) -> List[BankQuestion]:
+    """Generate a batch of hard questions using GPT-4.0 Mini (empty if generation failed)"""
+    prompt = f"""Generate exactly {AI_GENERATION_BATCH} difficult {topic} aptitude test questions suitable for competitive exams.
 
 Requirements:
 - Questions should be challenging and test deep understanding
@@ -111,7 +121,8 @@ Topic: {topic}"""
         {"role": "user", "content": prompt}
     ]
     
-    resp = get_gpt_response(messages)
+    print(f"🔵 Calling Azure OpenAI for aptitude questions")
+    resp = await aget_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=AI_GENERATION_MAX_TOKENS, temperature=0.9)
     
     if resp and 'choices' in resp:
         try:
@@ -120,76 +131,70 @@ Topic: {topic}"""
             content = content.replace("```json", "").replace("```", "").strip()
             questions = json.loads(content)
             
-            # Add IDs
-            for i, q in enumerate(questions):
-                q['id'] = i + 1
-            
-            return questions
+            # Add IDs, keep only well-formed questions
+            parsed = [question_bank.parse_question(topic, dict(q, id=i + 1)) for i, q in enumerate(questions)]
+            return [q for q in parsed if q is not None]
         except json.JSONDecodeError as e:
             print(f"❌ JSON decode error: {e}")
             print(f"Content: {content}")
         except Exception as e:
             print(f"❌ Error parsing AI response: {e}")
     
-    # Fallback if AI fails
-    return get_random_questions(topic, 3)
+    return []
 
-def submit_test(userId: int, topic: str, questions: list, answers: list, timeTaken: int = 0):
-    """
-    Submit aptitude test answers and generate comprehensive results
-    """
-    from datetime import datetime
+# Validated, deduplicated AI questions per topic, refilled in the background
+AI_QUESTIONS = AIQuestionPool(get_ai_powered_questions)
+
+def warm_ai_question_pools():
+    """Fill the AI question pool of every bank topic (called on application startup)"""
+    bank = question_bank.get_bank()
+    for topic in bank.topics():
+        # A generated copy of a bank question would just repeat the regular test
+        AI_QUESTIONS.exclude(topic, (q.question for q in bank.by_topic[topic]))
+    if AI_QUESTION_POOL_WARM_ON_STARTUP:
+        AI_QUESTIONS.warm(bank.topics())
+
+def prepare_submission(sessionId: str, session: Dict, answers: List[Optional[int]]):
+    """The session's questions (as served) and the answers aligned with them"""
+    topic = session["topic"]
+    resolved = [resolve_item(topic, item) for item in session["items"]]
+    if None in resolved:
+        print(f"⚠️ Aptitude session {sessionId}: {resolved.count(None)} question(s) left the bank, grading the rest")
+    # Answers are indexed by the position the question was served at
+    answers = [a for a, q in zip(list(answers) + [None] * len(resolved), resolved) if q is not None]
+    return [q for q in resolved if q is not None], answers
+
+def performance_level(score_percentage: int) -> str:
+    if score_percentage >= 90:
+        return "Excellent"
+    elif score_percentage >= 75:
+        return "Good"
+    elif score_percentage >= 60:
+        return "Average"
+    return "Needs Improvement"
+
+def build_result(userId: str, topic: str, questions: List[ServedQuestion], answers: List[Optional[int]],
+                 grades: aptitude_grading.Grades, row: int, timeTaken: int):
+    """AptitudeResult to persist and the response for one graded submission"""
+    total_questions = int(grades.total[row])
+    correct_count = int(grades.correct_count[row])
+    incorrect_count = int(grades.incorrect_count[row])
+    unanswered_count = int(grades.unanswered_count[row])
+    score_percentage = int(grades.score[row])
+    questions_answered = total_questions - unanswered_count
     
-    # Calculate results
-    correct_count = 0
-    incorrect_count = 0
-    unanswered_count = 0
     question_breakdown = []
-    
-    for idx, question in enumerate(questions):
-        user_answer = answers[idx] if idx < len(answers) else None
-        correct_answer = question.get("correctAnswer", 0)
-        
-        is_correct = user_answer == correct_answer if user_answer is not None else False
-        
-        if user_answer is None:
-            unanswered_count += 1
-            status = "unanswered"
-        elif is_correct:
-            correct_count += 1
-            status = "correct"
-        else:
-            incorrect_count += 1
-            status = "incorrect"
-        
+    for idx, (question, status) in enumerate(zip(questions, grades.statuses(row))):
         question_breakdown.append({
             "questionNumber": idx + 1,
-            "questionText": question.get("question", ""),
-            "options": question.get("options", []),
-            "correctAnswer": correct_answer,
-            "userAnswer": user_answer,
+            "questionText": question.base.question,
+            "options": [question.base.options[i] for i in question.order],
+            "correctAnswer": question.correct_answer,
+            "userAnswer": answers[idx],
             "status": status,
-            "explanation": question.get("explanation", "")
+            "explanation": question.base.explanation
         })
     
-    # Calculate score
-    total_questions = len(questions)
-    score_percentage = round((correct_count / total_questions) * 100) if total_questions > 0 else 0
-    
-    # Calculate completion metrics
-    questions_answered = total_questions - unanswered_count
-    completion_percentage = round((questions_answered / total_questions) * 100) if total_questions > 0 else 0
-    
-    # Determine performance level
-    if score_percentage >= 90:
-        performance_level = "Excellent"
-    elif score_percentage >= 75:
-        performance_level = "Good"
-    elif score_percentage >= 60:
-        performance_level = "Average"
-    else:
-        performance_level = "Needs Improvement"
-    
     # Create result object
     result = AptitudeResult(
         id=str(uuid.uuid4()),
@@ -202,19 +207,12 @@ def submit_test(userId: int, topic: str, questions: list, answers: list, timeTak
         correctAnswers=correct_count,
         incorrectAnswers=incorrect_count,
         unansweredQuestions=unanswered_count,
-        performanceLevel=performance_level,
+        performanceLevel=performance_level(score_percentage),
         createdAt=datetime.now().isoformat()
     )
     
-    # Save to Firestore
-    try:
-        firestore_client.collection('aptitude_results').document(result.id).set(result.model_dump())
-        print(f"✅ Aptitude result saved to Firestore: {result.id}")
-    except Exception as e:
-        print(f"❌ Failed to save to Firestore: {str(e)}")
-    
     # Return comprehensive results
-    return {
+    response = {
         "id": result.id,
         "topic": topic,
         "score": score_percentage,
@@ -228,7 +226,7 @@ def submit_test(userId: int, topic: str, questions: list, answers: list, timeTak
         "completionMetrics": {
             "questionsAnswered": questions_answered,
             "totalQuestions": total_questions,
-            "completionPercentage": completion_percentage,
+            "completionPercentage": int(grades.completion[row]),
             "timeTakenMinutes": round(timeTaken / 60) if timeTaken > 0 else 0,
             "isFullyCompleted": unanswered_count == 0
         },
@@ -241,6 +239,196 @@ def submit_test(userId: int, topic: str, questions: list, answers: list, timeTak
             "Needs Improvement"
         )
     }
+    return result, response
+
+# Why a session could not be claimed: (message, HTTP status)
+CLAIM_ERRORS = {
+    "missing": ("Test session not found or expired", 404),
+    "forbidden": ("Test session belongs to another user", 403),
+    "busy": ("Submission already in progress.", 429),
+}
+
+async def claim_session(sessionId: str, userId: str):
+    """
+    Atomically claim a test session for grading, on whichever worker the
+    request landed. Returns (outcome, session): "claimed", "graded" (the
+    session holds the stored result), "busy" (another request is grading it),
+    "forbidden" (the test was started by another user) or "missing".
+    A test started without a userId belongs to its first submitter.
+    """
+    outcome = "missing"
+    now = time.time()
+    def claim(session):
+        nonlocal outcome
+        if session.get("userId") not in (None, userId):
+            outcome = "forbidden"
+        elif session.get("result"):
+            outcome = "graded"
+        elif now - (session.get("gradingSince") or 0) < APTITUDE_GRADING_LEASE:
+            outcome = "busy"
+        else:
+            outcome = "claimed"
+            session["userId"] = userId
+            session["gradingSince"] = now
+    session = await APTITUDE_SESSIONS.update(sessionId, claim)
+    return outcome, session
+
+def claim_error(outcome: str) -> Dict:
+    message, status = CLAIM_ERRORS[outcome]
+    return {"error": message, "status": status}
+
+async def store_result(sessionId: str, response: Dict):
+    """Record the graded result on the session and release the claim"""
+    def finish(latest):
+        latest["result"] = response
+        latest["gradingSince"] = None
+    await APTITUDE_SESSIONS.update(sessionId, finish)
+
+async def release_claim(sessionId: str):
+    """Give up a claim after a failure, so the submission can be retried at once"""
+    await APTITUDE_SESSIONS.update(sessionId, lambda latest: latest.__setitem__("gradingSince", None))
+
+async def submit_test(userId: str, sessionId: str, answers: list, timeTaken: int = 0):
+    """
+    Grade a test session against the question bank and generate comprehensive results.
+    Submitting the same session again returns the first result.
+    """
+    outcome, session = await claim_session(sessionId, userId)
+    if outcome == "graded":
+        return session["result"]
+    if outcome != "claimed":
+        return claim_error(outcome)
+    
+    try:
+        questions, answers = prepare_submission(sessionId, session, answers)
+        grades = aptitude_grading.grade([[q.correct_answer for q in questions]], [answers])
+        result, response = build_result(userId, session["topic"], questions, answers, grades, 0, timeTaken)
+    except Exception:
+        await release_claim(sessionId)
+        raise
+    
+    # Save to Firestore
+    try:
+        await asyncio.to_thread(firestore_client.collection('aptitude_results').document(result.id).set, result.model_dump())
+        print(f"✅ Aptitude result saved to Firestore: {result.id}")
+    except Exception as e:
+        print(f"❌ Failed to save to Firestore: {str(e)}")
+    
+    await store_result(sessionId, response)
+    return response
+
+def result_summary(sessionId: str, userId: str, response: Dict) -> Dict:
+    return {
+        "sessionId": sessionId,
+        "userId": userId,
+        "id": response["id"],
+        "score": response["score"],
+        "correctAnswers": response["correctAnswers"],
+        "incorrectAnswers": response["incorrectAnswers"],
+        "unansweredQuestions": response["unansweredQuestions"],
+        "performanceLevel": response["performanceLevel"]
+    }
+
+def save_results_batched(results: List[AptitudeResult]) -> int:
+    """Write results in Firestore batches (at most FIRESTORE_BATCH_SIZE writes each); returns how many were saved"""
+    saved = 0
+    collection = firestore_client.collection('aptitude_results')
+    for start in range(0, len(results), FIRESTORE_BATCH_SIZE):
+        chunk = results[start:start + FIRESTORE_BATCH_SIZE]
+        batch = firestore_client.batch()
+        for result in chunk:
+            batch.set(collection.document(result.id), result.model_dump())
+        try:
+            batch.commit()
+            saved += len(chunk)
+        except Exception as e:
+            print(f"❌ Failed to save aptitude batch to Firestore: {str(e)}")
+    return saved
+
+async def submit_bulk(submissions: List[Dict]) -> Dict:
+    """
+    Grade many submissions ({sessionId, userId, answers, timeTaken}) in one pass:
+    one answer matrix through the grading kernel, batched Firestore writes.
+    Returns per-submission summaries, per-question accuracy and throughput.
+    """
+    started = time.perf_counter()
+    results, errors, unique = [], [], []
+    seen = set()
+    for submission in submissions:
+        if submission["sessionId"] in seen:
+            errors.append({"sessionId": submission["sessionId"], "error": "Duplicate submission in batch"})
+        else:
+            unique.append(submission)
+        seen.add(submission["sessionId"])
+    
+    # Claim every session before grading, so a concurrent /submit or bulk request cannot grade it too
+    claims = await asyncio.gather(*[claim_session(s["sessionId"], s["userId"]) for s in unique])
+    claimed = []
+    for submission, (outcome, session) in zip(unique, claims):
+        sessionId = submission["sessionId"]
+        if outcome == "graded":
+            # Already graded: report the stored result
+            results.append(result_summary(sessionId, submission["userId"], session["result"]))
+        elif outcome != "claimed":
+            errors.append({"sessionId": sessionId, "error": CLAIM_ERRORS[outcome][0]})
+        else:
+            claimed.append((submission, session))
+    
+    try:
+        pending = [
+            (submission, session, *prepare_submission(submission["sessionId"], session, submission["answers"]))
+            for submission, session in claimed
+        ]
+        return await grade_claimed(pending, results, errors, started)
+    except Exception:
+        await asyncio.gather(*[release_claim(s["sessionId"]) for s, _ in claimed])
+        raise
+
+async def grade_claimed(pending: List, results: List[Dict], errors: List[Dict], started: float) -> Dict:
+    """Grade and persist the claimed submissions of submit_bulk"""
+    grades = aptitude_grading.grade(
+        [[q.correct_answer for q in questions] for _, _, questions, _ in pending],
+        [answers for _, _, _, answers in pending]
+    )
+    
+    # Number the bank questions behind every cell for per-question accuracy
+    codes = np.zeros(grades.valid.shape, dtype=np.int32)
+    code_of: Dict = {}
+    for row, (_, session, questions, _) in enumerate(pending):
+        for col, q in enumerate(questions):
+            codes[row, col] = code_of.setdefault((q.base.topic, q.base.id), len(code_of))
+    served, correct = aptitude_grading.question_accuracy(codes, grades, len(code_of))
+    
+    graded = []
+    for row, (submission, session, questions, answers) in enumerate(pending):
+        result, response = build_result(submission["userId"], session["topic"], questions, answers,
+                                        grades, row, submission.get("timeTaken", 0))
+        graded.append((submission["sessionId"], result, response))
+        results.append(result_summary(submission["sessionId"], submission["userId"], response))
+    
+    saved = await asyncio.to_thread(save_results_batched, [result for _, result, _ in graded])
+    await asyncio.gather(*[store_result(sessionId, response) for sessionId, _, response in graded])
+    
+    elapsed = time.perf_counter() - started
+    print(f"✅ Bulk aptitude grading: {len(graded)} graded, {saved} saved in {elapsed:.2f}s")
+    return {
+        "results": results,
+        "errors": errors,
+        "graded": len(graded),
+        "saved": saved,
+        "questionAccuracy": [
+            {
+                "topic": topic,
+                "questionId": question_id,
+                "served": int(served[code]),
+                "correct": int(correct[code]),
+                "accuracy": round(int(correct[code]) / int(served[code]) * 100) if served[code] else 0
+            }
+            for (topic, question_id), code in code_of.items()
+        ],
+        "elapsedSeconds": round(elapsed, 4),
+        "submissionsPerSecond": round(len(graded) / elapsed, 1) if elapsed > 0 else None
+    }
 
 def save_result(result: AptitudeResult):
     """Save aptitude result to Firestore"""
@@ -0,0 +1,28 @@
+import asyncio
+from typing import Set
+
+# Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+_BACKGROUND_TASKS: Set[asyncio.Task] = set()
+
+def spawn(coro, name: str = None) -> asyncio.Task:
+    """Run a coroutine in the background, keeping it alive and logging failures"""
+    task = asyncio.create_task(coro, name=name)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+def _on_done(task: asyncio.Task):
+    _BACKGROUND_TASKS.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        print(f"❌ Background task {task.get_name()} failed: {exc!r}")
+
+async def cancel_all():
+    """Cancel outstanding background work (called on application shutdown)"""
+    tasks = list(_BACKGROUND_TASKS)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,66 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from services import metrics
+
+COMPLETION_WAIT_TIMEOUT = float(os.getenv("COMPLETION_WAIT_TIMEOUT", "30"))
+# Followers on other workers are not woken by publish(), so they re-check the store this often
+COMPLETION_POLL_INTERVAL = float(os.getenv("COMPLETION_POLL_INTERVAL", "1"))
+
+metrics.describe("completion_waits_total", "Duplicate requests that waited for another request's result")
+
+
+class CompletionRegistry:
+    """
+    Per-session completion futures: the request that owns a slow operation
+    publishes its result, and duplicate requests await it instead of
+    sleep-polling. The leader may be on another worker, so followers also
+    re-check the shared store via `check()` every COMPLETION_POLL_INTERVAL.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def _future(self, key: str) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is None or future.done():
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    async def wait(self, key: str, check: Callable[[], Awaitable[Optional[Any]]],
+                   timeout: float = COMPLETION_WAIT_TIMEOUT) -> Optional[Any]:
+        """Result published for key, or None on timeout (or if the leader gave up)"""
+        result = await check()
+        if result is not None:
+            self._count("ready")
+            return result
+
+        future = self._future(key)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self._count("timeout")
+                return None
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), min(remaining, COMPLETION_POLL_INTERVAL))
+                self._count("published")
+                return result
+            except asyncio.TimeoutError:
+                result = await check()
+                if result is not None:
+                    self._count("polled")
+                    return result
+
+    def publish(self, key: str, result: Optional[Any]):
+        """Wake every local follower of key (None tells them the leader failed)"""
+        future = self._futures.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def discard(self, key: str):
+        self.publish(key, None)
+
+    def _count(self, outcome: str):
+        metrics.inc("completion_waits_total", labels={"registry": self.name, "outcome": outcome})
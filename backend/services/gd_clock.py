@@ -0,0 +1,139 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+GD_PREP_SECONDS = int(os.getenv("GD_PREP_SECONDS", "60"))
+# The last CONCLUSION_SECONDS of the discussion are the conclusion phase
+CONCLUSION_SECONDS = 120
+
+# Monotonic within a worker (immune to wall-clock steps), anchored to epoch
+# time at startup so readings stay comparable between workers
+_EPOCH_OFFSET = time.time() - time.monotonic()
+
+def now() -> float:
+    return time.monotonic() + _EPOCH_OFFSET
+
+
+class SessionClock:
+    """
+    Discussion time for one GD session: prep, then `duration` seconds of
+    discussion that stand still while paused. All readings are seconds on
+    the now() timeline, so the clock serializes as plain numbers.
+    """
+    def __init__(self, duration: int, created_at: Optional[float] = None, prep_seconds: int = GD_PREP_SECONDS):
+        self.duration = duration
+        self.created_at = now() if created_at is None else created_at
+        self.prep_seconds = prep_seconds
+        self.started_at: Optional[float] = None
+        self.paused_at: Optional[float] = None
+        self.pauses: List[List[float]] = []
+
+    # ---- transitions ----
+    def start(self, at: Optional[float] = None):
+        """Begin the discussion (no-op if it already began; prep never runs past its end)"""
+        if self.started_at is None:
+            self.started_at = min(now() if at is None else at, self.prep_ends_at())
+
+    def pause(self, at: Optional[float] = None):
+        at = now() if at is None else at
+        self.start(at)
+        if self.paused_at is None:
+            self.paused_at = at
+
+    def resume(self, at: Optional[float] = None):
+        at = now() if at is None else at
+        if self.paused_at is not None:
+            self.pauses.append([self.paused_at, at])
+            self.paused_at = None
+
+    # ---- readings ----
+    @property
+    def paused(self) -> bool:
+        return self.paused_at is not None
+
+    def prep_ends_at(self) -> float:
+        return self.created_at + self.prep_seconds
+
+    def paused_seconds(self, at: Optional[float] = None) -> float:
+        at = now() if at is None else at
+        total = sum(end - start for start, end in self.pauses)
+        if self.paused_at is not None:
+            total += at - self.paused_at
+        return total
+
+    def elapsed(self, at: Optional[float] = None) -> float:
+        """Seconds of discussion so far, excluding pauses"""
+        at = now() if at is None else at
+        if self.started_at is None:
+            # Prep ran out without anyone starting the discussion: it started then
+            if at < self.prep_ends_at():
+                return 0.0
+            started_at = self.prep_ends_at()
+        else:
+            started_at = self.started_at
+        return max(0.0, at - started_at - self.paused_seconds(at))
+
+    def remaining(self, at: Optional[float] = None) -> int:
+        return max(0, self.duration - int(self.elapsed(at)))
+
+    def deadline(self, at: Optional[float] = None) -> Optional[float]:
+        """When the discussion will end (epoch seconds), or None while paused"""
+        at = now() if at is None else at
+        if self.paused:
+            return None
+        if self.started_at is None and at < self.prep_ends_at():
+            return self.prep_ends_at() + self.duration
+        return at + self.duration - self.elapsed(at)
+
+    def phase(self, at: Optional[float] = None) -> str:
+        at = now() if at is None else at
+        if self.started_at is None and at < self.prep_ends_at():
+            return "prep"
+        remaining = self.duration - self.elapsed(at)
+        if remaining <= 0:
+            return "ended"
+        if remaining <= CONCLUSION_SECONDS:
+            return "conclusion"
+        return "discussion"
+
+    def next_transition(self, at: Optional[float] = None) -> Optional[float]:
+        """When phase() will next change (None while paused or once ended)"""
+        at = now() if at is None else at
+        phase = self.phase(at)
+        if phase == "prep":
+            return self.prep_ends_at()
+        deadline = self.deadline(at)
+        if deadline is None or phase == "ended":
+            return None
+        if phase == "discussion":
+            return deadline - CONCLUSION_SECONDS
+        return deadline
+
+    def snapshot(self, at: Optional[float] = None) -> Dict:
+        """What clients need to run their own countdown"""
+        at = now() if at is None else at
+        return {
+            "phase": self.phase(at),
+            "timeRemaining": self.remaining(at),
+            "deadline": self.deadline(at),
+            "paused": self.paused,
+        }
+
+    # ---- persistence ----
+    def to_dict(self) -> Dict:
+        return {
+            "duration": self.duration,
+            "created_at": self.created_at,
+            "prep_seconds": self.prep_seconds,
+            "started_at": self.started_at,
+            "paused_at": self.paused_at,
+            "pauses": self.pauses,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SessionClock":
+        clock = cls(data["duration"], data["created_at"], data.get("prep_seconds", GD_PREP_SECONDS))
+        clock.started_at = data.get("started_at")
+        clock.paused_at = data.get("paused_at")
+        clock.pauses = data.get("pauses", [])
+        return clock
@@ -0,0 +1,124 @@
+import os
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, Set, Tuple
+from services import session_backends
+
+# Comment frames keep idle SSE connections open through proxies
+GD_EVENTS_KEEPALIVE = float(os.getenv("GD_EVENTS_KEEPALIVE", "15"))
+GD_EVENTS_QUEUE_SIZE = 256
+
+Event = Tuple[str, Any]
+
+
+class LocalBroker:
+    """Fan-out to subscribers connected to this worker"""
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, sessionId: str, event: str, data: Any):
+        for queue in list(self._subscribers.get(sessionId, ())):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # A stalled client must not hold up the discussion: drop its oldest event
+                queue.get_nowait()
+                queue.put_nowait((event, data))
+
+    async def has_subscribers(self, sessionId: str) -> bool:
+        return bool(self._subscribers.get(sessionId))
+
+    async def subscribe(self, sessionId: str) -> AsyncIterator[Event]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=GD_EVENTS_QUEUE_SIZE)
+        self._subscribers.setdefault(sessionId, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(sessionId)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[sessionId]
+
+
+class RedisBroker:
+    """Fan-out over Redis pub/sub, so the SSE connection may live on any worker"""
+    def __init__(self, client):
+        self.client = client
+
+    def _channel(self, sessionId: str) -> str:
+        return f"{session_backends.REDIS_KEY_PREFIX}:gd-events:{sessionId}"
+
+    async def publish(self, sessionId: str, event: str, data: Any):
+        await self.client.publish(self._channel(sessionId), json.dumps([event, data], default=str))
+
+    async def has_subscribers(self, sessionId: str) -> bool:
+        counts = await self.client.pubsub_numsub(self._channel(sessionId))
+        return bool(counts and counts[0][1])
+
+    async def subscribe(self, sessionId: str) -> AsyncIterator[Event]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self._channel(sessionId))
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                event, data = json.loads(message["data"])
+                yield event, data
+        finally:
+            await pubsub.unsubscribe(self._channel(sessionId))
+            await pubsub.aclose()
+
+
+def create_broker():
+    if session_backends.SESSION_BACKEND == "redis":
+        return RedisBroker(session_backends.get_redis_client())
+    return LocalBroker()
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = create_broker()
+    return _broker
+
+def use_broker(broker):
+    """Swap the broker (e.g. a RedisBroker over an in-process stand-in for tests)"""
+    global _broker
+    _broker = broker
+
+async def publish(sessionId: str, event: str, data: Any):
+    try:
+        await get_broker().publish(sessionId, event, data)
+    except Exception as e:
+        # Live updates are best effort; the POST response still carries the turn
+        print(f"⚠️ GD event publish failed for {sessionId}: {e}")
+
+async def has_subscribers(sessionId: str) -> bool:
+    try:
+        return await get_broker().has_subscribers(sessionId)
+    except Exception:
+        return False
+
+async def subscribe(sessionId: str) -> AsyncIterator[Event]:
+    """Events for a session, with ("keepalive", None) when idle"""
+    events = get_broker().subscribe(sessionId).__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=GD_EVENTS_KEEPALIVE)
+            if not done:
+                yield "keepalive", None
+                continue
+            event = pending.result()
+            pending = None
+            yield event
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await events.aclose()
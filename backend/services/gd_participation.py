@@ -0,0 +1,137 @@
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional
+from services.llm_client import aget_gpt_response, GPT_MINI_MODEL
+
+# Fold the discussion into the rolling summary once this many messages are unsummarized
+SUMMARY_FOLD_EVERY = int(os.getenv("GD_SUMMARY_FOLD_EVERY", "8"))
+SUMMARY_MAX_WORDS = 150
+SUMMARY_MAX_TOKENS = 260
+# Only this many unsummarized messages are ever sent (if folding keeps failing)
+SUMMARY_MAX_PENDING = 2 * SUMMARY_FOLD_EVERY
+
+# Scoring sees at most this many of the user's messages, each cut to USER_EXCERPT_CHARS
+SCORING_MAX_USER_MESSAGES = 12
+USER_EXCERPT_CHARS = 280
+
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for with from as is are was were be been being it its this that these
+those should would could can will shall may might must do does did not no yes we you they he she i our your
+their his her my me us them what which who whom how why when where than then there here about into over under
+more most less very also just so such only own same too vs versus
+""".split())
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def new_participation() -> Dict:
+    """Running per-user metrics, updated on every turn (JSON-compatible)"""
+    return {
+        "turns": 0,
+        "words": 0,
+        "latencyTotal": 0.0,
+        "latencyCount": 0,
+        "latencyMax": 0.0,
+        "addressed": 0,
+        "answered": 0,
+        "interruptions": 0,
+        "onTopicTurns": 0,
+        "topicTermMentions": 0,
+        "topicTermsUsed": [],
+    }
+
+def stem(word: str) -> str:
+    word = word.strip("'")
+    for suffix in ("ing", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+@lru_cache(maxsize=256)
+def topic_terms(topic: str) -> FrozenSet[str]:
+    return frozenset(stem(w) for w in WORD_RE.findall(topic.lower()) if w not in STOPWORDS and len(w) > 1)
+
+def record_user_turn(participation: Dict, message: str, topic: str, previous_at: Optional[str],
+                     addressed: bool, interrupted: bool, now: Optional[datetime] = None):
+    """Fold one user message into the running metrics"""
+    now = now or datetime.now()
+    words = WORD_RE.findall(message.lower())
+    participation["turns"] += 1
+    participation["words"] += len(words)
+
+    if previous_at:
+        latency = max(0.0, (now - datetime.fromisoformat(previous_at)).total_seconds())
+        participation["latencyTotal"] += latency
+        participation["latencyCount"] += 1
+        participation["latencyMax"] = max(participation["latencyMax"], latency)
+
+    if addressed:
+        participation["answered"] += 1
+    if interrupted:
+        participation["interruptions"] += 1
+
+    terms = topic_terms(topic)
+    hits = [stem(w) for w in words if stem(w) in terms]
+    participation["topicTermMentions"] += len(hits)
+    if hits:
+        participation["onTopicTurns"] += 1
+        used = set(participation["topicTermsUsed"]) | set(hits)
+        participation["topicTermsUsed"] = sorted(used)
+
+def record_addressed(participation: Dict):
+    """A bot handed the floor to the user"""
+    participation["addressed"] += 1
+
+def describe_participation(participation: Dict, topic: str) -> List[str]:
+    """Aggregates as prompt lines for the scoring call"""
+    turns = participation["turns"]
+    latency_count = participation["latencyCount"]
+    terms = topic_terms(topic)
+    lines = [
+        f"Average words per turn: {participation['words'] / turns:.1f}" if turns else "Average words per turn: 0",
+        f"Average response time: {participation['latencyTotal'] / latency_count:.0f}s (slowest {participation['latencyMax']:.0f}s)"
+        if latency_count else "Average response time: n/a",
+        f"Handed the floor by others: {participation['addressed']} times, responded {participation['answered']} times",
+        f"Interrupted while another participant had the floor: {participation['interruptions']} times",
+        f"Turns touching the topic's key terms: {participation['onTopicTurns']}/{turns}",
+    ]
+    if terms:
+        lines.append(f"Topic terms used: {len(participation['topicTermsUsed'])}/{len(terms)}")
+    return lines
+
+def sample_user_messages(messages: List[Dict]) -> List[str]:
+    """Up to SCORING_MAX_USER_MESSAGES user messages spread over the session, each truncated"""
+    texts = [m.get("content", "") for m in messages if m.get("role") == "user"]
+    if len(texts) > SCORING_MAX_USER_MESSAGES:
+        step = (len(texts) - 1) / (SCORING_MAX_USER_MESSAGES - 1)
+        texts = [texts[round(i * step)] for i in range(SCORING_MAX_USER_MESSAGES)]
+    return [t if len(t) <= USER_EXCERPT_CHARS else t[:USER_EXCERPT_CHARS].rstrip() + "..." for t in texts]
+
+def pending_lines(messages: List[Dict], summarized_upto: int) -> List[str]:
+    """Messages not yet folded into the summary (the most recent SUMMARY_MAX_PENDING)"""
+    pending = messages[max(summarized_upto, len(messages) - SUMMARY_MAX_PENDING):]
+    return [f"{m.get('speaker', 'Unknown')}: {m.get('content', '')}" for m in pending]
+
+async def fold_summary(topic: str, summary: str, lines: List[str]) -> Optional[str]:
+    """New rolling summary covering `summary` plus `lines`, or None if the call failed"""
+    messages = [
+        {"role": "system", "content": f"You maintain a running summary of a group discussion. Reply with the updated summary only, at most {SUMMARY_MAX_WORDS} words."},
+        {"role": "user", "content": f"""Topic: "{topic}"
+
+Summary so far:
+{summary or "(discussion just started)"}
+
+New messages:
+{chr(10).join(lines)}
+
+Update the summary: the main arguments, who made them, and how the User took part."""}
+    ]
+    resp = await aget_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=SUMMARY_MAX_TOKENS,
+                                   temperature=0.2, priority="background")
+    if resp and 'choices' in resp:
+        text = resp['choices'][0]['message']['content'].strip()
+        if text:
+            return text
+    return None
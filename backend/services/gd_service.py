@@ -1,78 +1,104 @@
 import os
 import json
+import asyncio
 import uuid
 import random
 import re
-import requests
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from models import GdSession, GdResult
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from collections import deque
+from contextlib import aclosing
+from typing import Callable, Dict, Iterable, List, Optional
 from firebase_config import firestore_client
+from services.llm_client import aget_gpt_response, astream_gpt_response, llm_priority, GPT_FULL_MODEL, GPT_MINI_MODEL
+from services.session_store import SessionStore
+from services.completion import CompletionRegistry
+from services.handoff import get_detector
+from services import gd_participation, gd_clock
+from services.gd_clock import SessionClock, CONCLUSION_SECONDS
+from services.session_backends import SessionConflict
+from services.json_stream import partial_string_field
+from services.background import spawn
+from services.pool import VariantCache
+from services import metrics, gd_events
 
 # Load environment variables
 load_dotenv()
 
-# Sessions in memory, Results in Firestore
-GD_SESSIONS = {}
+# Idle sessions are evicted after GD_SESSION_TTL seconds (oldest first beyond the cap)
+GD_SESSION_TTL = float(os.getenv("GD_SESSION_TTL", "3600"))
+GD_SESSION_MAX = int(os.getenv("GD_SESSION_MAX", "2000"))
 
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
-GPT_FULL_MODEL = os.getenv("GPT_FULL_MODEL")
-GPT_MINI_MODEL = os.getenv("GPT_MINI_MODEL")
+# Ask the LLM about handoffs the local classifier is unsure of
+HANDOFF_LLM_FALLBACK = os.getenv("HANDOFF_LLM_FALLBACK", "true").lower() == "true"
+metrics.describe("gd_handoff_decisions_total", "GD handoff decisions by the component that made them")
 
-# ==== HELPER FUNCTIONS ====
+# Bots are prompted with this many of the latest messages
+BOT_CONTEXT_MESSAGES = 5
 
-def get_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=150):
-    """Call Azure OpenAI API"""
-    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY:
-        print(f"❌ Azure credentials missing")
-        return None 
-    
-    url = f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
-    headers = {
-        "api-key": AZURE_OPENAI_KEY,
-        "Content-Type": "application/json"
-    }
-    body = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": max_tokens
-    }
-    try:
-        r = requests.post(url, headers=headers, json=body, timeout=15)
-        if r.status_code != 200:
-            print(f"❌ Azure error: {r.status_code}")
-            return None
-        return r.json()
-    except Exception as e:
-        print(f"❌ Exception calling Azure: {str(e)}")
-        return None
+# One completion per bot turn returns both the message and its handoff target
+GD_STRUCTURED_TURNS = os.getenv("GD_STRUCTURED_TURNS", "true").lower() == "true"
+STRUCTURED_TURN_MAX_TOKENS = 140
+metrics.describe("gd_bot_turns_total", "GD bot turns by generation mode (structured or two-call fallback)")
+
+# Bot messages are pushed to /api/gd/{sessionId}/events as they finish; with
+# GD_STREAM_TOKENS, token deltas are streamed too while someone is listening
+GD_STREAM_TOKENS = os.getenv("GD_STREAM_TOKENS", "true").lower() == "true"
+
+# While the floor is open, pre-generate the reply a silence_break would need.
+# Most open floors end with the user speaking, so generation only starts once
+# this much of the client's 12-20s silence window has passed. Even then most
+# generated replies are discarded, so it is opt-in
+GD_SPECULATIVE_PREFETCH = os.getenv("GD_SPECULATIVE_PREFETCH", "false").lower() == "true"
+GD_SPECULATION_DELAY_SECONDS = float(os.getenv("GD_SPECULATION_DELAY_SECONDS", "10"))
+metrics.describe("gd_speculations_total", "Speculative GD bot replies by outcome (hit, miss, skipped before generating, failed)")
+metrics.describe("gd_speculation_wasted_tokens_total", "Tokens spent on speculative GD replies that were discarded after completing")
+
+# Opening statements are shared by every session on a topic (see OPENING STATEMENTS)
+GD_OPENING_VARIANTS = int(os.getenv("GD_OPENING_VARIANTS", "3"))
+GD_OPENING_MAX_KEYS = int(os.getenv("GD_OPENING_MAX_KEYS", "256"))
+GD_OPENING_WARM_ON_STARTUP = os.getenv("GD_OPENING_WARM_ON_STARTUP", "true").lower() == "true"
+GD_TOPICS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "gd_topics.json")
+
+# Score the session as soon as its clock runs out, before the client asks
+GD_AUTO_END = os.getenv("GD_AUTO_END", "true").lower() == "true"
+
+# Duplicate end requests await the scoring request's result
+GD_COMPLETIONS = CompletionRegistry("gd")
+
+# Sessions in memory, Results in Firestore
+GD_SESSIONS = SessionStore(
+    "gd", GD_SESSION_TTL, GD_SESSION_MAX,
+    on_evict=lambda sessionId: release_session(sessionId),
+    encode=lambda state: state.to_dict(),
+    decode=lambda data: GdSessionState.from_dict(data)
+)
 
 # ==== CLASSES for Monitor-Bot Architecture ====
 
+def add_usage(usage: Optional[Dict], resp: Optional[Dict]):
+    """Accumulate a completion's token usage into `usage` (if the caller is counting)"""
+    if usage is None or not resp:
+        return
+    for key, value in (resp.get("usage") or {}).items():
+        if isinstance(value, int):
+            usage[key] = usage.get(key, 0) + value
+
+def format_context_line(message: Dict) -> str:
+    return f"{message.get('speaker', 'Unknown')} ({message.get('role', 'unknown')}): {message.get('content', '')}"
+
 class GDBot:
-    """Represents a Participant Bot (Alex, Sarah, Mike)"""
-    def __init__(self, name: str, personality: str):
+    """Represents a Participant Bot (Alex, Sarah, Mike) in one session's discussion"""
+    def __init__(self, name: str, personality: str, topic: str):
         self.name = name
         self.personality = personality
-    
-    def generate_response(self, topic: str, context_messages: List[Dict], system_prompt_extras: str = ""):
-        """Generate a response based on conversation context"""
-        
-        # Format context for the LLM
-        # We take the last 5 messages to keep context relevant but concise
-        recent_msgs = context_messages[-5:] 
-        formatted_context = "\n".join([
-            f"{m.get('speaker', 'Unknown')} ({m.get('role', 'unknown')}): {m.get('content', '')}" 
-            for m in recent_msgs
-        ])
-
-        system_prompt = f"""You are {self.name}, a {self.personality.lower()} participant in a group discussion about "{topic}".
+        self.topic = topic
+        # Everything but the per-turn extras is fixed for the session, so it is built once
+        self.system_prompt_prefix = f"""You are {self.name}, a {self.personality.lower()} participant in a group discussion about "{topic}".
 
 Guidelines:
 - Keep responses concise (2-3 sentences, max 60 words).
@@ -87,63 +113,132 @@ Guidelines:
 - THE ONLY PARTICIPANTS are: User (the human), Alex, Sarah, and Mike. Do NOT invent other names like "Emma" or "John".
 - IF this is the FIRST message in the discussion, DO NOT reference what others said (since no one spoke yet). State your own opening opinion.
 - CRITICAL: DO NOT attribute opinions to the User unless they have explicitly stated them in the "Recent discussion". If the User is silent, do NOT say "User, I appreciate your agreement". Instead, ask for their opinion.
-{system_prompt_extras}"""
+"""
+    
+    def build_messages(self, context_lines: Iterable[str], system_prompt_extras: str = "") -> List[Dict]:
+        # context_lines is the monitor's rolling window of already formatted recent messages
+        formatted_context = "\n".join(context_lines)
 
-        messages = [
-            {"role": "system", "content": system_prompt},
+        return [
+            {"role": "system", "content": self.system_prompt_prefix + system_prompt_extras},
             {"role": "user", "content": f"Recent discussion:\n{formatted_context}\n\nProvide your response as {self.name}:"}
         ]
+
+    async def generate_response(self, context_lines: Iterable[str], system_prompt_extras: str = "", on_delta: Optional[Callable] = None, usage: Optional[Dict] = None):
+        """Generate a response based on conversation context (streamed to on_delta if given)"""
+        messages = self.build_messages(context_lines, system_prompt_extras)
+        
+        if on_delta:
+            parts = []
+            async with aclosing(astream_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=100)) as stream:
+                async for delta in stream:
+                    parts.append(delta)
+                    await on_delta(delta)
+            text = "".join(parts).strip()
+            return text or self.fallback_response()
         
-        resp = get_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=100)
+        resp = await aget_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=100)
+        add_usage(usage, resp)
         
         if resp and 'choices' in resp:
             return resp['choices'][0]['message']['content'].strip()
         else:
-            return f"That's an interesting perspective on {topic}. I think we should explore that further."
+            return self.fallback_response()
+
+    def fallback_response(self) -> str:
+        return f"That's an interesting perspective on {self.topic}. I think we should explore that further."
+
+    async def generate_turn(self, context_lines: Iterable[str], participants: tuple, system_prompt_extras: str = "", on_delta: Optional[Callable] = None, usage: Optional[Dict] = None):
+        """
+        Structured turn: one completion returns the message and who it hands off to.
+        Returns (text, next_speaker_or_None), or None if the reply was not valid,
+        so the caller can fall back to generate_response + parse_handoff.
+        With on_delta, the "message" text is streamed to it as tokens arrive.
+        """
+        others = [p for p in participants if p != self.name.lower()]
+        extras = system_prompt_extras + f"""
+
+Respond with VALID JSON only, in this format:
+{{"message": "<your response>", "nextSpeaker": "<one of: {', '.join(others)}, none>"}}
+Set nextSpeaker to the participant your message explicitly addresses or hands off to, or "none" if you address no one."""
+        messages = self.build_messages(context_lines, extras)
+        
+        if on_delta:
+            content, sent = "", 0
+            async with aclosing(astream_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=STRUCTURED_TURN_MAX_TOKENS)) as stream:
+                async for delta in stream:
+                    content += delta
+                    partial = partial_string_field(content, "message")
+                    if partial and len(partial) > sent:
+                        await on_delta(partial[sent:])
+                        sent = len(partial)
+            return self.parse_turn(content, others)
+        
+        resp = await aget_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=STRUCTURED_TURN_MAX_TOKENS)
+        add_usage(usage, resp)
+        if not (resp and 'choices' in resp):
+            return None
+        return self.parse_turn(resp['choices'][0]['message']['content'], others)
+
+    @staticmethod
+    def parse_turn(content: str, others: List[str]):
+        try:
+            turn = json.loads(content.replace("```json", "").replace("```", "").strip())
+        except ValueError:
+            return None
+        if not isinstance(turn, dict):
+            return None
+        text = turn.get("message")
+        target = str(turn.get("nextSpeaker") or "none").strip().lower()
+        if not isinstance(text, str) or not text.strip() or target not in others + ["none"]:
+            return None
+        return text.strip(), (None if target == "none" else target)
 
 class GDMonitor:
-    """The Orchestrator (Monitor Bot)"""
+    """
+    The Orchestrator (Monitor Bot). Lives on its GdSessionState for the
+    length of one request, together with the bots and the rolling window of
+    formatted recent messages they are prompted with.
+    """
     def __init__(self, session_state):
         self.session_state = session_state
+        topic = self.session_state.model.topic
         self.bots = {
-            b['name'].lower(): GDBot(b['name'], b['personality']) 
+            b['name'].lower(): GDBot(b['name'], b['personality'], topic) 
             for b in self.session_state.model.bots
         }
+        self.participants = ("user",) + tuple(self.bots)
+        self.detector = get_detector(self.participants)
+        self.context = deque(
+            (format_context_line(m) for m in self.session_state.model.messages[-BOT_CONTEXT_MESSAGES:]),
+            maxlen=BOT_CONTEXT_MESSAGES
+        )
+    
+    def record(self, message: Dict):
+        """Append a message to the discussion and the rolling context window"""
+        self.session_state.model.messages.append(message)
+        self.context.append(format_context_line(message))
     
-    def parse_handoff(self, message: str) -> Optional[str]:
+    async def parse_handoff(self, message: str) -> Optional[str]:
         """
-        AI-POWERED handoff detection using GPT-4o-mini.
-        The Monitor Bot intelligently analyzes the message to detect if someone is being addressed,
-        regardless of where their name appears in the sentence.
+        Detects if someone is being addressed, regardless of where their name appears.
+        The local detection engine (services/handoff.py) decides almost every message;
+        GPT-4o-mini is only asked when its classifier is unsure.
         Returns the name of the next speaker (lowercase) or None.
         """
-        # Quick regex check for common patterns first (performance optimization)
-        msg_lower = message.lower()
-        
-        # Fast path: Check for "User," pattern FIRST (most common)
-        if re.search(r'\buser\s*,', msg_lower):
-            return "user"
-        
-        # Fast path: Check for other common patterns
-        quick_patterns = [
-            r'\b(alex|sarah|mike)\s*,',  # "Sarah, what do..."
-            r'\b(alex|sarah|mike)\s*\?',  # "right, Sarah?"
-        ]
-        
-        for pattern in quick_patterns:
-            match = re.search(pattern, msg_lower)
-            if match:
-                for name in ['alex', 'sarah', 'mike']:
-                    if name in match.group(0):
-                        return name
+        decision = self.detector.detect(message)
+        if not (decision.ambiguous and HANDOFF_LLM_FALLBACK):
+            metrics.inc("gd_handoff_decisions_total", labels={"source": decision.source})
+            return decision.target
         
-        # AI-POWERED ANALYSIS: If no obvious pattern, ask GPT to analyze
-        # This catches complex cases like "I would like to ask Sarah, is there any way..."
+        # AI-POWERED ANALYSIS: catches complex cases like "I would like to ask Sarah, is there any way..."
+        participants = ", ".join(name.capitalize() for name in self.participants)
+        options = "\n".join(f'- "{name}" if addressing {name.capitalize()}' for name in self.participants)
         analysis_prompt = f"""You are a GD Monitor Bot analyzing conversation flow.
 
 Message: "{message}"
 
-Participants: User, Alex, Sarah, Mike
+Participants: {participants}
 
 TASK: Determine if this message is addressing or handing off to a SPECIFIC participant.
 Look for ANY indication that someone is being asked a question or addressed, such as:
@@ -153,16 +248,14 @@ Look for ANY indication that someone is being asked a question or addressed, suc
 - Requests for opinion: "I want to hear from Alex on this"
 
 Respond with ONLY ONE WORD:
-- "user" if addressing the User
-- "alex" if addressing Alex
-- "sarah" if addressing Sarah  
-- "mike" if addressing Mike
+{options}
 - "none" if no specific handoff detected
 
 Response:"""
 
+        metrics.inc("gd_handoff_decisions_total", labels={"source": "llm"})
         try:
-            ai_response = get_gpt_response(
+            ai_response = await aget_gpt_response(
                 messages=[{"role": "user", "content": analysis_prompt}],
                 model=GPT_MINI_MODEL,
                 max_tokens=10
@@ -170,33 +263,55 @@ Response:"""
             
             if ai_response and 'choices' in ai_response:
                 detected = ai_response['choices'][0]['message']['content'].strip().lower()
-                if detected in ['user', 'alex', 'sarah', 'mike']:
+                if detected in self.participants:
                     return detected
+                if detected == "none":
+                    return None
         except Exception as e:
             print(f"⚠️ AI handoff detection failed: {e}, falling back to regex")
         
-        # Fallback: Extended regex patterns
-        fallback_patterns = [
-            r'(what|how).{0,50}(alex|sarah|mike|user)',
-            r'i\'d (ask|like to hear from|turn to)\s*(alex|sarah|mike|user)',
-            r'(alex|sarah|mike|user).{0,20}(your|you) (thought|opinion|view|take)',
-        ]
+        # Fallback: the engine's answer from the extended regex patterns
+        return decision.target
+
+    async def generate_bot_turn(self, bot: GDBot, system_prompt_extras: str = "", on_delta: Optional[Callable] = None, usage: Optional[Dict] = None):
+        """
+        Produce a bot message and its handoff target (or None).
+        Uses one structured completion when possible; otherwise the two-step
+        path of a plain reply followed by parse_handoff. on_delta receives the
+        message text as it streams.
+        """
+        # Snapshot: the window may move on while this turn is in flight (e.g. during speculation)
+        context = tuple(self.context)
         
-        for pattern in fallback_patterns:
-            match = re.search(pattern, msg_lower)
-            if match:
-                for name in ['alex', 'sarah', 'mike', 'user']:
-                    if name in match.group(0):
-                        return name
+        if GD_STRUCTURED_TURNS:
+            turn = await bot.generate_turn(context, self.participants, system_prompt_extras, on_delta, usage)
+            if turn:
+                text, target = turn
+                if target is None:
+                    # The model said "none" but the text may still clearly address someone
+                    decision = self.detector.detect(text)
+                    if decision.source == "pattern" and decision.target != bot.name.lower():
+                        target = decision.target
+                metrics.inc("gd_bot_turns_total", labels={"mode": "structured"})
+                return text, target
         
-        return None
+        metrics.inc("gd_bot_turns_total", labels={"mode": "fallback"})
+        restream = None
+        if on_delta:
+            # The rejected structured reply may already have been streamed: tell listeners to start over
+            first = [True]
+            async def restream(text):
+                await on_delta(text, reset=first[0])
+                first[0] = False
+        text = await bot.generate_response(context, system_prompt_extras=system_prompt_extras, on_delta=restream, usage=usage)
+        return text, await self.parse_handoff(text)
 
-    def decide_next_speaker(self) -> str:
+    def decide_next_speaker(self, prefer: Optional[str] = None) -> str:
         """
         Decides who speaks next.
         Priority:
         1. Explicit Handoff (next_speaker set in state).
-        2. Fair Turn Distribution (least spoken).
+        2. Fair Turn Distribution (least spoken), breaking ties in favour of `prefer`.
         """
         # 1. Handoff - CRITICAL: Must be respected if valid
         if self.session_state.next_speaker:
@@ -218,9 +333,53 @@ Response:"""
         min_turns = min(self.session_state.turn_counts.get(c, 0) for c in candidates)
         best_candidates = [c for c in candidates if self.session_state.turn_counts.get(c, 0) == min_turns]
         
+        if prefer in best_candidates:
+            return prefer
         import random
         return random.choice(best_candidates)
 
+# ==== OPENING STATEMENTS ====
+# With nobody having spoken yet, a bot's turn depends only on the topic and
+# its persona, so openings are generated once per (topic, persona) and shared.
+
+GD_BOTS = [
+    {"name": "Alex", "personality": "Analytical"},
+    {"name": "Sarah", "personality": "Creative"},
+    {"name": "Mike", "personality": "Critical"}
+]
+GD_PARTICIPANTS = ("user",) + tuple(b["name"].lower() for b in GD_BOTS)
+
+OPENING_PROMPT = " Nobody has spoken yet: open the discussion with your own opinion on the topic, then invite the User to share theirs."
+
+def opening_key(topic: str, name: str, personality: str) -> tuple:
+    return (" ".join(topic.split()), name, personality)
+
+async def produce_opening(key: tuple):
+    topic, name, personality = key
+    return await GDBot(name, personality, topic).generate_turn((), GD_PARTICIPANTS, OPENING_PROMPT)
+
+OPENING_STATEMENTS = VariantCache(
+    "gd-openings", produce_opening,
+    variants=GD_OPENING_VARIANTS, max_keys=GD_OPENING_MAX_KEYS
+)
+
+def load_topic_catalog() -> List[str]:
+    try:
+        with open(GD_TOPICS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ GD topic catalog unavailable: {e}")
+        return []
+
+def warm_opening_statements():
+    """Generate openings for the catalog topics (called on application startup)"""
+    if GD_OPENING_WARM_ON_STARTUP:
+        OPENING_STATEMENTS.warm(
+            opening_key(topic, b["name"], b["personality"])
+            for topic in load_topic_catalog()
+            for b in GD_BOTS
+        )
+
 # ==== SESSION STATE WRAPPER ====
 
 class GdSessionState:
@@ -229,28 +388,220 @@ class GdSessionState:
         self.user_name = user_name
         self.start_time = datetime.now()
         self.duration = duration
+        self.clock = SessionClock(duration)
         self.phase = "prep"
         self.turn_counts = {"user": 0, "alex": 0, "sarah": 0, "mike": 0}
         self.next_speaker = None
         self.last_speaker = None
         self.pause_count = 0
-        self.pause_duration = 0
         self.prep_time_used = 0
+        self.final_result = None
+        self.participation = gd_participation.new_participation()
+        self.summary = ""
+        self.summarized_upto = 0
+        self._monitor = None
+
+    @property
+    def monitor(self) -> GDMonitor:
+        """Built on first use for this copy of the state"""
+        if self._monitor is None:
+            self._monitor = GDMonitor(self)
+        return self._monitor
+
+    def to_dict(self) -> dict:
+        """JSON-compatible snapshot for the session backend"""
+        return {
+            "model": self.model.model_dump(mode="json"),
+            "user_name": self.user_name,
+            "start_time": self.start_time.isoformat(),
+            "duration": self.duration,
+            "phase": self.phase,
+            "turn_counts": self.turn_counts,
+            "next_speaker": self.next_speaker,
+            "last_speaker": self.last_speaker,
+            "pause_count": self.pause_count,
+            "clock": self.clock.to_dict(),
+            "prep_time_used": self.prep_time_used,
+            "final_result": self.final_result,
+            "participation": self.participation,
+            "summary": self.summary,
+            "summarized_upto": self.summarized_upto
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GdSessionState":
+        state = cls(GdSession(**data["model"]), data["duration"], data["user_name"])
+        state.start_time = datetime.fromisoformat(data["start_time"])
+        if "clock" in data:
+            state.clock = SessionClock.from_dict(data["clock"])
+        else:
+            # Saved before the session clock existed: count from creation, without prep
+            state.clock = SessionClock(state.duration, state.start_time.timestamp(), prep_seconds=0)
+        for field in ("phase", "turn_counts", "next_speaker", "last_speaker",
+                      "pause_count", "prep_time_used", "final_result",
+                      "participation", "summary", "summarized_upto"):
+            setattr(state, field, data.get(field, getattr(state, field)))
+        return state
+
+# ==== SPECULATIVE PREFETCH ====
+# When a turn ends without handing the floor to the user, the frontend sends a
+# silence_break 12-20s later unless the user starts typing. The first bot reply
+# to that silence break depends only on state we already have, so it is
+# generated in the background (after GD_SPECULATION_DELAY_SECONDS of quiet) and
+# used if nothing changed in between.
+
+def build_turn_prompt(session_state: GdSessionState, action: str, chain_count: int, chain_length: int) -> str:
+    """System prompt extras for the bot speaking at position chain_count of a reply chain"""
+    prompt_override = ""
+    
+    # Inject Silence Prompt if this is the first bot responding to a silence break
+    if action == "silence_break" and chain_count == 0:
+        prompt_override += " The User has been silent. Invite them into the conversation GENTLY (e.g. 'User, what are your thoughts?'), but DO NOT assume their opinion or reference nonexistent messages."
+    
+    if chain_count >= chain_length - 1:
+        prompt_override += " This is the last message in this chain. Consider handing off to the User with a question (e.g., 'User, what's your take on this?'), OR make a strong concluding point that invites further discussion. Keep the conversation natural."
+
+    # Check for Time-Based Conclusion (Global check)
+    if session_state.clock.remaining() < 60:
+        prompt_override += " TIME WARNING: The session is almost over (< 60s). You MUST start concluding your points. Ask the User to provide their final conclusion."
+    return prompt_override
+
+def context_key(session_state: GdSessionState) -> tuple:
+    """Identifies the discussion so far (messages are only ever appended)"""
+    messages = session_state.model.messages
+    return (len(messages), messages[-1].get("timestamp") if messages else None)
+
+
+class Speculation:
+    """A bot reply generated ahead of a likely silence_break"""
+    def __init__(self, speaker: str, context: tuple, prompt: str, chain_length: int):
+        self.speaker = speaker
+        self.context = context
+        self.prompt = prompt
+        self.chain_length = chain_length
+        self.usage: Dict = {}
+        self.generating = False
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self, monitor: "GDMonitor", bot: GDBot, delay: float):
+        await asyncio.sleep(delay)
+        self.generating = True
+        return await monitor.generate_bot_turn(bot, self.prompt, usage=self.usage)
+
+    async def use(self, speaker: str, context: tuple, prompt: str):
+        """The prefetched (text, handoff) if it was made for exactly this turn, else None"""
+        if not self.generating or (self.speaker, self.context, self.prompt) != (speaker, context, prompt):
+            # Not started yet: generating now is no slower than waiting out the delay
+            self.discard()
+            return None
+        try:
+            turn = await self.task
+        except Exception:
+            metrics.inc("gd_speculations_total", labels={"outcome": "failed"})
+            return None
+        metrics.inc("gd_speculations_total", labels={"outcome": "hit"})
+        return turn
+
+    def discard(self):
+        if not self.generating:
+            self.task.cancel()
+            metrics.inc("gd_speculations_total", labels={"outcome": "skipped"})
+            return
+        if self.task.done():
+            if not self.task.cancelled() and self.task.exception() is None:
+                wasted = self.usage.get("prompt_tokens", 0) + self.usage.get("completion_tokens", 0)
+                metrics.inc("gd_speculation_wasted_tokens_total", wasted)
+        else:
+            self.task.cancel()
+        metrics.inc("gd_speculations_total", labels={"outcome": "miss"})
+
+
+# Process-local: a silence break served by another worker just generates normally
+SPECULATIONS: Dict[str, Speculation] = {}
+
+def start_speculation(sessionId: str, session_state: GdSessionState):
+    """Prefetch the first reply of the next silence_break, if the floor is left open"""
+    discard_speculation(sessionId)
+    if not GD_SPECULATIVE_PREFETCH or not session_state.model.isActive or session_state.next_speaker == "user":
+        return
+    # Work on a snapshot: decide_next_speaker consumes handoffs and the live state keeps changing
+    snapshot = GdSessionState.from_dict(session_state.to_dict())
+    monitor = snapshot.monitor
+    speaker = monitor.decide_next_speaker()
+    bot = monitor.bots.get(speaker)
+    if not bot:
+        return
+    chain_length = random.randint(1, 3)
+    prompt = build_turn_prompt(snapshot, "silence_break", 0, chain_length)
+    speculation = Speculation(speaker, context_key(snapshot), prompt, chain_length)
+    with llm_priority("background"):
+        speculation.task = spawn(speculation.run(monitor, bot, GD_SPECULATION_DELAY_SECONDS), name=f"gd-speculation-{sessionId}")
+    SPECULATIONS[sessionId] = speculation
+
+def discard_speculation(sessionId: str):
+    speculation = SPECULATIONS.pop(sessionId, None)
+    if speculation is not None:
+        speculation.discard()
+
+def release_session(sessionId: str):
+    """Drop process-local state for a session that was evicted"""
+    GD_COMPLETIONS.discard(sessionId)
+    discard_speculation(sessionId)
+    cancel_clock(sessionId)
+
+# ==== SESSION CLOCK ====
+# Phase changes (prep -> discussion -> conclusion -> ended) fire from a timer
+# task per session, pushed as "clock" events; the deadline ends the session.
+
+# Process-local: the worker that last touched a session runs its timer
+GD_CLOCK_TASKS: Dict[str, asyncio.Task] = {}
+
+def schedule_clock(sessionId: str, session_state: GdSessionState):
+    """(Re)arm the timer for the session's next phase change (none while paused)"""
+    cancel_clock(sessionId)
+    at = session_state.clock.next_transition()
+    if at is None or not session_state.model.isActive:
+        return
+    GD_CLOCK_TASKS[sessionId] = spawn(run_clock(sessionId, at), name=f"gd-clock-{sessionId}")
+
+def cancel_clock(sessionId: str):
+    task = GD_CLOCK_TASKS.pop(sessionId, None)
+    if task is not None and task is not asyncio.current_task():
+        task.cancel()
+
+async def run_clock(sessionId: str, at: float):
+    await asyncio.sleep(max(0.0, at - gd_clock.now()))
+    if GD_CLOCK_TASKS.get(sessionId) is asyncio.current_task():
+        del GD_CLOCK_TASKS[sessionId]
+    
+    # Re-read: another worker may have paused or resumed the session meanwhile
+    session_state = await GD_SESSIONS.get(sessionId)
+    if not session_state or not session_state.model.isActive:
+        return
+    snapshot = session_state.clock.snapshot()
+    await gd_events.publish(sessionId, "clock", snapshot)
+    
+    if snapshot["phase"] != "ended":
+        schedule_clock(sessionId, session_state)
+    elif GD_AUTO_END:
+        print(f"⏰ GD session {sessionId} reached its deadline, scoring now")
+        result = await generate_gd_end_summary(sessionId, session_state.model.userId, [])
+        if result is not None:
+            await gd_events.publish(sessionId, "ended", result)
+
+def clock_response(session_state: GdSessionState, status: str) -> dict:
+    return {"status": status, "pauseCount": session_state.pause_count, **session_state.clock.snapshot()}
 
 # ==== SESSION MANAGEMENT ====
 
-def start_gd_session(userId: int, topic: str, difficulty: str, duration: int = 600):
+async def start_gd_session(userId: int, topic: str, difficulty: str, duration: int = 600):
     """Initialize a new GD session"""
     sessionId = str(uuid.uuid4())
     
     # Generic User Name
     user_name = "User"
     
-    bots = [
-        {"name": "Alex", "personality": "Analytical"},
-        {"name": "Sarah", "personality": "Creative"},
-        {"name": "Mike", "personality": "Critical"}
-    ]
+    bots = [dict(b) for b in GD_BOTS]
     
     session_model = GdSession(
         sessionId=sessionId,
@@ -263,7 +614,8 @@ def start_gd_session(userId: int, topic: str, difficulty: str, duration: int = 6
     
     # Use wrapper for state management
     session_state = GdSessionState(session_model, duration, user_name)
-    GD_SESSIONS[sessionId] = session_state
+    await GD_SESSIONS.create(sessionId, session_state)
+    schedule_clock(sessionId, session_state)
     
     return {
         "sessionId": sessionId,
@@ -272,184 +624,297 @@ def start_gd_session(userId: int, topic: str, difficulty: str, duration: int = 6
         "duration": duration,
         "bots": bots,
         "userName": user_name,
+        "prepSeconds": session_state.clock.prep_seconds,
         "moderatorMessage": f"Topic: '{topic}'. Take 60 seconds to prepare, or start immediately."
     }
 
-def process_message(sessionId: str, userId: int, message: str, action: str = "speak"):
+def apply_turn(latest: GdSessionState, turn_state: GdSessionState, messages_at_load: int, pauses_at_load: int):
+    """
+    Carry a turn computed on an older revision over to the latest one. Scoring
+    and the clock only flip isActive and final_result, and a pause sent while
+    the bots were talking stands; a second turn that landed meanwhile is a
+    real conflict.
+    """
+    if len(latest.model.messages) != messages_at_load:
+        raise SessionConflict(latest.model.sessionId)
+    latest.model.messages = turn_state.model.messages
+    for field in ("turn_counts", "next_speaker", "last_speaker", "participation", "summary", "summarized_upto"):
+        setattr(latest, field, getattr(turn_state, field))
+    latest.clock.start()
+    if latest.pause_count == pauses_at_load:
+        latest.clock.resume()
+    latest.phase = latest.clock.phase()
+    latest._monitor = None
+
+async def process_message(sessionId: str, userId: int, message: str, action: str = "speak"):
     """
     Orchestrates the turn loop using GDMonitor.
     """
-    session_state = GD_SESSIONS.get(sessionId)
+    session_state = await GD_SESSIONS.get(sessionId)
     if not session_state:
         return None
     
-    # Handle pause action
-    if action == "pause":
-        session_state.pause_count += 1
-        return {"status": "paused", "pauseCount": session_state.pause_count}
-    
-    # Instantiating Monitor
-    monitor = GDMonitor(session_state)
-    
-    # CRITICAL FIX: If it was User's turn and they are acting now (speaking or silence break),
-    # we must clear the expectation that "User needs to speak".
-    if session_state.next_speaker == "user":
-        session_state.next_speaker = None
-
-    # Handle silence break
-    if action == "silence_break":
-        # Do not add a user message, just trigger a bot response
-        # Force a bot that didn't speak last to intervene
-        session_state.turn_counts["user"] += 0 # No turn taken
-        # Logic continues below to Turn Resolution, but we need to ensure chain starts
-    else:
-        # 1. Record User Message
-        msg_entry = {
-            "role": "user", 
-            "speaker": session_state.user_name,
-            "content": message, 
-            "timestamp": datetime.now().isoformat()
+    clock = session_state.clock
+    if not session_state.model.isActive or clock.phase() == "ended":
+        return {
+            "botMessages": [],
+            "nextSpeaker": "any",
+            "timeRemaining": 0,
+            "canConclude": True,
+            "shouldEndSession": True,
+            "turnCounts": session_state.turn_counts,
+            **clock.snapshot()
         }
-        session_state.model.messages.append(msg_entry)
-        session_state.turn_counts["user"] += 1
-        session_state.last_speaker = "user"
-    
-    # 2. Parse Handoff from User (if they spoke)
-    if action != "silence_break":
-        handoff_target = monitor.parse_handoff(message)
-        if handoff_target:
-            session_state.next_speaker = handoff_target
-    
-    # 3. Turn Resolution Loop
-    generated_messages = []
-    # Allow natural bot-to-bot conversation with random chain lengths
-    import random
-    MAX_CHAIN_LENGTH = random.randint(1, 3)
-    chain_count = 0
-    
-    while chain_count < MAX_CHAIN_LENGTH:
-        # Ask Monitor: Who is next?
-        next_speaker_name = monitor.decide_next_speaker()
+    
+    # Clock actions: the discussion stands still while paused
+    if action in ("pause", "resume", "start"):
+        if action == "pause":
+            if not clock.paused:
+                session_state.pause_count += 1
+            clock.pause()
+        elif action == "resume":
+            clock.resume()
+        else:
+            clock.start()
+        session_state.phase = clock.phase()
+        await GD_SESSIONS.save(sessionId, session_state)
+        schedule_clock(sessionId, session_state)
+        response = clock_response(session_state, {"pause": "paused", "resume": "resumed", "start": "started"}[action])
+        await gd_events.publish(sessionId, "clock", clock.snapshot())
+        return response
+    
+    # Speaking skips what is left of prep and ends a pause the client did not report
+    pauses_at_load = session_state.pause_count
+    clock.start()
+    clock.resume()
+    
+    # A reply prefetched for a silence break is only valid while the context is unchanged
+    speculation = SPECULATIONS.pop(sessionId, None)
+    if speculation is not None and action != "silence_break":
+        speculation.discard()
+        speculation = None
+    
+    monitor = session_state.monitor
+    
+    # Fold older messages into the rolling summary while the bots generate
+    summary_fold = None
+    messages_so_far = len(session_state.model.messages)
+    if messages_so_far - session_state.summarized_upto >= gd_participation.SUMMARY_FOLD_EVERY:
+        summary_fold = spawn(gd_participation.fold_summary(
+            session_state.model.topic, session_state.summary,
+            gd_participation.pending_lines(session_state.model.messages, session_state.summarized_upto)
+        ), name=f"gd-summary-fold-{sessionId}")
+    
+    try:
+        # Whether the user is answering a handoff or cutting in on a bot that had the floor
+        user_was_addressed = session_state.next_speaker == "user"
+        user_interrupted = session_state.next_speaker not in (None, "user")
+    
+        # CRITICAL FIX: If it was User's turn and they are acting now (speaking or silence break),
+        # we must clear the expectation that "User needs to speak".
+        if session_state.next_speaker == "user":
+            session_state.next_speaker = None
+
+        # Handle silence break
+        if action == "silence_break":
+            # Do not add a user message, just trigger a bot response
+            # Force a bot that didn't speak last to intervene
+            session_state.turn_counts["user"] += 0 # No turn taken
+            # Logic continues below to Turn Resolution, but we need to ensure chain starts
+        else:
+            # 1. Record User Message
+            messages = session_state.model.messages
+            gd_participation.record_user_turn(
+                session_state.participation, message, session_state.model.topic,
+                previous_at=messages[-1].get("timestamp") if messages else None,
+                addressed=user_was_addressed, interrupted=user_interrupted
+            )
+            msg_entry = {
+                "role": "user", 
+                "speaker": session_state.user_name,
+                "content": message, 
+                "timestamp": datetime.now().isoformat()
+            }
+            monitor.record(msg_entry)
+            session_state.turn_counts["user"] += 1
+            session_state.last_speaker = "user"
+    
+        # 2. Parse Handoff from User (if they spoke)
+        if action != "silence_break":
+            handoff_target = await monitor.parse_handoff(message)
+            if handoff_target:
+                session_state.next_speaker = handoff_target
+    
+        # 3. Turn Resolution Loop
+        generated_messages = []
+        stream_tokens = GD_STREAM_TOKENS and await gd_events.has_subscribers(sessionId)
+        # Allow natural bot-to-bot conversation with random chain lengths
+        import random
+        MAX_CHAIN_LENGTH = speculation.chain_length if speculation else random.randint(1, 3)
+        chain_count = 0
+    
+        while chain_count < MAX_CHAIN_LENGTH:
+            # Ask Monitor: Who is next?
+            next_speaker_name = monitor.decide_next_speaker(prefer=speculation.speaker if speculation else None)
         
-        # If Monitor says it's User's turn, we stop the bot chain
-        if next_speaker_name == "user":
-            session_state.next_speaker = "user" # Ensure frontend knows
-            break
+            # If Monitor says it's User's turn, we stop the bot chain
+            if next_speaker_name == "user":
+                session_state.next_speaker = "user" # Ensure frontend knows
+                break
             
-        # Otherwise, it's a Bot
-        bot = monitor.bots.get(next_speaker_name)
-        if not bot:
-            break # Should not happen
+            # Otherwise, it's a Bot
+            bot = monitor.bots.get(next_speaker_name)
+            if not bot:
+                break # Should not happen
             
-        # Prepare System Prompt Extras
-        prompt_override = ""
-        is_last_turn = (chain_count >= MAX_CHAIN_LENGTH - 1)
+            # Prepare System Prompt Extras
+            prompt_override = build_turn_prompt(session_state, action, chain_count, MAX_CHAIN_LENGTH)
+
+            # Generate Bot Content (and who it hands off to)
+            await gd_events.publish(sessionId, "typing", {"speaker": bot.name})
+            on_delta = None
+            if stream_tokens:
+                async def on_delta(text, reset=False, speaker=bot.name):
+                    await gd_events.publish(sessionId, "delta", {"speaker": speaker, "text": text, "reset": reset})
         
-        # Inject Silence Prompt if this is the first bot responding to a silence break
-        if action == "silence_break" and chain_count == 0:
-            prompt_override += " The User has been silent. Invite them into the conversation GENTLY (e.g. 'User, what are your thoughts?'), but DO NOT assume their opinion or reference nonexistent messages."
+            turn = None
+            if speculation is not None:
+                # Only the first reply of a silence break can have been prefetched
+                turn = await speculation.use(next_speaker_name, context_key(session_state), prompt_override)
+                speculation = None
+                if turn and on_delta:
+                    await on_delta(turn[0])
+            if turn is None and not session_state.model.messages:
+                turn = await OPENING_STATEMENTS.get(opening_key(session_state.model.topic, bot.name, bot.personality))
+                if turn and on_delta:
+                    await on_delta(turn[0])
+            if turn is None:
+                turn = await monitor.generate_bot_turn(bot, prompt_override, on_delta)
+            bot_response_text, bot_handoff = turn
         
-        if is_last_turn:
-            prompt_override += " This is the last message in this chain. Consider handing off to the User with a question (e.g., 'User, what's your take on this?'), OR make a strong concluding point that invites further discussion. Keep the conversation natural."
-
-        # Check for Time-Based Conclusion (Global check)
-        # We need to estimate time based on turns or check real time if object available
-        elapsed_check = (datetime.now() - session_state.start_time).total_seconds() - session_state.pause_duration
-        remaining_check = max(0, session_state.duration - int(elapsed_check))
+            # Record Bot Message
+            bot_msg_entry = {
+                "role": "bot",
+                "speaker": bot.name,
+                "content": bot_response_text,
+                "timestamp": datetime.now().isoformat()
+            }
+            monitor.record(bot_msg_entry)
+            session_state.turn_counts[bot.name.lower()] = session_state.turn_counts.get(bot.name.lower(), 0) + 1
+            session_state.last_speaker = bot.name.lower()
         
-        if remaining_check < 60:
-            prompt_override += " TIME WARNING: The session is almost over (< 60s). You MUST start concluding your points. Ask the User to provide their final conclusion."
-
-
-        # Generate Bot Content
-        bot_response_text = bot.generate_response(
-            topic=session_state.model.topic,
-            context_messages=session_state.model.messages,
-            system_prompt_extras=prompt_override
-        )
+            generated_messages.append({
+                "speaker": bot.name,
+                "text": bot_response_text,
+                "timestamp": bot_msg_entry["timestamp"]
+            })
         
-        # Record Bot Message
-        bot_msg_entry = {
-            "role": "bot",
-            "speaker": bot.name,
-            "content": bot_response_text,
-            "timestamp": datetime.now().isoformat()
-        }
-        session_state.model.messages.append(bot_msg_entry)
-        session_state.turn_counts[bot.name.lower()] = session_state.turn_counts.get(bot.name.lower(), 0) + 1
-        session_state.last_speaker = bot.name.lower()
+            # CRITICAL: Check if this Bot handed off to someone else
+            # This updates session_state.next_speaker, so the loop (or frontend) knows who's next.
+            if bot_handoff:
+                session_state.next_speaker = bot_handoff
         
-        generated_messages.append({
-            "speaker": bot.name,
-            "text": bot_response_text,
-            "timestamp": bot_msg_entry["timestamp"]
-        })
+            # Push the finished message now rather than when the whole chain is done
+            await gd_events.publish(sessionId, "message", {
+                **generated_messages[-1],
+                "turnCounts": session_state.turn_counts,
+                "nextSpeaker": session_state.next_speaker or "any",
+                "timeRemaining": clock.remaining()
+            })
         
-        # CRITICAL: Check if this Bot handed off to someone else
-        # This updates session_state.next_speaker, so the loop (or frontend) knows who's next.
-        bot_handoff = monitor.parse_handoff(bot_response_text)
-        if bot_handoff:
-            session_state.next_speaker = bot_handoff
             # IMMEDIATE BREAK: If bot handed off to User, stop the chain NOW
             if bot_handoff == "user":
+                gd_participation.record_addressed(session_state.participation)
                 break
             
-        chain_count += 1
-        
-        # Calculate time passed to inject "Conclusion" prompts
-        elapsed_now = (datetime.now() - session_state.start_time).total_seconds() - session_state.pause_duration
-        remaining = max(0, session_state.duration - int(elapsed_now))
-        
-        # If less than 60 seconds left, force next bot (if any) or this bot to conclude
-        if remaining < 60 and not is_last_turn:
-             # This prompt will affect next iteration's bot if we continue
-             pass 
-
-    # 4. Finalize Response
-    elapsed = (datetime.now() - session_state.start_time).total_seconds() - session_state.pause_duration
-    time_remaining = max(0, session_state.duration - int(elapsed))
-    in_conclusion_phase = time_remaining <= 120
-    
-    # Check for "Conclude" keyword in discussion phase (last 2 mins)
-    should_end_session = False
-    if in_conclusion_phase:
-        # Check user message
-        if re.search(r"i\s+(?:would like to\s+)?conclude", message.lower()):
-            should_end_session = True
-        # Check bot messages
-        for m in generated_messages:
-             if re.search(r"i\s+(?:would like to\s+)?conclude", m['text'].lower()):
-                 should_end_session = True
+            chain_count += 1
+            # (build_turn_prompt adds the time warning for the next bot once < 60s remain)
 
-    return {
+        # 4. Finalize Response
+        time_remaining = clock.remaining()
+        in_conclusion_phase = time_remaining <= CONCLUSION_SECONDS
+        session_state.phase = clock.phase()
+    
+        # Check for "Conclude" keyword in discussion phase (last 2 mins)
+        should_end_session = False
+        if in_conclusion_phase:
+            # Check user message
+            if re.search(r"i\s+(?:would like to\s+)?conclude", message.lower()):
+                should_end_session = True
+            # Check bot messages
+            for m in generated_messages:
+                 if re.search(r"i\s+(?:would like to\s+)?conclude", m['text'].lower()):
+                     should_end_session = True
+
+        if speculation is not None:
+            speculation.discard()
+    
+        if summary_fold is not None:
+            try:
+                summary = await summary_fold
+            except Exception:
+                summary = None  # already logged by the background task
+            if summary:
+                session_state.summary = summary
+                session_state.summarized_upto = messages_so_far
+    finally:
+        # Never leave the fold running if the turn failed before collecting it
+        if summary_fold is not None:
+            summary_fold.cancel()
+    
+    taken_over = False
+    try:
+        await GD_SESSIONS.save(sessionId, session_state)
+    except SessionConflict:
+        # Someone else saved while the bots were talking: replay the turn onto the latest revision
+        turn_state = session_state
+        def replay_turn(latest):
+            nonlocal taken_over
+            taken_over = not latest.model.isActive
+            if not taken_over:
+                apply_turn(latest, turn_state, messages_so_far, pauses_at_load)
+        latest = await GD_SESSIONS.update(sessionId, replay_turn)
+        if latest is None:
+            return None
+        if taken_over:
+            # The deadline fired while the bots were talking and scoring took the session over
+            should_end_session = True
+        else:
+            session_state, clock = latest, latest.clock
+    if not taken_over:
+        schedule_clock(sessionId, session_state)
+        start_speculation(sessionId, session_state)
+    
+    response = {
         "botMessages": generated_messages,
         "nextSpeaker": session_state.next_speaker or "any",
         "timeRemaining": int(time_remaining),
         "canConclude": in_conclusion_phase,
         "shouldEndSession": should_end_session,
-        "turnCounts": session_state.turn_counts
+        "turnCounts": session_state.turn_counts,
+        "phase": session_state.phase,
+        "deadline": clock.deadline()
     }
+    await gd_events.publish(sessionId, "turn", response)
+    return response
 
-def generate_comprehensive_score(sessionId: str, userId: int):
+async def generate_comprehensive_score(sessionId: str, userId: int):
     """Generate 6-metric scoring for GD performance with completion tracking"""
-    session_state = GD_SESSIONS.get(sessionId)
+    session_state = await GD_SESSIONS.get(sessionId)
     if not session_state:
         return None
     
-    # Extract user messages
-    user_messages = [m for m in session_state.model.messages if m.get("role") == "user"]
-    user_text = " | ".join([m.get("content", "") for m in user_messages])
-    
-    # All messages for context
-    all_discussion = "\n".join([
-        f"{m.get('speaker', 'Unknown')}: {m.get('content', '')}"
-        for m in session_state.model.messages
-    ])
+    # Bounded inputs: running aggregates, the rolling summary, its unsummarized tail
+    # and a sample of the user's own messages (never the whole transcript)
+    topic = session_state.model.topic
+    participation_lines = "\n    ".join(f"- {line}" for line in gd_participation.describe_participation(session_state.participation, topic))
+    recent_discussion = "\n    ".join(gd_participation.pending_lines(session_state.model.messages, session_state.summarized_upto))
+    user_excerpts = "\n    ".join(f"- {text}" for text in gd_participation.sample_user_messages(session_state.model.messages))
     
     pause_penalty = session_state.pause_count * 2
     
     # Calculate completion metrics
-    elapsed_time = (datetime.now() - session_state.start_time).total_seconds()
+    elapsed_time = session_state.clock.elapsed()
     session_duration_minutes = round(elapsed_time / 60)
     expected_duration_minutes = session_state.duration // 60  # Convert from seconds
     completion_percentage = min(100, round((elapsed_time / session_state.duration) * 100))
@@ -491,9 +956,16 @@ def generate_comprehensive_score(sessionId: str, userId: int):
     - Turns taken: {user_turns}
     - Pauses detected: {session_state.pause_count} (Penalty: -{pause_penalty} points)
     - Session duration: {session_duration_minutes}/{expected_duration_minutes} minutes ({completion_percentage}% of expected time)
+    {participation_lines}
+    
+    Summary of the Discussion:
+    {session_state.summary or "(no summary yet)"}
     
-    Transcript of Discussion:
-    {all_discussion}
+    Most Recent Exchanges:
+    {recent_discussion or "(none)"}
+    
+    The User's Own Messages:
+    {user_excerpts}
     
     CRITICAL SCORING INSTRUCTIONS:
     1. Focus PURELY on communication skills, confidence, leadership, and articulation.
@@ -521,7 +993,7 @@ def generate_comprehensive_score(sessionId: str, userId: int):
         {"role": "user", "content": scoring_prompt}
     ]
     
-    resp = get_gpt_response(messages, max_tokens=400)
+    resp = await aget_gpt_response(messages, max_tokens=400, priority="batch")
     
     if resp and 'choices' in resp:
         try:
@@ -578,9 +1050,9 @@ def generate_comprehensive_score(sessionId: str, userId: int):
     }
 
 # Keep existing functions for compatibility
-def generate_gd_feedback(sessionId: str, userId: int):
+async def generate_gd_feedback(sessionId: str, userId: int):
     """Legacy function - redirects to comprehensive scoring"""
-    scores = generate_comprehensive_score(sessionId, userId)
+    scores = await generate_comprehensive_score(sessionId, userId)
     if scores:
         return {
             "feedback": scores.get("feedback", ""),
@@ -593,31 +1065,44 @@ def generate_gd_feedback(sessionId: str, userId: int):
         "communicationQuality": 75
     }
 
-def generate_gd_end_summary(sessionId: str, userId: int, userMessages: list):
+async def load_final_result(sessionId: str) -> Optional[dict]:
+    session_state = await GD_SESSIONS.get(sessionId)
+    return session_state.final_result if session_state else None
+
+async def generate_gd_end_summary(sessionId: str, userId: int, userMessages: list):
     """Generate final summary using comprehensive scoring and save to DB"""
-    # IDEMPOTENCY CHECK
-    session_state = GD_SESSIONS.get(sessionId)
+    # IDEMPOTENCY CHECK: atomically mark the session inactive; whoever flips it owns scoring
+    claimed = False
+    def claim(state):
+        nonlocal claimed
+        claimed = state.model.isActive
+        state.model.isActive = False
+    session_state = await GD_SESSIONS.update(sessionId, claim)
+    discard_speculation(sessionId)
+    cancel_clock(sessionId)
     if not session_state:
         # If session is gone but we have a result logic, handle here. 
         # For now, just return None if session memory is wiped.
         return None
         
-    if not session_state.model.isActive:
+    if not claimed:
         print(f"⚠️ GD Session {sessionId} in progress/completed. Waiting for result...")
-        import time
-        for _ in range(30): # Wait up to 30 seconds
-            if hasattr(session_state, 'final_result') and session_state.final_result:
-                return session_state.final_result
-            time.sleep(1)
+        if session_state.final_result:
+            return session_state.final_result
+        result = await GD_COMPLETIONS.wait(sessionId, lambda: load_final_result(sessionId))
+        if result is not None:
+            return result
         return {"error": "Session completion timed out"}
 
-    scores = generate_comprehensive_score(sessionId, userId)
+    scores = await generate_comprehensive_score(sessionId, userId)
     if not scores:
+        # Release the claim so a retry can score the session
+        await GD_SESSIONS.update(sessionId, lambda state: setattr(state.model, "isActive", True))
+        GD_COMPLETIONS.discard(sessionId)
         return None
         
     # PERSISTENCE: Save to Firestore
     try:
-        session_state = GD_SESSIONS.get(sessionId)
         topic = session_state.model.topic if session_state else "Unknown Topic"
         
         # completionMetrics is inside scores from generate_comprehensive_score
@@ -641,7 +1126,7 @@ def generate_gd_end_summary(sessionId: str, userId: int, userMessages: list):
         )
         
         print(f"💾 Automatically saving GD result for session {sessionId}")
-        save_result(gd_res)
+        await asyncio.to_thread(save_result, gd_res)
         
         # Add ID to return value
         scores["id"] = gd_res.id
@@ -650,10 +1135,9 @@ def generate_gd_end_summary(sessionId: str, userId: int, userMessages: list):
         print(f"❌ Failed to auto-save GD result: {e}")
         
     # Cache result for idempotency
-    if session_state:
-        session_state.final_result = scores
-        # Mark as inactive to trigger the check next time
-        session_state.model.isActive = False
+    session_state.final_result = scores
+    await GD_SESSIONS.update(sessionId, lambda state: setattr(state, "final_result", scores))
+    GD_COMPLETIONS.publish(sessionId, scores)
         
     return scores
 
@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+HANDOFF_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "handoff_model.json")
+
+# Classifier band where the local decision is not trusted and the LLM may be asked
+HANDOFF_ACCEPT_THRESHOLD = float(os.getenv("HANDOFF_ACCEPT_THRESHOLD", "0.8"))
+HANDOFF_REJECT_THRESHOLD = float(os.getenv("HANDOFF_REJECT_THRESHOLD", "0.2"))
+
+REQUEST_VERBS = r"ask|asking|hear from|hearing from|turn to|over to|pass(?: it)? to|invite|inviting|back to"
+THIRD_PERSON_AFTER = re.compile(
+    r"^\s*(?:'s\b|said|says|mentioned|mentions|made|makes|thinks|thought|believes|raised|pointed|argued|has|had|is|was|just|also|and)\b"
+)
+PREPOSITION_BEFORE = re.compile(
+    r"\b(?:with|like|as|to what|from what|according to|than|about|agree with|disagree with|and)\s*$"
+)
+YOU_WORDS = re.compile(r"\b(?:you|your|yours)\b")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+# Fallback regex families (kept from the original monitor)
+FALLBACK_PATTERNS = [
+    r"(what|how).{{0,50}}\b({names})\b",
+    r"i'd (ask|like to hear from|turn to)\s*({names})",
+    r"\b({names})\b.{{0,20}}(your|you) (thought|opinion|view|take)",
+]
+
+FEATURES = [
+    "bias",
+    "followed_by_comma",
+    "followed_by_question",
+    "preceded_by_comma",
+    "sentence_start",
+    "in_last_sentence",
+    "sentence_is_question",
+    "request_verb_before",
+    "you_in_sentence",
+    "third_person_after",
+    "preposition_before",
+    "message_is_question",
+    "relative_position",
+]
+
+
+class HandoffDecision:
+    def __init__(self, target: Optional[str], confidence: float, source: str):
+        self.target = target
+        self.confidence = confidence
+        self.source = source
+
+    @property
+    def ambiguous(self) -> bool:
+        return self.source == "classifier" and HANDOFF_REJECT_THRESHOLD < self.confidence < HANDOFF_ACCEPT_THRESHOLD
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase and collapse whitespace (the text every feature is computed on)"""
+    return " ".join(message.lower().split())
+
+def mention_features(text: str, start: int, end: int) -> List[float]:
+    """Features of one participant-name mention at text[start:end] (text is normalize_message()'d)"""
+    before = text[:start]
+    after = text[end:]
+    sentence_start = max(before.rfind(". "), before.rfind("? "), before.rfind("! "))
+    sentence_start = 0 if sentence_start < 0 else sentence_start + 2
+    sentence_end_match = re.search(r"[.!?]", after)
+    sentence_end = end + sentence_end_match.end() if sentence_end_match else len(text)
+    sentence = text[sentence_start:sentence_end]
+    stripped_after = after.lstrip()
+    stripped_before = before.rstrip()
+    last_sentence = SENTENCE_SPLIT.split(text.strip())[-1] if text.strip() else ""
+
+    return [
+        1.0,
+        float(stripped_after.startswith(",")),
+        float(stripped_after.startswith("?")),
+        float(stripped_before.endswith(",")),
+        float(not text[sentence_start:start].strip()),
+        float(start >= len(text) - len(last_sentence)),
+        float(sentence.rstrip().endswith("?")),
+        float(re.search(rf"\b(?:{REQUEST_VERBS})\s*$", before[-25:]) is not None),
+        float(YOU_WORDS.search(sentence) is not None),
+        float(THIRD_PERSON_AFTER.match(after) is not None),
+        float(PREPOSITION_BEFORE.search(before[-20:]) is not None),
+        float("?" in text),
+        start / max(len(text), 1),
+    ]
+
+
+@lru_cache(maxsize=1)
+def load_weights() -> Optional[List[float]]:
+    """Weights trained offline by train_handoff_model.py (None if the file is missing)"""
+    try:
+        with open(HANDOFF_MODEL_PATH, "r", encoding="utf-8") as f:
+            model = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Handoff model unavailable ({e}), using patterns only")
+        return None
+    if model.get("features") != FEATURES:
+        print("⚠️ Handoff model features do not match, retrain with train_handoff_model.py")
+        return None
+    return model["weights"]
+
+def score(features: List[float], weights: List[float]) -> float:
+    z = sum(f * w for f, w in zip(features, weights))
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class HandoffDetector:
+    """
+    Deterministic addressee detection over a fixed set of participant names:
+    1. one precompiled vocative pattern set ("Sarah, ...", "..., Mike?", "ask Alex")
+    2. a logistic classifier over features of each name mention
+    3. the original fallback regex families
+    The last matching mention wins, since handoffs usually close a message.
+    """
+    def __init__(self, participants: Tuple[str, ...]):
+        self.participants = participants
+        names = "|".join(re.escape(p) for p in sorted(participants, key=len, reverse=True))
+        vocatives = [
+            rf"(?:^|[.!?]\s+)(?P<v0>{names})\s*,",           # sentence-initial: "Sarah, what do you think"
+            rf"\b(?P<v1>{names})\s*\?",                     # "right, Mike?"
+            rf",\s*(?P<v2>{names})\s*[.!]?\s*$",            # trailing: "..., Alex."
+            rf"\b(?:{REQUEST_VERBS})\s+(?P<v3>{names})\b",  # "I'd like to ask Sarah"
+            rf"@(?P<v4>{names})\b",
+        ]
+        self.vocative_re = re.compile("|".join(vocatives))
+        self.mention_re = re.compile(rf"\b({names})\b")
+        self.fallback_res = [re.compile(p.format(names=names)) for p in FALLBACK_PATTERNS]
+
+    def detect(self, message: str) -> HandoffDecision:
+        text = normalize_message(message)
+        if not text:
+            return HandoffDecision(None, 1.0, "none")
+
+        matches = list(self.vocative_re.finditer(text))
+        if matches:
+            last = matches[-1]
+            return HandoffDecision(next(g for g in last.groups() if g), 1.0, "pattern")
+
+        mentions = list(self.mention_re.finditer(text))
+        if not mentions:
+            return HandoffDecision(None, 1.0, "none")
+
+        weights = load_weights()
+        if weights is not None:
+            best_name, best_p = None, 0.0
+            for m in mentions:
+                p = score(mention_features(text, m.start(), m.end()), weights)
+                if p >= best_p:
+                    best_name, best_p = m.group(1), p
+            if best_p >= HANDOFF_ACCEPT_THRESHOLD:
+                return HandoffDecision(best_name, best_p, "classifier")
+            if best_p > HANDOFF_REJECT_THRESHOLD:
+                # Ambiguous: callers may consult the LLM, else use the fallback regexes
+                return HandoffDecision(self._fallback(text), best_p, "classifier")
+            return HandoffDecision(None, 1.0 - best_p, "classifier")
+
+        fallback = self._fallback(text)
+        return HandoffDecision(fallback, 0.5, "fallback_regex" if fallback else "none")
+
+    def _fallback(self, text: str) -> Optional[str]:
+        for pattern in self.fallback_res:
+            match = pattern.search(text)
+            if match:
+                for name in self.participants:
+                    if re.search(rf"\b{re.escape(name)}\b", match.group(0)):
+                        return name
+        return None
+
+
+@lru_cache(maxsize=32)
+def get_detector(participants: Tuple[str, ...]) -> HandoffDetector:
+    return HandoffDetector(participants)
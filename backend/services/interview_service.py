@@ -1,49 +1,92 @@
 import os
 import json
-import requests
+import asyncio
 import uuid
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from models import InterviewSession, InterviewResult
 from datetime import datetime
+from contextlib import aclosing
+from typing import Dict, Optional
 from dotenv import load_dotenv
 from firebase_config import firestore_client
+from services.llm_client import aget_gpt_response, astream_gpt_response, llm_priority, GPT_FULL_MODEL, GPT_MINI_MODEL
+from services.json_stream import JsonObjectStreamer
+from services.background import spawn
+from services.pool import RefillPool
+from services.session_store import SessionStore
+from services.completion import CompletionRegistry
 
 # Load environment variables
 load_dotenv()
 
+# Idle sessions are evicted after INTERVIEW_SESSION_TTL seconds (oldest first beyond the cap)
+INTERVIEW_SESSION_TTL = float(os.getenv("INTERVIEW_SESSION_TTL", "7200"))
+INTERVIEW_SESSION_MAX = int(os.getenv("INTERVIEW_SESSION_MAX", "5000"))
+
+def release_session_tasks(sessionId: str):
+    """Drop the process-local background work attached to a session"""
+    for task in ANSWER_EVALUATION_TASKS.pop(sessionId, {}).values():
+        task.cancel()
+    task = QUESTION_GENERATION_TASKS.pop(sessionId, None)
+    if task is not None:
+        task.cancel()
+    INTERVIEW_COMPLETIONS.discard(sessionId)
+
+# Duplicate end requests await the evaluating request's result
+INTERVIEW_COMPLETIONS = CompletionRegistry("interview")
+
 # Global In-Memory Storage (Sessions only - Results go to Firestore)
-INTERVIEW_SESSIONS = {}
-
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
-GPT_FULL_MODEL = os.getenv("GPT_FULL_MODEL")
-GPT_MINI_MODEL = os.getenv("GPT_MINI_MODEL")
-
-def get_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=1500):
-    """Call Azure OpenAI API"""
-    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY:
-        return None 
-    url = f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
-    headers = {
-        "api-key": AZURE_OPENAI_KEY,
-        "Content-Type": "application/json"
-    }
-    body = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": max_tokens
-    }
-    try:
-        r = requests.post(url, headers=headers, json=body, timeout=60)
-        return r.json()
-    except Exception as e:
-        print(f"GPT Error: {e}")
-        return None
+INTERVIEW_SESSIONS = SessionStore("interview", INTERVIEW_SESSION_TTL, INTERVIEW_SESSION_MAX, on_evict=release_session_tasks)
+
+# ==== QUESTION POOLS ====
+
+# Generic (no-resume) question sets are generated ahead of time per (type, difficulty, role)
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", "2"))
+QUESTION_POOL_LOW_WATERMARK = int(os.getenv("QUESTION_POOL_LOW_WATERMARK", "1"))
+QUESTION_POOL_WARM_ON_STARTUP = os.getenv("QUESTION_POOL_WARM_ON_STARTUP", "true").lower() == "true"
+DEFAULT_JOB_ROLE = "Software Engineer"
+INTERVIEW_TYPES = ["technical", "hr", "behavioral"]
+DIFFICULTY_LEVELS = ["junior", "mid", "senior"]
+
+MIN_QUESTIONS = 8
+MAX_QUESTIONS = 12
+DEFAULT_QUESTION_COUNT = 10
+
+# Background generation for sessions that started before their questions were ready (process-local)
+QUESTION_GENERATION_TASKS: Dict[str, asyncio.Task] = {}
+QUESTION_GENERATION_TIMEOUT = float(os.getenv("QUESTION_GENERATION_TIMEOUT", "30"))
+QUESTION_POLL_INTERVAL = 0.5
 
-def start_new_session(userId: int, interviewType: str, difficulty: str, mode: str, jobRole: str = "Software Engineer", resumeData: dict = None):
+def question_pool_key(interview_type: str, difficulty: str, job_role: str = None) -> tuple:
+    role = " ".join((job_role or DEFAULT_JOB_ROLE).split()).lower()
+    return (interview_type.lower(), difficulty.lower(), role)
+
+async def produce_question_set(key: tuple) -> Optional[list]:
+    interview_type, difficulty, job_role = key
+    return await request_question_texts(interview_type, difficulty, job_role)
+
+QUESTION_POOL = RefillPool(
+    "interview-questions",
+    produce_question_set,
+    target=QUESTION_POOL_TARGET,
+    low_watermark=QUESTION_POOL_LOW_WATERMARK
+)
+
+def warm_question_pools():
+    """Fill the generic pools for the default role (called on application startup)"""
+    if QUESTION_POOL_WARM_ON_STARTUP:
+        QUESTION_POOL.warm(
+            question_pool_key(t, d)
+            for t in INTERVIEW_TYPES
+            for d in DIFFICULTY_LEVELS
+        )
+
+def to_question_list(texts: list) -> list:
+    return [{"id": str(uuid.uuid4()), "text": q} for q in texts]
+
+async def start_new_session(userId: int, interviewType: str, difficulty: str, mode: str, jobRole: str = DEFAULT_JOB_ROLE, resumeData: dict = None):
     """
     Start a new AI-powered interview session
     
@@ -56,10 +99,22 @@ def start_new_session(userId: int, interviewType: str, difficulty: str, mode: st
         resumeData: Optional resume data from Resume Analyzer
     """
     sessionId = str(uuid.uuid4())
+    jobRole = jobRole or DEFAULT_JOB_ROLE
+    
+    questions = None
+    if not resumeData:
+        # Generic session: take a pre-generated set (refilled in the background)
+        texts = QUESTION_POOL.pop(question_pool_key(interviewType, difficulty, jobRole))
+        if texts:
+            print(f"⚡ Using pooled interview questions: {interviewType} / {difficulty} level for {jobRole}")
+            questions = to_question_list(texts)
     
-    # Generate dynamic questions using GPT-4 Full
-    print(f"🎯 Generating interview questions: {interviewType} / {difficulty} level for {jobRole}")
-    questions = generate_questions(interviewType, difficulty, resumeData)
+    pending = questions is None
+    if pending:
+        # Resume-specific (or pool empty): open with a ready question and generate
+        # the rest with GPT-4 Full while the candidate greets and answers
+        print(f"🎯 Generating interview questions: {interviewType} / {difficulty} level for {jobRole}")
+        questions = [get_opening_question(interviewType, difficulty)]
     
     # Create session
     session = {
@@ -68,31 +123,115 @@ def start_new_session(userId: int, interviewType: str, difficulty: str, mode: st
         "interviewType": interviewType,
         "difficulty": difficulty,
         "mode": mode,
+        "jobRole": jobRole,
         "resumeData": resumeData,
         "questions": questions,
         "answers": [],
         "greetingGiven": False,
         "greetingBonus": 0,
         "currentQuestionIndex": 0,
+        "questionsPending": pending,
         "isComplete": False,
         "startTime": datetime.now().isoformat()
     }
     
-    INTERVIEW_SESSIONS[sessionId] = session
+    await INTERVIEW_SESSIONS.create(sessionId, session)
+    if pending:
+        QUESTION_GENERATION_TASKS[sessionId] = spawn(
+            generate_remaining_questions(session, resumeData),
+            name=f"interview-questions-{sessionId}"
+        )
     
     return {
         "sessionId": sessionId,
-        "totalQuestions": len(questions),
+        "totalQuestions": expected_question_count(session),
         "greetingPrompt": "You may greet the interviewer to start. For example: 'Good morning, sir!'",
         "interviewType": interviewType,
         "difficulty": difficulty,
         "mode": mode
     }
 
-def generate_questions(interview_type: str, difficulty: str, resume_data: dict = None) -> list:
+async def generate_questions(interview_type: str, difficulty: str, resume_data: dict = None, job_role: str = DEFAULT_JOB_ROLE) -> list:
     """
     Use GPT-4 Full to generate 8-12 dynamic interview questions
     """
+    texts = await request_question_texts(interview_type, difficulty, job_role, resume_data)
+    if texts:
+        return to_question_list(texts)
+    
+    # Fallback to predefined questions
+    return get_fallback_questions(interview_type, difficulty)
+
+def get_opening_question(interview_type: str, difficulty: str) -> dict:
+    """First question for a lazily generated session, from the fallback bank (pooled sets are only ever popped whole)"""
+    return get_fallback_questions(interview_type, difficulty)[0]
+
+async def generate_remaining_questions(session: dict, resume_data: dict = None):
+    """Fill in questions after the opener; readers wait on this via wait_for_question"""
+    sessionId = session["sessionId"]
+    try:
+        texts = await request_question_texts(session["interviewType"], session["difficulty"], session["jobRole"], resume_data)
+        if not texts:
+            texts = [q["text"] for q in get_fallback_questions(session["interviewType"], session["difficulty"])]
+        await INTERVIEW_SESSIONS.update(sessionId, lambda latest: complete_questions(latest, texts))
+    finally:
+        QUESTION_GENERATION_TASKS.pop(sessionId, None)
+
+def complete_questions(session: dict, texts: list):
+    # A reader that gave up waiting may already have completed the list
+    if session.get("questionsPending"):
+        extend_questions(session, texts)
+        session["questionsPending"] = False
+
+def extend_questions(session: dict, texts: list):
+    asked = {q["text"].lower() for q in session["questions"]}
+    room = MAX_QUESTIONS - len(session["questions"])
+    fresh = [t for t in texts if t.lower() not in asked][:room]
+    session["questions"].extend(to_question_list(fresh))
+
+def expected_question_count(session: dict) -> int:
+    """Question total for progress; an estimate while generation is still running"""
+    if session.get("questionsPending"):
+        return max(len(session["questions"]), DEFAULT_QUESTION_COUNT)
+    return len(session["questions"])
+
+async def wait_for_question(sessionId: str, session: dict, index: int) -> dict:
+    """
+    Return the session once question `index` exists or the question list is
+    final, waiting for background generation only if the candidate got ahead
+    of it. Generation may run on another worker, so that case polls the store.
+    """
+    if index < len(session["questions"]) or not session.get("questionsPending"):
+        return session
+    
+    task = QUESTION_GENERATION_TASKS.get(sessionId)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + QUESTION_GENERATION_TIMEOUT
+    if task is not None:
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=QUESTION_GENERATION_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    else:
+        while loop.time() < deadline:
+            await asyncio.sleep(QUESTION_POLL_INTERVAL)
+            latest = await INTERVIEW_SESSIONS.get(sessionId)
+            if latest is None or index < len(latest["questions"]) or not latest.get("questionsPending"):
+                break
+    
+    latest = await INTERVIEW_SESSIONS.get(sessionId) or session
+    if latest.get("questionsPending") and index >= len(latest["questions"]):
+        # Stop waiting on the model: continue from the fallback bank
+        print(f"⚠️ Question generation timed out for session {sessionId}, using fallback questions")
+        fallback = [q["text"] for q in get_fallback_questions(latest["interviewType"], latest["difficulty"])]
+        latest = await INTERVIEW_SESSIONS.update(sessionId, lambda s: complete_questions(s, fallback)) or latest
+    return latest
+
+async def request_question_texts(interview_type: str, difficulty: str, job_role: str = DEFAULT_JOB_ROLE, resume_data: dict = None) -> Optional[list]:
+    """
+    Ask GPT-4 Full for a question set; returns a validated list of 8-12
+    question strings, or None if the response was unusable
+    """
     # Build context from resume if available
     resume_context = ""
     if resume_data:
@@ -100,13 +239,13 @@ def generate_questions(interview_type: str, difficulty: str, resume_data: dict =
         experience = resume_data.get("parsedData", {}).get("experience", "")
         resume_context = f"\nCandidate's Skills: {', '.join(skills[:10])}\nExperience: {experience[:200]}"
     
-    prompt = f"""You are an expert interviewer conducting a {interview_type.upper()} interview at {difficulty.upper()} level.
+    prompt = f"""You are an expert interviewer conducting a {interview_type.upper()} interview at {difficulty.upper()} level for a {job_role} position.
 
 {resume_context}
 
 TASK: Generate 8-12 high-quality interview questions that:
 1. Match the {difficulty} difficulty level (junior=easier, senior=harder)
-2. Focus on {interview_type} topics
+2. Focus on {interview_type} topics relevant to the {job_role} role
 3. Include resume-specific questions if resume data is provided
 4. Progress from easier to harder
 5. Test real-world skills and understanding
@@ -132,30 +271,34 @@ JSON Response:"""
             {"role": "user", "content": prompt}
         ]
         
-        resp = get_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=1000)
+        resp = await aget_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=1000)
         if resp and 'choices' in resp:
-            content = resp['choices'][0]['message']['content'].strip()
-            
-            # Clean markdown
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            questions_list = json.loads(content)
-            
-            # Ensure 8-12 questions
-            if len(questions_list) < 8:
-                questions_list = questions_list + get_fallback_questions(interview_type, difficulty)[:(8-len(questions_list))]
-            elif len(questions_list) > 12:
-                questions_list = questions_list[:12]
-            
-            return [{"id": str(uuid.uuid4()), "text": q} for q in questions_list]
+            questions_list = parse_json_content(resp['choices'][0]['message']['content'])
+            return validate_question_texts(questions_list, interview_type, difficulty)
     except Exception as e:
         print(f"Question generation error: {e}")
     
-    # Fallback to predefined questions
-    return get_fallback_questions(interview_type, difficulty)
+    return None
+
+def validate_question_texts(questions_list, interview_type: str, difficulty: str) -> Optional[list]:
+    if not isinstance(questions_list, list):
+        return None
+    
+    # Keep distinct, non-empty strings only
+    seen = set()
+    texts = []
+    for q in questions_list:
+        if isinstance(q, str) and q.strip() and q.strip().lower() not in seen:
+            seen.add(q.strip().lower())
+            texts.append(q.strip())
+    if not texts:
+        return None
+    
+    # Ensure 8-12 questions
+    if len(texts) < MIN_QUESTIONS:
+        fallback = [q["text"] for q in get_fallback_questions(interview_type, difficulty)]
+        texts = texts + [q for q in fallback if q.lower() not in seen][:(MIN_QUESTIONS - len(texts))]
+    return texts[:MAX_QUESTIONS]
 
 def get_fallback_questions(interview_type: str, difficulty: str) -> list:
     """Fallback questions if AI generation fails"""
@@ -243,11 +386,11 @@ def get_fallback_questions(interview_type: str, difficulty: str) -> list:
     
     return [{"id": str(uuid.uuid4()), "text": q} for q in selected]
 
-def process_greeting(sessionId: str, message: str):
+async def process_greeting(sessionId: str, message: str):
     """
     Process user's greeting and award bonus points
     """
-    session = INTERVIEW_SESSIONS.get(sessionId)
+    session = await INTERVIEW_SESSIONS.get(sessionId)
     if not session:
         return {"error": "Session not found"}
     
@@ -269,14 +412,23 @@ def process_greeting(sessionId: str, message: str):
     is_professional = any(term in msg_lower for term in professional_terms)
     
     if is_greeting:
-        session["greetingGiven"] = True
         if is_professional:
-            session["greetingBonus"] = 5  # Extra points for professional greeting
+            bonus = 5  # Extra points for professional greeting
             response = "Good morning! I appreciate your professionalism. Let's get started with the interview."
         else:
-            session["greet ingBonus"] = 2  # Basic greeting
+            bonus = 2  # Basic greeting
             response = "Hello! Let's begin the interview."
         
+        def record_greeting(latest):
+            # Background question generation may have saved in the meantime: apply to the latest revision
+            if not latest["greetingGiven"]:
+                latest["greetingGiven"] = True
+                latest["greetingBonus"] = bonus
+        
+        session = await INTERVIEW_SESSIONS.update(sessionId, record_greeting)
+        if not session:
+            return {"error": "Session not found"}
+        
         return {
             "acknowledged": True,
             "response": response,
@@ -286,38 +438,58 @@ def process_greeting(sessionId: str, message: str):
         }
     else:
         # Not a greeting, treat as first answer
-        return process_answer(sessionId, message)
+        return await process_answer(sessionId, message)
 
-def process_answer(sessionId: str, answer: str):
+async def process_answer(sessionId: str, answer: str):
     """
     Process user's answer and move to next question
     """
-    session = INTERVIEW_SESSIONS.get(sessionId)
+    session = await INTERVIEW_SESSIONS.get(sessionId)
     if not session:
         return {"error": "Session not found"}
     
     idx = session["currentQuestionIndex"]
     
-    if idx >= len(session["questions"]):
+    # Make sure both this question and the next one are known before changing anything
+    session = await wait_for_question(sessionId, session, idx + 1)
+    questions = session["questions"]
+    if idx >= len(questions):
         return {"error": "Interview already complete"}
     
-    # Record answer
-    current_question = session["questions"][idx]
-    session["answers"].append({
-        "questionId": current_question["id"],
-        "questionText": current_question["text"],
-        "userAnswer": answer,
-        "timestamp": datetime.now().isoformat()
-    })
+    recorded = []
+    timestamp = datetime.now().isoformat()
+    
+    def record_answer(latest):
+        # Applied to the latest revision: background generation and evaluations save the same session.
+        # If another request already answered this question, leave the session as it is.
+        if latest["currentQuestionIndex"] != idx or idx >= len(latest["questions"]):
+            return
+        current_question = latest["questions"][idx]
+        latest["answers"].append({
+            "questionId": current_question["id"],
+            "questionText": current_question["text"],
+            "userAnswer": answer,
+            "timestamp": timestamp
+        })
+        latest["currentQuestionIndex"] += 1
+        
+        # Check if interview is complete
+        if latest["currentQuestionIndex"] >= len(latest["questions"]):
+            latest["isComplete"] = True
+        recorded.append(len(latest["answers"]) - 1)
     
-    session["currentQuestionIndex"] += 1
+    session = await INTERVIEW_SESSIONS.update(sessionId, record_answer)
+    if not session:
+        return {"error": "Session not found"}
+    questions = session["questions"]
+    is_complete = session["currentQuestionIndex"] >= len(questions)
+    if recorded:
+        queue_answer_evaluation(sessionId, session, recorded[-1])
     
     # Calculate progress
-    progress = (session["currentQuestionIndex"] / len(session["questions"])) * 100
+    progress = (session["currentQuestionIndex"] / expected_question_count(session)) * 100
     
-    # Check if interview is complete
-    if session["currentQuestionIndex"] >= len(session["questions"]):
-        session["isComplete"] = True
+    if is_complete:
         return {
             "isComplete": True,
             "progress": 100,
@@ -335,43 +507,157 @@ def process_answer(sessionId: str, answer: str):
     
     import random
     ack = random.choice(acknowledgments)
-    next_question = session["questions"][session["currentQuestionIndex"]]["text"]
+    next_question = questions[session["currentQuestionIndex"]]
     
     return {
         "isComplete": False,
         "acknowledgment": ack,
-        "nextQuestion": next_question,
+        "nextQuestion": next_question["text"],
         "questionNumber": session["currentQuestionIndex"] + 1,
         "progress": round(progress, 1)
     }
 
-def end_interview(sessionId: str, userId: int):
+async def end_interview(sessionId: str, userId: int):
     """
-    End interview and generate comprehensive results with completion tracking
+    End interview and generate comprehensive results with completion tracking.
+    Per-answer evaluations were queued by process_answer, so this only merges
+    them and runs one small synthesis call.
     """
-    session = INTERVIEW_SESSIONS.get(sessionId)
+    session, claimed = await claim_evaluation(sessionId)
     if not session:
         return {"error": "Session not found"}
     
-    # IDEMPOTENCY CHECK with POLLING
-    # If session is marked complete but result isn't ready, wait for it (handle race condition)
-    if session.get("isComplete"):
-        print(f"⚠️ Session {sessionId} in progress or completed. Waiting for result...")
-        import time
-        for _ in range(30):  # Wait up to 30 seconds
-            if "finalResult" in session:
-                return session["finalResult"]
-            time.sleep(1)
+    # IDEMPOTENCY CHECK: another request already owns evaluation, wait for its result
+    if not claimed:
+        return await wait_for_final_result(sessionId)
+    
+    try:
+        if session["mode"] == "graded":
+            result = await generate_graded_results(session)
+        else:  # practice mode
+            result = await generate_practice_results(session)
         
-        # If still no result after timeout, check if we should proceed or error
-        # If we return error here, it's a 404 which breaks UI.
-        # Ideally, we return the session state or a "processing" message, but frontend expects result.
-        # Fallback: try to return what we have or just error gracefully.
-        return {"error": "Session completion timed out"}
+        return await finalize_interview(sessionId, userId, session, result)
+    except Exception:
+        await release_evaluation(sessionId)
+        raise
 
-    # Mark as complete immediately to block other requests
-    session["isComplete"] = True
+async def stream_end_interview(sessionId: str, userId: int):
+    """
+    Streaming variant of end_interview. Yields (event, data) pairs:
+    one "questionBreakdown" per answer as its evaluation is ready, then
+    "overallFeedback" and "metrics" as the synthesis call streams them,
+    then "result" with the persisted final result.
+
+    Evaluation runs in a background task that feeds a queue, so the result is
+    still persisted (and cached for idempotency) if the client disconnects.
+    """
+    session, claimed = await claim_evaluation(sessionId)
+    if not session:
+        yield "error", {"error": "Session not found"}
+        return
+    
+    if not claimed:
+        result = await wait_for_final_result(sessionId)
+        if "error" in result:
+            yield "error", result
+            return
+        for item in result.get("questionBreakdown", []):
+            yield "questionBreakdown", item
+        for event in ("overallFeedback", "metrics"):
+            if event in result:
+                yield event, result[event]
+        yield "result", result
+        return
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    spawn(_stream_evaluation(sessionId, userId, session, queue), name=f"interview-end-{sessionId}")
     
+    while True:
+        event, data = await queue.get()
+        yield event, data
+        if event in ("result", "error"):
+            return
+
+async def _stream_evaluation(sessionId: str, userId: int, session: dict, queue: asyncio.Queue):
+    """Producer for stream_end_interview: merges answer evaluations, streams the synthesis and persists"""
+    graded = session["mode"] == "graded"
+    try:
+        if not session.get("answers"):
+            result = get_fallback_evaluation(session, graded=graded)
+        else:
+            evaluations = []
+            for index in range(len(session["answers"])):
+                evaluation = await get_answer_evaluation(sessionId, session, index)
+                evaluations.append(evaluation)
+                await queue.put(("questionBreakdown", build_breakdown_item(session, index, evaluation, graded)))
+            
+            synthesis = None
+            if any(evaluations):
+                streamer = JsonObjectStreamer()
+                messages = build_synthesis_messages(session, evaluations, graded)
+                async with aclosing(astream_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=SYNTHESIS_MAX_TOKENS, priority="interactive")) as stream:
+                    async for delta in stream:
+                        for key, _, value in streamer.feed(delta):
+                            if key in ("overallFeedback", "metrics"):
+                                await queue.put((key, value))
+                try:
+                    synthesis = streamer.result()
+                except ValueError as e:
+                    print(f"Evaluation synthesis error: {e}")
+            result = assemble_results(session, evaluations, synthesis, graded)
+        
+        result = await finalize_interview(sessionId, userId, session, result)
+        await queue.put(("result", result))
+    except Exception as e:
+        print(f"❌ Streaming evaluation failed: {e}")
+        await publish_final_result(sessionId, session, get_fallback_evaluation(session, graded=graded))
+        await queue.put(("error", {"error": "Evaluation failed"}))
+
+async def claim_evaluation(sessionId: str):
+    """
+    Atomically mark the session as being evaluated. Returns (session, claimed);
+    claimed is False if another request (possibly on another worker) got there first.
+    isComplete alone is not enough: process_answer sets it after the last answer.
+    """
+    claimed = False
+    def claim(session):
+        nonlocal claimed
+        claimed = not session.get("evaluationStarted")
+        session["isComplete"] = True
+        session["evaluationStarted"] = True
+    session = await INTERVIEW_SESSIONS.update(sessionId, claim)
+    return session, claimed
+
+async def release_evaluation(sessionId: str):
+    """Give up the evaluation claim after a failure: waiters stop waiting and a retry can evaluate"""
+    INTERVIEW_COMPLETIONS.discard(sessionId)
+    await INTERVIEW_SESSIONS.update(sessionId, lambda latest: latest.__setitem__("evaluationStarted", False))
+
+async def publish_final_result(sessionId: str, session: dict, result: dict):
+    session["finalResult"] = result
+    await INTERVIEW_SESSIONS.update(sessionId, lambda latest: latest.__setitem__("finalResult", result))
+    INTERVIEW_COMPLETIONS.publish(sessionId, result)
+
+async def load_final_result(sessionId: str) -> Optional[dict]:
+    session = await INTERVIEW_SESSIONS.get(sessionId)
+    return session.get("finalResult") if session else None
+
+async def wait_for_final_result(sessionId: str) -> dict:
+    """Wait for the request that owns evaluation to publish finalResult"""
+    print(f"⚠️ Session {sessionId} in progress or completed. Waiting for result...")
+    result = await INTERVIEW_COMPLETIONS.wait(sessionId, lambda: load_final_result(sessionId))
+    if result is not None:
+        return result
+    
+    # If still no result after timeout, check if we should proceed or error
+    # If we return error here, it's a 404 which breaks UI.
+    # Ideally, we return the session state or a "processing" message, but frontend expects result.
+    # Fallback: try to return what we have or just error gracefully.
+    return {"error": "Session completion timed out"}
+
+async def finalize_interview(sessionId: str, userId: int, session: dict, result: dict) -> dict:
+    """Attach completion metrics, persist graded results and cache the final result"""
     # Calculate completion metrics
     questions_answered = len(session.get("answers", []))
     total_questions = len(session.get("questions", []))
@@ -381,22 +667,14 @@ def end_interview(sessionId: str, userId: int):
     completion_percentage = round((questions_answered / total_questions) * 100)
     
     # Calculate session duration
-    from datetime import datetime
     start_time = session.get("startTime")
     if isinstance(start_time, str):
-        from dateutil import parser
-        start_time = parser.parse(start_time)
+        start_time = datetime.fromisoformat(start_time)
     
     session_duration_seconds = (datetime.now() - start_time).total_seconds() if start_time else 0
     session_duration_minutes = round(session_duration_seconds / 60)
     
-    # Generate overall feedback and scores using GPT-4 Full
-    print(f"📊 Generating comprehensive interview feedback... ({questions_answered}/{total_questions} questions, {completion_percentage}% complete)")
-    
-    if session["mode"] == "graded":
-        result = generate_graded_results(session)
-    else:  # practice mode
-        result = generate_practice_results(session)
+    print(f"📊 Interview feedback generated ({questions_answered}/{total_questions} questions, {completion_percentage}% complete)")
     
     # Add completion tracking to result
     result["completionMetrics"] = {
@@ -426,7 +704,7 @@ def end_interview(sessionId: str, userId: int):
             )
             
             print(f"💾 Automatically saving interview result for session {sessionId}")
-            save_result(interview_res)
+            await asyncio.to_thread(save_result, interview_res)
             
             # Add the saved ID to return value if needed
             result["id"] = interview_res.id
@@ -438,171 +716,277 @@ def end_interview(sessionId: str, userId: int):
         print(f"❌ Failed to auto-save interview result: {e}")
     
     # Cache result to support idempotency check
-    session["finalResult"] = result
+    await publish_final_result(sessionId, session, result)
+    release_session_tasks(sessionId)
     return result
 
-def generate_graded_results(session: dict) -> dict:
-    """
-    Generate results with scores for graded mode
-    """
-    if not session.get("answers"):
-        return get_fallback_evaluation(session, graded=True)
+def parse_json_content(content: str):
+    """Strip markdown fences from an LLM reply and parse it as JSON"""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content.replace("```json", "").replace("```", "").strip()
+    elif content.startswith("```"):
+        content = content.replace("```", "").strip()
+    return json.loads(content)
 
-    # Build context for GPT-4
-    qa_context = "\n\n".join([
-        f"Q{i+1}: {ans['questionText']}\nAnswer: {ans['userAnswer']}"
-        for i, ans in enumerate(session["answers"])
-    ])
-    
-    prompt = f"""You are an expert interview evaluator for a {session['interviewType'].upper()} interview at {session['difficulty'].upper()} level.
+def enrich_breakdown_item(item: dict, index: int, session: dict) -> dict:
+    """Add question text, answer and id from the session to a breakdown item"""
+    if index < len(session["answers"]):
+        item["questionText"] = session["answers"][index]["questionText"]
+        item["userAnswer"] = session["answers"][index]["userAnswer"]
+        item["questionId"] = session["answers"][index]["questionId"]
+    return item
 
-INTERVIEW TRANSCRIPT:
-{qa_context}
+# ==== PER-ANSWER EVALUATION ====
 
-TASK: Provide comprehensive evaluation in VALID JSON format:
+# Background evaluations queued by process_answer (process-local): sessionId -> {answer index: task}
+ANSWER_EVALUATION_TASKS: Dict[str, Dict[int, asyncio.Task]] = {}
+ANSWER_EVALUATION_TIMEOUT = float(os.getenv("ANSWER_EVALUATION_TIMEOUT", "45"))
+SYNTHESIS_MAX_TOKENS = 700
+
+# Keeps the synthesis prompt compact no matter how long the answers were
+ANSWER_EXCERPT_CHARS = 300
+
+def queue_answer_evaluation(sessionId: str, session: dict, index: int) -> asyncio.Task:
+    """Start evaluating one recorded answer while the candidate works on the next question"""
+    with llm_priority("background"):
+        task = spawn(evaluate_answer(session, index), name=f"answer-eval-{sessionId}-{index}")
+    ANSWER_EVALUATION_TASKS.setdefault(sessionId, {})[index] = task
+    return task
+
+def build_answer_evaluation_messages(session: dict, answer: dict, graded: bool) -> list:
+    if graded:
+        prompt = f"""You are an expert interview evaluator for a {session['interviewType'].upper()} interview at {session['difficulty'].upper()} level.
+
+QUESTION: {answer['questionText']}
+ANSWER: {answer['userAnswer']}
+
+TASK: Evaluate this single answer in VALID JSON format:
 
 {{
-  "overallScore": <0-100>,
-  "overallFeedback": "Detailed 3-4 sentence overall assessment",
-  "metrics": {{
-    "technicalAccuracy": <0-100>,
-    "communicationClarity": <0-100>,
-    "confidence": <0-100>,
-    "depthOfUnderstanding": <0-100>
-  }},
-  "strengths": ["strength1", "strength2", "strength3"],
-  "areasForImprovement": ["area1", "area2", "area3"],
-  "questionBreakdown": [
-    {{
-      "questionNumber": 1,
-      "score": <0-10>,
-      "feedback": "Specific feedback for this answer"
-    }}
-  ]
+  "score": <0-10>,
+  "feedback": "Specific 1-2 sentence feedback for this answer",
+  "technicalAccuracy": <0-100>,
+  "communicationClarity": <0-100>,
+  "confidence": <0-100>,
+  "depthOfUnderstanding": <0-100>
 }}
 
-Scoring Criteria:
-- Technical Accuracy: Correctness of information
-- Communication: Clarity, structure, conciseness
-- Confidence: Tone, decisiveness, conviction
-- Understanding: Depth, examples, real-world application
+JSON Response:"""
+        system = "You are an expert interview evaluator. Respond with valid JSON only."
+    else:
+        prompt = f"""You are a supportive interview coach for a {session['interviewType'].upper()} interview at {session['difficulty'].upper()} level.
+
+QUESTION: {answer['questionText']}
+ANSWER: {answer['userAnswer']}
+
+TASK: Give encouraging, constructive feedback on this single answer in VALID JSON:
+
+{{
+  "feedback": "Constructive, specific feedback for this answer",
+  "improvementTips": ["tip1", "tip2"]
+}}
 
 JSON Response:"""
+        system = "You are a supportive interview coach. Respond with valid JSON only."
+    
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
 
+async def evaluate_answer(session: dict, index: int) -> Optional[dict]:
+    """Evaluate one answer and store the result on it; returns None on failure"""
+    answer = session["answers"][index]
+    graded = session["mode"] == "graded"
     try:
-        messages = [
-            {"role": "system", "content": "You are an expert interview evaluator. Respond with valid JSON only."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        resp = get_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=2000)
+        messages = build_answer_evaluation_messages(session, answer, graded)
+        resp = await aget_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=400)
         if resp and 'choices' in resp:
-            content = resp['choices'][0]['message']['content'].strip()
-            
-            # Clean markdown
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            evaluation = json.loads(content)
-            
-            # Add greeting bonus to overall score
-            overall_score = evaluation.get("overallScore", 75)
-            overall_score = min(100, overall_score + session.get("greetingBonus", 0))
-            evaluation["overallScore"] = overall_score
-            evaluation["greetingBonus"] = session.get("greetingBonus", 0)
-            
-            # Add question texts to breakdown
-            for i, item in enumerate(evaluation.get("questionBreakdown", [])):
-                if i < len(session["answers"]):
-                    item["questionText"] = session["answers"][i]["questionText"]
-                    item["userAnswer"] = session["answers"][i]["userAnswer"]
-                    item["questionId"] = session["answers"][i]["questionId"]
-            
-            return evaluation
+            evaluation = parse_json_content(resp['choices'][0]['message']['content'])
+            if isinstance(evaluation, dict):
+                answer["evaluation"] = evaluation
+                await INTERVIEW_SESSIONS.update(
+                    session["sessionId"],
+                    lambda latest: latest["answers"][index].__setitem__("evaluation", evaluation)
+                )
+                return evaluation
     except Exception as e:
-        print(f"Evaluation error: {e}")
+        print(f"Answer evaluation error (Q{index + 1}): {e}")
+    return answer.get("evaluation")
+
+async def get_answer_evaluation(sessionId: str, session: dict, index: int) -> Optional[dict]:
+    """Return the evaluation for an answer, waiting on (or starting) its background task"""
+    answer = session["answers"][index]
+    if answer.get("evaluation"):
+        return answer["evaluation"]
     
-    # Fallback evaluation
-    return get_fallback_evaluation(session, graded=True)
+    task = ANSWER_EVALUATION_TASKS.get(sessionId, {}).get(index)
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None or not task.result())):
+        # Never queued (or failed earlier): evaluate now
+        task = queue_answer_evaluation(sessionId, session, index)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=ANSWER_EVALUATION_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"⚠️ Answer evaluation timed out (Q{index + 1}, session {sessionId})")
+        return None
 
-def generate_practice_results(session: dict) -> dict:
-    """
-    Generate results with feedback only (no scores) for practice mode
-    """
-    if not session.get("answers"):
-        return get_fallback_evaluation(session, graded=False)
+async def collect_answer_evaluations(session: dict) -> list:
+    sessionId = session["sessionId"]
+    return list(await asyncio.gather(*[
+        get_answer_evaluation(sessionId, session, index)
+        for index in range(len(session["answers"]))
+    ]))
+
+def build_breakdown_item(session: dict, index: int, evaluation: Optional[dict], graded: bool) -> dict:
+    evaluation = evaluation or {}
+    item = {
+        "questionNumber": index + 1,
+        "feedback": evaluation.get("feedback", "Feedback unavailable.")
+    }
+    if graded:
+        item["score"] = evaluation.get("score", 0)
+    else:
+        item["improvementTips"] = evaluation.get("improvementTips", [])
+    return enrich_breakdown_item(item, index, session)
 
-    # Similar to graded but without scores
-    qa_context = "\n\n".join([
-        f"Q{i+1}: {ans['questionText']}\nAnswer: {ans['userAnswer']}"
-        for i, ans in enumerate(session["answers"])
-    ])
+def build_synthesis_messages(session: dict, evaluations: list, graded: bool) -> list:
+    """Small prompt over per-answer verdicts (not the full transcript) for the overall summary"""
+    lines = []
+    for i, (ans, evaluation) in enumerate(zip(session["answers"], evaluations)):
+        evaluation = evaluation or {}
+        entry = f"Q{i+1}: {ans['questionText']}\nAnswer (excerpt): {ans['userAnswer'][:ANSWER_EXCERPT_CHARS]}"
+        if graded:
+            entry += (
+                f"\nScore: {evaluation.get('score', 'n/a')}/10"
+                f" | Accuracy {evaluation.get('technicalAccuracy', 'n/a')}"
+                f", Clarity {evaluation.get('communicationClarity', 'n/a')}"
+                f", Confidence {evaluation.get('confidence', 'n/a')}"
+                f", Depth {evaluation.get('depthOfUnderstanding', 'n/a')}"
+            )
+        entry += f"\nFeedback: {evaluation.get('feedback', 'n/a')}"
+        lines.append(entry)
+    assessed = "\n\n".join(lines)
     
-    prompt = f"""You are a supportive interview coach for a {session['interviewType'].upper()} interview at {session['difficulty'].upper()} level.
+    if graded:
+        prompt = f"""You are an expert interview evaluator for a {session['interviewType'].upper()} interview at {session['difficulty'].upper()} level.
 
-INTERVIEW TRANSCRIPT:
-{qa_context}
+Each answer has already been assessed individually:
+{assessed}
 
-TASK: Provide encouraging, constructive feedback in VALID JSON:
+TASK: Synthesize the overall evaluation in VALID JSON format:
+
+{{
+  "overallFeedback": "Detailed 3-4 sentence overall assessment",
+  "metrics": {{
+    "technicalAccuracy": <0-100>,
+    "communicationClarity": <0-100>,
+    "confidence": <0-100>,
+    "depthOfUnderstanding": <0-100>
+  }},
+  "overallScore": <0-100>,
+  "strengths": ["strength1", "strength2", "strength3"],
+  "areasForImprovement": ["area1", "area2", "area3"]
+}}
+
+JSON Response:"""
+        system = "You are an expert interview evaluator. Respond with valid JSON only."
+    else:
+        prompt = f"""You are a supportive interview coach for a {session['interviewType'].upper()} interview at {session['difficulty'].upper()} level.
+
+Each answer has already been reviewed individually:
+{assessed}
+
+TASK: Provide encouraging, constructive overall feedback in VALID JSON:
 
 {{
   "overallFeedback": "Encouraging 3-4 sentence overall assessment focusing on growth",
   "strengths": ["strength1", "strength2", "strength3"],
   "areasForImprovement": ["area1", "area2", "area3"],
-  "actionableadvice": ["tip1", "tip2", "tip3"],
-  "questionBreakdown": [
-    {{
-      "questionNumber": 1,
-      "feedback": "Constructive, specific feedback for this answer",
-      "improvementTips": ["tip1", "tip2"]
-    }}
-  ]
+  "actionableadvice": ["tip1", "tip2", "tip3"]
 }}
 
-Focus on:
-- What they did well
-- Specific ways to improve
-- Actionable next steps
-- Encouraging tone
-
 JSON Response:"""
+        system = "You are a supportive interview coach. Respond with valid JSON only."
+    
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
 
-    try:
-        messages = [
-            {"role": "system", "content": "You are a supportive interview coach. Respond with valid JSON only."},
-            {"role": "user", "content": prompt}
-        ]
+def assemble_results(session: dict, evaluations: list, synthesis: Optional[dict], graded: bool) -> dict:
+    """Merge per-answer evaluations with the synthesis (or aggregates if synthesis failed)"""
+    if not any(evaluations) and not synthesis:
+        return get_fallback_evaluation(session, graded=graded)
+    
+    breakdown = [build_breakdown_item(session, i, evaluation, graded) for i, evaluation in enumerate(evaluations)]
+    scored = [e for e in evaluations if e]
+    
+    if graded:
+        def average(key, scale=1):
+            values = [e.get(key) for e in scored if isinstance(e.get(key), (int, float))]
+            return round(sum(values) * scale / len(values)) if values else 0
         
-        resp = get_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=2000)
-        if resp and 'choices' in resp:
-            content = resp['choices'][0]['message']['content'].strip()
-            
-            # Clean markdown
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            
-            evaluation = json.loads(content)
-            
-            # Add question texts to breakdown
-            for i, item in enumerate(evaluation.get("questionBreakdown", [])):
-                if i < len(session["answers"]):
-                    item["questionText"] = session["answers"][i]["questionText"]
-                    item["userAnswer"] = session["answers"][i]["userAnswer"]
-                    item["questionId"] = session["answers"][i]["questionId"]
-            
-            evaluation["mode"] = "practice"
-            evaluation["greetingBonus"] = session.get("greetingBonus", 0)
-            
-            return evaluation
-    except Exception as e:
-        print(f"Evaluation error: {e}")
+        result = {
+            "overallScore": average("score", scale=10),
+            "overallFeedback": "Overall summary unavailable. See the per-question feedback below.",
+            "metrics": {
+                "technicalAccuracy": average("technicalAccuracy"),
+                "communicationClarity": average("communicationClarity"),
+                "confidence": average("confidence"),
+                "depthOfUnderstanding": average("depthOfUnderstanding")
+            },
+            "strengths": [],
+            "areasForImprovement": []
+        }
+        result.update(synthesis or {})
+        result["questionBreakdown"] = breakdown
+        
+        # Add greeting bonus to overall score
+        result["overallScore"] = min(100, result.get("overallScore", 75) + session.get("greetingBonus", 0))
+        result["greetingBonus"] = session.get("greetingBonus", 0)
+    else:
+        result = {
+            "overallFeedback": "Overall summary unavailable. See the per-question feedback below.",
+            "strengths": [],
+            "areasForImprovement": [],
+            "actionableadvice": []
+        }
+        result.update(synthesis or {})
+        result["questionBreakdown"] = breakdown
+        result["mode"] = "practice"
+        result["greetingBonus"] = session.get("greetingBonus", 0)
     
-    # Fallback
-    return get_fallback_evaluation(session, graded=False)
+    return result
+
+async def synthesize_results(session: dict, graded: bool) -> dict:
+    if not session.get("answers"):
+        return get_fallback_evaluation(session, graded=graded)
+    
+    evaluations = await collect_answer_evaluations(session)
+    synthesis = None
+    if any(evaluations):
+        try:
+            messages = build_synthesis_messages(session, evaluations, graded)
+            resp = await aget_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=SYNTHESIS_MAX_TOKENS, priority="batch")
+            if resp and 'choices' in resp:
+                synthesis = parse_json_content(resp['choices'][0]['message']['content'])
+        except Exception as e:
+            print(f"Evaluation synthesis error: {e}")
+    
+    return assemble_results(session, evaluations, synthesis, graded)
+
+async def generate_graded_results(session: dict) -> dict:
+    """
+    Generate results with scores for graded mode
+    """
+    return await synthesize_results(session, graded=True)
+
+async def generate_practice_results(session: dict) -> dict:
+    """
+    Generate results with feedback only (no scores) for practice mode
+    """
+    return await synthesize_results(session, graded=False)
 
 def get_fallback_evaluation(session: dict, graded: bool = True) -> dict:
     """Fallback evaluation if AI fails or no data"""
@@ -646,7 +1030,7 @@ def get_fallback_evaluation(session: dict, graded: bool = True) -> dict:
     
     return base
 
-def get_teach_me(questionId: str, questionText: str, userAnswer: str = ""):
+async def get_teach_me(questionId: str, questionText: str, userAnswer: str = ""):
     """
     Use GPT-mini to explain a question in detail with structured output
     """
@@ -678,7 +1062,7 @@ Provide ONLY the JSON object, no other text."""
             {"role": "user", "content": prompt}
         ]
         
-        resp = get_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=600)
+        resp = await aget_gpt_response(messages, model=GPT_MINI_MODEL, max_tokens=600)
         if resp and 'choices' in resp:
             content = resp['choices'][0]['message']['content'].strip()
             
@@ -0,0 +1,181 @@
+import re
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+# (key, index, value): index is None for a whole top-level field,
+# or the element position for items of a streamed array
+JsonEvent = Tuple[str, Optional[int], Any]
+
+
+class JsonObjectStreamer:
+    """
+    Incremental parser for a single JSON object arriving in text chunks
+    (e.g. streamed LLM output). Emits each top-level field as soon as its
+    value is complete; fields named in `stream_arrays` instead emit every
+    array element as soon as that element is complete.
+
+    Leading noise such as a ```json fence is skipped. The full text is kept
+    so callers can parse the whole object with result() once the stream ends.
+    """
+    def __init__(self, stream_arrays: Iterable[str] = ()):
+        self.stream_arrays = set(stream_arrays)
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._start = None      # index of the opening '{'
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._value_start = None
+        self._in_streamed_array = False
+        self._item_start = None
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> List[JsonEvent]:
+        """Consume a chunk and return the events it completed"""
+        self.text += chunk
+        events: List[JsonEvent] = []
+        text = self.text
+        i = self._pos
+        while i < len(text) and not self.done:
+            c = text[i]
+            if self._start is None:
+                if c == "{":
+                    self._start = i
+                    self._depth = 1
+                    self._expect_key = True
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                i += 1
+                continue
+
+            if c in " \t\r\n":
+                i += 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                self._mark_value_start(i)
+            elif c == ":" and self._depth == 1:
+                self._expect_key = False
+                self._value_start = None
+            elif c in "{[":
+                self._mark_value_start(i)
+                if self._depth == 1 and c == "[" and self._key in self.stream_arrays:
+                    self._in_streamed_array = True
+                    self._item_index = 0
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._in_streamed_array:
+                    # Closing the streamed array: flush a trailing scalar item
+                    if self._item_start is not None:
+                        self._emit_item(events, text[self._item_start:i])
+                    self._in_streamed_array = False
+                    self._end_field()
+                elif self._depth == 2 and self._in_streamed_array and self._item_start is not None:
+                    self._emit_item(events, text[self._item_start:i + 1])
+                elif self._depth == 1 and self._value_start is not None:
+                    self._emit_field(events, text[self._value_start:i + 1])
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._emit_field(events, text[self._value_start:i])
+                    self.done = True
+            elif c == ",":
+                if self._depth == 1:
+                    if self._value_start is not None:
+                        self._emit_field(events, text[self._value_start:i])
+                    self._expect_key = True
+                elif self._depth == 2 and self._in_streamed_array and self._item_start is not None:
+                    self._emit_item(events, text[self._item_start:i])
+            else:
+                self._mark_value_start(i)
+            i += 1
+        self._pos = i
+        return events
+
+    def result(self) -> Any:
+        """Parse the complete object (raises ValueError if the stream was incomplete)"""
+        if self._start is None:
+            raise ValueError("No JSON object found in stream")
+        end = self.text.rfind("}")
+        return json.loads(self.text[self._start:end + 1])
+
+    def _mark_value_start(self, i: int):
+        if self._depth == 1 and not self._expect_key and self._value_start is None:
+            self._value_start = i
+        elif self._depth == 2 and self._in_streamed_array and self._item_start is None:
+            self._item_start = i
+
+    def _emit_field(self, events: List[JsonEvent], raw: str):
+        key = self._key
+        self._end_field()
+        try:
+            events.append((key, None, json.loads(raw)))
+        except ValueError:
+            pass
+
+    def _emit_item(self, events: List[JsonEvent], raw: str):
+        index = self._item_index
+        self._item_start = None
+        self._item_index += 1
+        try:
+            events.append((self._key, index, json.loads(raw)))
+        except ValueError:
+            pass
+
+    def _end_field(self):
+        self._value_start = None
+        self._key = None
+
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+def partial_string_field(text: str, key: str) -> Optional[str]:
+    """
+    Decoded prefix of the top-level string field `key` in a JSON object that is
+    still arriving, e.g. '{"message": "Hel' -> 'Hel'. Stops before an incomplete
+    escape sequence; returns None until the value has started.
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), text)
+    if not match:
+        return None
+    out = []
+    i = match.end()
+    while i < len(text):
+        c = text[i]
+        if c == '"':
+            break
+        if c == "\\":
+            if i + 1 >= len(text):
+                break
+            nxt = text[i + 1]
+            if nxt == "u":
+                if i + 6 > len(text):
+                    break
+                try:
+                    out.append(chr(int(text[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            out.append(_ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out)
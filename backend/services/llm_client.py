@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import asyncio
+import httpx
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from services.llm_scheduler import SCHEDULER, llm_priority
+
+# Load environment variables
+load_dotenv()
+
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
+GPT_FULL_MODEL = os.getenv("GPT_FULL_MODEL")
+GPT_MINI_MODEL = os.getenv("GPT_MINI_MODEL")
+
+# Keep-alive pool shared by every service (one TCP+TLS handshake per connection, not per call)
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "10"))
+
+# Statuses worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ModelPolicy:
+    """Timeout and retry policy for one model deployment"""
+    def __init__(self, timeout: float, retries: int = 1, backoff: float = 0.5):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+
+# Mini serves interactive turns (fail fast), Full does long generations
+MODEL_POLICIES: Dict[str, ModelPolicy] = {}
+if GPT_MINI_MODEL:
+    MODEL_POLICIES[GPT_MINI_MODEL] = ModelPolicy(
+        timeout=float(os.getenv("LLM_TIMEOUT_MINI", "15")),
+        retries=int(os.getenv("LLM_RETRIES_MINI", "1"))
+    )
+if GPT_FULL_MODEL:
+    MODEL_POLICIES[GPT_FULL_MODEL] = ModelPolicy(
+        timeout=float(os.getenv("LLM_TIMEOUT_FULL", "60")),
+        retries=int(os.getenv("LLM_RETRIES_FULL", "1"))
+    )
+DEFAULT_POLICY = ModelPolicy(timeout=60, retries=0)
+
+def get_policy(model: str) -> ModelPolicy:
+    return MODEL_POLICIES.get(model, DEFAULT_POLICY)
+
+# ==== TIMING HOOKS ====
+
+# hook(model, elapsed_seconds, status_code_or_None, attempt)
+TimingHook = Callable[[str, float, Optional[int], int], None]
+_TIMING_HOOKS: List[TimingHook] = []
+
+def add_timing_hook(hook: TimingHook):
+    """Register a callback invoked after every LLM HTTP attempt"""
+    _TIMING_HOOKS.append(hook)
+
+def remove_timing_hook(hook: TimingHook):
+    if hook in _TIMING_HOOKS:
+        _TIMING_HOOKS.remove(hook)
+
+def _emit_timing(model: str, elapsed: float, status: Optional[int], attempt: int):
+    for hook in list(_TIMING_HOOKS):
+        try:
+            hook(model, elapsed, status, attempt)
+        except Exception as e:
+            print(f"⚠️ LLM timing hook failed: {e}")
+
+def _log_slow_calls(model: str, elapsed: float, status: Optional[int], attempt: int):
+    if elapsed >= LLM_SLOW_CALL_SECONDS:
+        print(f"🐢 Slow LLM call: {model} took {elapsed:.1f}s (status={status}, attempt={attempt})")
+
+add_timing_hook(_log_slow_calls)
+
+# ==== HTTP SESSION ====
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Lazily build the pooled non-blocking client (must be called inside the event loop).
+    Carries no credentials, so other Azure services (Doc Intelligence, Speech) share it.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_POOL_SIZE
+            )
+        )
+    return _async_client
+
+async def aclose():
+    """Close the async client (called on application shutdown)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def is_configured() -> bool:
+    return bool(AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_KEY)
+
+def chat_completions_url() -> str:
+    return f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
+
+def auth_headers() -> Dict[str, str]:
+    return {
+        "api-key": AZURE_OPENAI_KEY or "",
+        "Content-Type": "application/json"
+    }
+
+def build_body(messages: List[Dict], model: str, max_tokens: Optional[int], temperature: float) -> Dict:
+    body = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature
+    }
+    if max_tokens:
+        body["max_tokens"] = max_tokens
+    return body
+
+async def aget_gpt_response(messages: List[Dict], model: str = GPT_FULL_MODEL, max_tokens: Optional[int] = 1500,
+                            temperature: float = 0.7, priority: Optional[str] = None):
+    """
+    Call Azure OpenAI chat completions through the pooled httpx client.
+    Returns the parsed JSON response, or None on failure.
+    Each attempt waits for a dispatch slot of `priority` (default: the context's,
+    see llm_priority); the slot is given back during retry backoff.
+    """
+    if not is_configured():
+        print(f"❌ Azure credentials missing")
+        return None
+
+    policy = get_policy(model)
+    body = build_body(messages, model, max_tokens, temperature)
+    client = get_async_client()
+    timeout = httpx.Timeout(policy.timeout, connect=LLM_CONNECT_TIMEOUT)
+
+    for attempt in range(policy.retries + 1):
+        status = None
+        start = time.perf_counter()
+        try:
+            async with SCHEDULER.slot(priority):
+                start = time.perf_counter()
+                r = await client.post(chat_completions_url(), headers=auth_headers(), json=body, timeout=timeout)
+            status = r.status_code
+        except httpx.HTTPError as e:
+            print(f"❌ Exception calling Azure: {str(e) or type(e).__name__}")
+        finally:
+            _emit_timing(model, time.perf_counter() - start, status, attempt)
+
+        if status == 200:
+            return r.json()
+        if status is not None:
+            print(f"❌ Azure error: {status} {r.text[:200]}")
+            if status not in RETRY_STATUSES:
+                return None
+        if attempt < policy.retries:
+            await asyncio.sleep(policy.backoff * (2 ** attempt))
+
+    return None
+
+async def astream_gpt_response(messages: List[Dict], model: str = GPT_FULL_MODEL, max_tokens: Optional[int] = 1500,
+                               temperature: float = 0.7, priority: Optional[str] = None):
+    """
+    Stream a chat completion, yielding content deltas as Azure produces them.
+    Yields nothing if the call fails; callers validate the assembled text.
+    Holds a dispatch slot of `priority` until the stream ends, so consume it
+    inside `contextlib.aclosing(...)`: a consumer that stops early (or is
+    cancelled) then frees the slot at once instead of when the generator is
+    garbage collected.
+    """
+    if not is_configured():
+        print(f"❌ Azure credentials missing")
+        return
+
+    policy = get_policy(model)
+    body = build_body(messages, model, max_tokens, temperature)
+    body["stream"] = True
+    client = get_async_client()
+    timeout = httpx.Timeout(policy.timeout, connect=LLM_CONNECT_TIMEOUT)
+
+    async with SCHEDULER.slot(priority):
+        status = None
+        start = time.perf_counter()
+        try:
+            async with client.stream("POST", chat_completions_url(), headers=auth_headers(), json=body, timeout=timeout) as r:
+                status = r.status_code
+                if status != 200:
+                    await r.aread()
+                    print(f"❌ Azure error: {status} {r.text[:200]}")
+                    return
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(payload)
+                    except ValueError:
+                        continue
+                    for choice in chunk.get("choices", []):
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+        except httpx.HTTPError as e:
+            print(f"❌ Exception streaming from Azure: {str(e) or type(e).__name__}")
+        finally:
+            _emit_timing(model, time.perf_counter() - start, status, 0)
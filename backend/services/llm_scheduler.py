@@ -0,0 +1,131 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+from services import metrics
+
+# Admission order under saturation: someone is waiting on an interactive call
+# right now, background work (prefetch, refills) will be needed soon, batch
+# work (end-of-session scoring, resume analysis) can wait its turn
+PRIORITIES = ("interactive", "background", "batch")
+
+# Calls in flight to Azure across all classes, and the share each class may take
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_CONCURRENCY_CAPS = {
+    "interactive": int(os.getenv("LLM_CONCURRENCY_INTERACTIVE", str(LLM_MAX_CONCURRENCY))),
+    "background": int(os.getenv("LLM_CONCURRENCY_BACKGROUND", "8")),
+    "batch": int(os.getenv("LLM_CONCURRENCY_BATCH", "4")),
+}
+LLM_SLOW_QUEUE_SECONDS = float(os.getenv("LLM_SLOW_QUEUE_SECONDS", "2"))
+
+metrics.describe("llm_queue_seconds_total", "Seconds LLM calls spent waiting for a dispatch slot, by priority")
+metrics.describe("llm_dispatched_total", "LLM calls admitted by the scheduler, by priority")
+metrics.describe("llm_queued", "LLM calls waiting for a dispatch slot, by priority")
+metrics.describe("llm_inflight", "LLM calls holding a dispatch slot, by priority")
+
+_PRIORITY: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
+
+def current_priority() -> str:
+    return _PRIORITY.get()
+
+def resolve_priority(priority: Optional[str]) -> str:
+    priority = priority or _PRIORITY.get()
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    return priority
+
+@contextmanager
+def llm_priority(priority: str):
+    """
+    Default priority for LLM calls made in this context. Tasks spawned inside
+    the block copy the context, so `with llm_priority("background"): spawn(...)`
+    marks everything the task calls.
+    """
+    token = _PRIORITY.set(resolve_priority(priority))
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class LLMScheduler:
+    """
+    Dispatch slots for LLM calls: at most `limit` in flight, at most `caps[p]`
+    of them of priority p. A freed slot always goes to the highest-priority
+    waiter, so queued batch work yields to interactive turns; calls already
+    in flight are never interrupted.
+    """
+    def __init__(self, limit: int, caps: Dict[str, int]):
+        self.limit = limit
+        self.caps = caps
+        self._inflight: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+
+    def inflight(self, priority: str) -> int:
+        return self._inflight[priority]
+
+    def queued(self, priority: str) -> int:
+        return len(self._waiting[priority])
+
+    def _has_room(self, priority: str) -> bool:
+        return sum(self._inflight.values()) < self.limit and self._inflight[priority] < self.caps[priority]
+
+    async def acquire(self, priority: str) -> float:
+        """Take a slot, waiting behind calls of the same or higher priority; returns seconds queued"""
+        start = time.perf_counter()
+        ahead = PRIORITIES[:PRIORITIES.index(priority) + 1]
+        if self._has_room(priority) and not any(self._waiting[p] for p in ahead):
+            self._inflight[priority] += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting[priority].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted a slot just as we were cancelled: hand it on
+                    self.release(priority)
+                elif waiter in self._waiting[priority]:
+                    self._waiting[priority].remove(waiter)
+                raise
+
+        waited = time.perf_counter() - start
+        metrics.inc("llm_queue_seconds_total", waited, labels={"priority": priority})
+        metrics.inc("llm_dispatched_total", labels={"priority": priority})
+        if waited >= LLM_SLOW_QUEUE_SECONDS:
+            print(f"🚦 {priority} LLM call queued {waited:.1f}s for a dispatch slot")
+        return waited
+
+    def release(self, priority: str):
+        self._inflight[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        for priority in PRIORITIES:
+            waiting = self._waiting[priority]
+            while waiting and self._has_room(priority):
+                waiter = waiting.popleft()
+                if waiter.done():
+                    continue
+                self._inflight[priority] += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None):
+        priority = resolve_priority(priority)
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+
+SCHEDULER = LLMScheduler(LLM_MAX_CONCURRENCY, LLM_CONCURRENCY_CAPS)
+
+for _priority in PRIORITIES:
+    metrics.gauge_callback("llm_queued", lambda p=_priority: SCHEDULER.queued(p), labels={"priority": _priority})
+    metrics.gauge_callback("llm_inflight", lambda p=_priority: SCHEDULER.inflight(p), labels={"priority": _priority})
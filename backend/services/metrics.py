@@ -0,0 +1,61 @@
+from typing import Callable, Dict, Optional, Tuple
+
+# In-process counters and gauges, exposed in Prometheus text format on /metrics
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_COUNTERS: Dict[str, Dict[LabelKey, float]] = {}
+_GAUGES: Dict[str, Dict[LabelKey, float]] = {}
+_GAUGE_CALLBACKS: Dict[str, Dict[LabelKey, Callable[[], float]]] = {}
+_HELP: Dict[str, str] = {}
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+def describe(name: str, help_text: str):
+    _HELP[name] = help_text
+
+def inc(name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+    series = _COUNTERS.setdefault(name, {})
+    key = _label_key(labels)
+    series[key] = series.get(key, 0) + amount
+
+def set_gauge(name: str, value: float, labels: Optional[Dict[str, str]] = None):
+    _GAUGES.setdefault(name, {})[_label_key(labels)] = value
+
+def gauge_callback(name: str, fn: Callable[[], float], labels: Optional[Dict[str, str]] = None):
+    """Register a gauge that is read when metrics are rendered"""
+    _GAUGE_CALLBACKS.setdefault(name, {})[_label_key(labels)] = fn
+
+def get_value(name: str, labels: Optional[Dict[str, str]] = None) -> float:
+    key = _label_key(labels)
+    for series in (_COUNTERS.get(name, {}), _GAUGES.get(name, {})):
+        if key in series:
+            return series[key]
+    fn = _GAUGE_CALLBACKS.get(name, {}).get(key)
+    return fn() if fn else 0
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+def render() -> str:
+    """Prometheus text exposition of every metric"""
+    lines = []
+    gauges = {name: dict(series) for name, series in _GAUGES.items()}
+    for name, callbacks in _GAUGE_CALLBACKS.items():
+        for key, fn in callbacks.items():
+            try:
+                gauges.setdefault(name, {})[key] = fn()
+            except Exception as e:
+                print(f"⚠️ Gauge {name} failed: {e}")
+
+    for kind, metrics in (("counter", _COUNTERS), ("gauge", gauges)):
+        for name in sorted(metrics):
+            if name in _HELP:
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in metrics[name].items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,173 @@
+import random
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, List, Optional
+from services.background import spawn
+from services.llm_scheduler import current_priority, llm_priority
+from services import metrics
+
+metrics.describe("variant_cache_requests_total", "VariantCache lookups by outcome (hit, wait, miss)")
+
+
+class RefillPool:
+    """
+    Keyed pools of ready-made items (e.g. LLM generations), topped up in the
+    background. pop() never waits: it hands out a ready item or None, and
+    schedules a refill whenever a key drops to the low watermark.
+
+    `produce(key)` is awaited off the request path and returns one item, or
+    None if it could not produce a valid one (the refill then stops early),
+    at background LLM priority. A key is only refilled once it is asked for a
+    second time (or warmed), so one-off keys cost no generations. Only the
+    `max_keys` most recently used keys are kept.
+    """
+    def __init__(self, name: str, produce: Callable[[Hashable], Awaitable[Optional[Any]]],
+                 target: int = 2, low_watermark: int = 1, max_keys: int = 64):
+        self.name = name
+        self.produce = produce
+        self.target = target
+        self.low_watermark = low_watermark
+        self.max_keys = max_keys
+        self._items: "OrderedDict[Hashable, Deque[Any]]" = OrderedDict()
+        self._refilling: Dict[Hashable, asyncio.Task] = {}
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Take a ready item for key (None if empty) and refill below the watermark"""
+        seen = key in self._items
+        items = self._touch(key)
+        item = items.popleft() if items else None
+        if seen:
+            self.ensure(key)
+        return item
+
+    def put(self, key: Hashable, item: Any):
+        items = self._touch(key)
+        if len(items) < self.target:
+            items.append(item)
+
+    def size(self, key: Hashable) -> int:
+        items = self._items.get(key)
+        return len(items) if items else 0
+
+    def ensure(self, key: Hashable):
+        """Schedule a background refill if key is at or below the low watermark"""
+        if self.size(key) > self.low_watermark or key in self._refilling:
+            return
+        with llm_priority("background"):
+            self._refilling[key] = spawn(self._refill(key), name=f"{self.name}-refill")
+
+    def warm(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self._touch(key)
+            self.ensure(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self._items),
+            "ready": sum(len(items) for items in self._items.values()),
+            "refilling": len(self._refilling)
+        }
+
+    def _touch(self, key: Hashable) -> Deque[Any]:
+        items = self._items.get(key)
+        if items is None:
+            items = self._items[key] = deque()
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+        else:
+            self._items.move_to_end(key)
+        return items
+
+    async def _refill(self, key: Hashable):
+        try:
+            while self.size(key) < self.target:
+                item = await self.produce(key)
+                if item is None:
+                    print(f"⚠️ {self.name}: refill for {key} produced nothing, will retry on next use")
+                    break
+                self.put(key, item)
+        finally:
+            self._refilling.pop(key, None)
+
+
+class VariantCache:
+    """
+    Several interchangeable generations per key (e.g. opening statements per
+    topic and persona) shared by every request. get() serves a random ready
+    variant and tops the key up to `variants` in the background; with nothing
+    ready it awaits the generation already in flight for the key instead of
+    starting a duplicate. Only the `max_keys` most recently used keys are kept.
+    """
+    def __init__(self, name: str, produce: Callable[[Hashable], Awaitable[Optional[Any]]],
+                 variants: int = 3, max_keys: int = 128):
+        self.name = name
+        self.produce = produce
+        self.variants = variants
+        self.max_keys = max_keys
+        self._items: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """A variant for key (None if generation failed)"""
+        items = self._touch(key)
+        if items:
+            self._count("hit")
+            self._top_up(key)
+            return random.choice(items)
+
+        task = self._inflight.get(key)
+        self._count("wait" if task is not None else "miss")
+        if task is None:
+            # Someone is waiting on this one: keep the caller's priority
+            task = self._start(key, current_priority())
+        # Shielded: a cancelled request must not cancel the generation others wait on
+        await asyncio.shield(task)
+        items = self._items.get(key)
+        return random.choice(items) if items else None
+
+    def warm(self, keys: Iterable[Hashable]):
+        """Start generating one variant for each key that has none"""
+        for key in keys:
+            if not self._touch(key) and key not in self._inflight:
+                self._start(key, priority="background")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self._items),
+            "ready": sum(len(items) for items in self._items.values()),
+            "generating": len(self._inflight)
+        }
+
+    def _touch(self, key: Hashable) -> List[Any]:
+        items = self._items.get(key)
+        if items is None:
+            items = self._items[key] = []
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+        else:
+            self._items.move_to_end(key)
+        return items
+
+    def _top_up(self, key: Hashable):
+        if len(self._items.get(key, ())) < self.variants and key not in self._inflight:
+            self._start(key, priority="background")
+
+    def _start(self, key: Hashable, priority: str) -> asyncio.Task:
+        with llm_priority(priority):
+            task = self._inflight[key] = spawn(self._generate(key), name=f"{self.name}-generate")
+        return task
+
+    async def _generate(self, key: Hashable):
+        try:
+            item = await self.produce(key)
+            if item is None:
+                print(f"⚠️ {self.name}: generation for {key} produced nothing")
+            else:
+                items = self._touch(key)
+                if len(items) < self.variants:
+                    items.append(item)
+        finally:
+            self._inflight.pop(key, None)
+
+    def _count(self, outcome: str):
+        metrics.inc("variant_cache_requests_total", labels={"cache": self.name, "outcome": outcome})
@@ -0,0 +1,220 @@
+import os
+import json
+import random
+import asyncio
+from functools import lru_cache
+from itertools import permutations
+from types import MappingProxyType
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from services.background import spawn
+
+QUESTION_BANK_DIR = os.getenv(
+    "QUESTION_BANK_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+)
+QUESTION_FILE_SUFFIX = "_questions.json"
+# Poll the bank files and reload on change (0 disables the watcher)
+QUESTION_BANK_WATCH_SECONDS = float(os.getenv("QUESTION_BANK_WATCH_SECONDS", "0"))
+# Option orders are looked up in a table of all n! permutations, so n stays small
+MAX_OPTIONS = 6
+
+
+class BankQuestion(NamedTuple):
+    """One aptitude question as stored in the bank (immutable, shared by every request)"""
+    topic: str
+    id: int
+    question: str
+    options: Tuple[str, ...]
+    correct_answer: int
+    difficulty: str
+    explanation: str
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "question": self.question,
+            "options": list(self.options),
+            "correctAnswer": self.correct_answer,
+            "difficulty": self.difficulty,
+            "explanation": self.explanation,
+        }
+
+
+@lru_cache(maxsize=None)
+def permutation_table(n: int) -> Tuple[Tuple[Tuple[int, ...], Tuple[int, ...]], ...]:
+    """Every (order, inverse) pair for n options: order[i] is the base index shown at i"""
+    table = []
+    for order in permutations(range(n)):
+        inverse = [0] * n
+        for shown, base in enumerate(order):
+            inverse[base] = shown
+        table.append((order, tuple(inverse)))
+    return tuple(table)
+
+
+class ServedQuestion(NamedTuple):
+    """
+    A bank question as one request sees it: the shared base record plus the
+    number of its option permutation. Nothing is copied until to_dict().
+    """
+    base: BankQuestion
+    perm: int
+
+    @property
+    def order(self) -> Tuple[int, ...]:
+        return permutation_table(len(self.base.options))[self.perm][0]
+
+    @property
+    def correct_answer(self) -> int:
+        """Index of the correct option as shown"""
+        return permutation_table(len(self.base.options))[self.perm][1][self.base.correct_answer]
+
+    def base_index(self, shown: int) -> int:
+        """Which stored option the option shown at `shown` is"""
+        return self.order[shown]
+
+    def to_dict(self) -> Dict:
+        data = self.base.to_dict()
+        data["options"] = [self.base.options[i] for i in self.order]
+        data["correctAnswer"] = self.correct_answer
+        return data
+
+    def public_dict(self) -> Dict:
+        """What a test taker sees: no answer key, no explanation"""
+        return {
+            "id": self.base.id,
+            "question": self.base.question,
+            "options": [self.base.options[i] for i in self.order],
+            "difficulty": self.base.difficulty,
+        }
+
+
+def is_valid_permutation(question: BankQuestion, perm: int) -> bool:
+    return 0 <= perm < len(permutation_table(len(question.options)))
+
+def shuffle(question: BankQuestion) -> ServedQuestion:
+    """Serve question with its options in a random order"""
+    return ServedQuestion(question, random.randrange(len(permutation_table(len(question.options)))))
+
+
+class QuestionBank:
+    """
+    Every topic's questions, indexed by topic, (topic, difficulty) and
+    (topic, id). Never mutated after construction: a reload builds a new
+    bank and swaps it in, so readers keep a consistent snapshot.
+    """
+    def __init__(self, questions: Iterable[BankQuestion], sources: Dict[str, float]):
+        by_topic: Dict[str, List[BankQuestion]] = {}
+        by_difficulty: Dict[Tuple[str, str], List[BankQuestion]] = {}
+        by_id: Dict[Tuple[str, int], BankQuestion] = {}
+        for q in questions:
+            if (q.topic, q.id) in by_id:
+                print(f"⚠️ Question bank: duplicate id {q.id} in {q.topic}, keeping the first")
+                continue
+            by_id[(q.topic, q.id)] = q
+            by_topic.setdefault(q.topic, []).append(q)
+            by_difficulty.setdefault((q.topic, q.difficulty), []).append(q)
+
+        self.by_topic = MappingProxyType({k: tuple(v) for k, v in by_topic.items()})
+        self.by_difficulty = MappingProxyType({k: tuple(v) for k, v in by_difficulty.items()})
+        self.by_id = MappingProxyType(by_id)
+        self.sources = MappingProxyType(dict(sources))
+
+    def topics(self) -> List[str]:
+        return sorted(self.by_topic)
+
+    def has_topic(self, topic: str) -> bool:
+        return topic in self.by_topic
+
+    def get(self, topic: str, question_id: int) -> Optional[BankQuestion]:
+        return self.by_id.get((topic, question_id))
+
+    def sample(self, topic: str, count: int, difficulty: Optional[str] = None) -> List[BankQuestion]:
+        """Up to `count` distinct random questions (no copying of the records)"""
+        pool = self.by_difficulty.get((topic, difficulty), ()) if difficulty else self.by_topic.get(topic, ())
+        return random.sample(pool, max(0, min(count, len(pool))))
+
+    def draw(self, topic: str, count: int, difficulty: Optional[str] = None) -> List[ServedQuestion]:
+        """sample() with each question's options shuffled"""
+        return [shuffle(q) for q in self.sample(topic, count, difficulty)]
+
+
+def parse_question(topic: str, raw: Dict) -> Optional[BankQuestion]:
+    """A BankQuestion from one JSON record, or None if it is malformed"""
+    try:
+        options = tuple(str(o) for o in raw["options"])
+        correct = int(raw["correctAnswer"])
+        if not 2 <= len(options) <= MAX_OPTIONS or not 0 <= correct < len(options):
+            return None
+        return BankQuestion(
+            topic=topic,
+            id=int(raw["id"]),
+            question=str(raw["question"]),
+            options=options,
+            correct_answer=correct,
+            difficulty=str(raw.get("difficulty", "medium")).lower(),
+            explanation=str(raw.get("explanation", "")),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def scan_sources(directory: str = QUESTION_BANK_DIR) -> Dict[str, float]:
+    """Bank files in directory with their modification times"""
+    sources = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(QUESTION_FILE_SUFFIX):
+            path = os.path.join(directory, name)
+            sources[path] = os.path.getmtime(path)
+    return sources
+
+def build_bank(directory: str = QUESTION_BANK_DIR) -> QuestionBank:
+    sources = scan_sources(directory)
+    questions = []
+    for path in sources:
+        topic = os.path.basename(path)[:-len(QUESTION_FILE_SUFFIX)].lower()
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        parsed = [parse_question(topic, raw) for raw in records]
+        skipped = sum(q is None for q in parsed)
+        if skipped:
+            print(f"⚠️ Question bank: skipped {skipped} malformed question(s) in {path}")
+        questions.extend(q for q in parsed if q is not None)
+    return QuestionBank(questions, sources)
+
+_bank: Optional[QuestionBank] = None
+_watcher: Optional[asyncio.Task] = None
+
+def load_bank(directory: str = QUESTION_BANK_DIR) -> QuestionBank:
+    """(Re)build the bank from disk and make it current (called on application startup)"""
+    global _bank
+    _bank = build_bank(directory)
+    counts = ", ".join(f"{t}={len(_bank.by_topic[t])}" for t in _bank.topics())
+    print(f"📚 Question bank loaded: {counts or 'empty'}")
+    return _bank
+
+def get_bank() -> QuestionBank:
+    if _bank is None:
+        return load_bank()
+    return _bank
+
+def reload_if_changed() -> bool:
+    """Reload when a bank file was added, removed or modified; keeps the old bank if the new one fails to load"""
+    bank = get_bank()
+    try:
+        if scan_sources() == dict(bank.sources):
+            return False
+        load_bank()
+        return True
+    except Exception as e:
+        print(f"⚠️ Question bank reload failed, keeping the current bank: {e}")
+        return False
+
+async def _watch_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        reload_if_changed()
+
+def start_watcher(interval: float = QUESTION_BANK_WATCH_SECONDS):
+    """Start polling the bank files for changes, if enabled (called on application startup)"""
+    global _watcher
+    if interval > 0 and (_watcher is None or _watcher.done()):
+        _watcher = spawn(_watch_forever(interval), name="question-bank-watcher")
@@ -0,0 +1,173 @@
+import os
+import re
+import random
+import asyncio
+import hashlib
+import itertools
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set
+from services import metrics
+from services.background import spawn
+from services.llm_scheduler import llm_priority
+from services.question_bank import BankQuestion
+from services.session_store import SessionStore
+from services.session_backends import SessionConflict
+
+# Live AI questions kept per topic; a refill starts below the low watermark
+AI_QUESTION_POOL_TARGET = int(os.getenv("AI_QUESTION_POOL_TARGET", "30"))
+AI_QUESTION_POOL_LOW_WATERMARK = int(os.getenv("AI_QUESTION_POOL_LOW_WATERMARK", "12"))
+# A question is retired after this many users got it, so the pool keeps turning over
+AI_QUESTION_MAX_SERVES = int(os.getenv("AI_QUESTION_MAX_SERVES", "25"))
+# Fingerprints remembered per topic to reject regenerated duplicates
+AI_QUESTION_RECENT = 1000
+
+# Per user and topic: the AI questions already served (most recent AI_SEEN_MAX)
+AI_SEEN_TTL = float(os.getenv("AI_SEEN_TTL", str(30 * 24 * 3600)))
+AI_SEEN_MAX = int(os.getenv("AI_SEEN_MAX", "300"))
+AI_SEEN_USERS_MAX = int(os.getenv("AI_SEEN_USERS_MAX", "100000"))
+SEEN_QUESTIONS = SessionStore("aptitude-seen", AI_SEEN_TTL, AI_SEEN_USERS_MAX)
+
+metrics.describe("ai_question_pool_requests_total", "AI question pool draws by outcome (full, partial, empty)")
+metrics.describe("ai_question_pool_rejected_total", "Generated AI questions dropped as duplicates")
+metrics.describe("ai_question_pool_ready", "Live AI questions per topic")
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Pool questions are not in the bank: number them apart from bank ids
+_ids = itertools.count(1_000_000)
+
+
+def fingerprint(text: str) -> str:
+    """Identity of a question text, ignoring case, punctuation and spacing"""
+    return hashlib.sha1(" ".join(WORD_RE.findall(text.lower())).encode("utf-8")).hexdigest()[:16]
+
+
+class AIQuestionPool:
+    """
+    Per-topic pools of validated, deduplicated AI questions shared by every
+    user. take() never waits on the LLM: it hands out questions the user has
+    not seen yet and schedules a background refill (at background LLM
+    priority) whenever a topic drops below the low watermark.
+
+    `produce(topic)` generates a batch of questions, or an empty list on
+    failure (the refill then stops until the next draw).
+    """
+    def __init__(self, produce: Callable[[str], Awaitable[List[BankQuestion]]],
+                 target: int = AI_QUESTION_POOL_TARGET, low_watermark: int = AI_QUESTION_POOL_LOW_WATERMARK,
+                 max_serves: int = AI_QUESTION_MAX_SERVES):
+        self.produce = produce
+        self.target = target
+        self.low_watermark = low_watermark
+        self.max_serves = max_serves
+        # topic -> fingerprint -> [question, serves]
+        self._live: Dict[str, "OrderedDict[str, List]"] = {}
+        self._recent: Dict[str, Deque[str]] = {}
+        self._recent_set: Dict[str, Set[str]] = {}
+        self._refilling: Dict[str, asyncio.Task] = {}
+        self._excluded: Dict[str, Set[str]] = {}
+
+    def size(self, topic: str) -> int:
+        return len(self._live.get(topic, ()))
+
+    def exclude(self, topic: str, texts: Iterable[str]):
+        """Never pool questions matching these texts (e.g. the topic's bank questions)"""
+        self._excluded[topic] = {fingerprint(t) for t in texts}
+
+    def add(self, topic: str, question: BankQuestion) -> bool:
+        """Pool a generated question unless it duplicates a recent or excluded one"""
+        fp = fingerprint(question.question)
+        live = self._topic(topic)
+        recent, recent_set = self._recent[topic], self._recent_set[topic]
+        if fp in recent_set or fp in self._excluded.get(topic, ()):
+            metrics.inc("ai_question_pool_rejected_total", labels={"topic": topic})
+            return False
+        live[fp] = [question._replace(id=next(_ids)), 0]
+        recent.append(fp)
+        recent_set.add(fp)
+        while len(recent) > AI_QUESTION_RECENT:
+            recent_set.discard(recent.popleft())
+        return True
+
+    async def take(self, topic: str, count: int, userId: Optional[str] = None) -> List[BankQuestion]:
+        """Up to `count` pooled questions this user has not seen (never waits on generation)"""
+        seen = await self._seen(userId, topic) if userId else set()
+        live = self._topic(topic)
+        fresh = [fp for fp in live if fp not in seen]
+        picked = random.sample(fresh, min(count, len(fresh)))
+
+        questions = []
+        for fp in picked:
+            entry = live[fp]
+            questions.append(entry[0])
+            entry[1] += 1
+            if entry[1] >= self.max_serves:
+                del live[fp]
+
+        if userId and picked:
+            await self._remember(userId, topic, picked)
+        outcome = "full" if len(questions) == count else "partial" if questions else "empty"
+        metrics.inc("ai_question_pool_requests_total", labels={"topic": topic, "outcome": outcome})
+        # The user is about to run out of unseen questions: generate more for them too
+        self.ensure(topic, force=len(fresh) - len(picked) < count)
+        return questions
+
+    def ensure(self, topic: str, force: bool = False):
+        """Schedule a background refill if topic is at or below the low watermark"""
+        if topic in self._refilling or (self.size(topic) > self.low_watermark and not force):
+            return
+        with llm_priority("background"):
+            self._refilling[topic] = spawn(self._refill(topic, force), name=f"ai-questions-refill-{topic}")
+
+    def warm(self, topics: Iterable[str]):
+        for topic in topics:
+            self.ensure(topic)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "topics": len(self._live),
+            "ready": sum(len(live) for live in self._live.values()),
+            "refilling": len(self._refilling)
+        }
+
+    def _topic(self, topic: str) -> "OrderedDict[str, List]":
+        live = self._live.get(topic)
+        if live is None:
+            live = self._live[topic] = OrderedDict()
+            self._recent[topic] = deque()
+            self._recent_set[topic] = set()
+            metrics.gauge_callback("ai_question_pool_ready", lambda: self.size(topic), labels={"topic": topic})
+        return live
+
+    async def _refill(self, topic: str, force: bool):
+        try:
+            # A forced refill adds at least one batch even when the pool is full
+            while force or self.size(topic) < self.target:
+                force = False
+                generated = await self.produce(topic)
+                added = sum(self.add(topic, q) for q in generated)
+                if not added:
+                    print(f"⚠️ AI question pool: refill for {topic} produced nothing new, will retry on next draw")
+                    break
+                live = self._live[topic]
+                # Retire the most-served questions first once over target
+                while len(live) > self.target:
+                    del live[max(live, key=lambda fp: live[fp][1])]
+        finally:
+            self._refilling.pop(topic, None)
+
+    async def _seen(self, userId: str, topic: str) -> Set[str]:
+        record = await SEEN_QUESTIONS.get(f"{userId}:{topic}")
+        return set(record["seen"]) if record else set()
+
+    async def _remember(self, userId: str, topic: str, fingerprints: List[str]):
+        key = f"{userId}:{topic}"
+
+        def mutate(record):
+            record["seen"] = (record["seen"] + fingerprints)[-AI_SEEN_MAX:]
+
+        if await SEEN_QUESTIONS.update(key, mutate) is None:
+            try:
+                await SEEN_QUESTIONS.create(key, {"seen": fingerprints[-AI_SEEN_MAX:]})
+            except SessionConflict:
+                # Created concurrently by another request: append instead
+                await SEEN_QUESTIONS.update(key, mutate)
@@ -1,6 +1,5 @@
 import os
-import time
-import requests
+import asyncio
 import uuid
 import json
 import sys
@@ -10,6 +9,8 @@ from models import ResumeResult
 from datetime import datetime
 from dotenv import load_dotenv
 from firebase_config import firestore_client
+from services import llm_client
+from services.llm_client import aget_gpt_response, GPT_FULL_MODEL
 
 # Load environment variables
 load_dotenv()
@@ -17,11 +18,13 @@ load_dotenv()
 # Azure credentials
 DOC_KEY = os.getenv("DOC_KEY")
 DOC_ENDPOINT = os.getenv("DOC_ENDPOINT")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
-GPT_FULL_MODEL = os.getenv("GPT_FULL_MODEL")
 
-def analyze_resume_content(file_data: bytes):
+# Document Intelligence polling: bounded total wait, exponential backoff between polls
+DOC_POLL_TIMEOUT = float(os.getenv("DOC_POLL_TIMEOUT", "60"))
+DOC_POLL_INITIAL_DELAY = 0.5
+DOC_POLL_MAX_DELAY = 4.0
+
+async def analyze_resume_content(file_data: bytes):
     """
     Two-step AI-powered resume analysis:
     1. Doc AI → Extract text from PDF
@@ -30,12 +33,12 @@ def analyze_resume_content(file_data: bytes):
     if not DOC_KEY or not DOC_ENDPOINT:
         return {"error": "Azure Document Intelligence credentials missing"}
     
-    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY:
+    if not llm_client.is_configured():
         return {"error": "Azure OpenAI credentials missing"}
         
     # STEP 1: Extract text from PDF using Azure Document Intelligence
     print("📄 Step 1: Extracting text from PDF using Doc AI...")
-    extracted_text = extract_text_from_pdf(file_data)
+    extracted_text = await extract_text_from_pdf(file_data)
     
     if "error" in extracted_text:
         return extracted_text
@@ -45,7 +48,7 @@ def analyze_resume_content(file_data: bytes):
     
     # STEP 2: Send extracted text to GPT-4 Full for comprehensive analysis
     print("🧠 Step 2: Analyzing with GPT-4 Full (parsing + scoring + suggestions)...")
-    analysis = analyze_with_gpt4_full(full_text)
+    analysis = await analyze_with_gpt4_full(full_text)
     
     if "error" in analysis:
         return analysis
@@ -53,41 +56,65 @@ def analyze_resume_content(file_data: bytes):
     print("✅ Analysis complete!")
     return analysis
 
-def extract_text_from_pdf(file_data: bytes):
-    """
-    Use Azure Document Intelligence to extract raw text from PDF
-    """
+async def submit_document(file_data: bytes):
+    """Submit a PDF to the Document Intelligence prebuilt-read model (202 + Operation-Location on success)"""
     submit_url = f"{DOC_ENDPOINT}/documentintelligence/documentModels/prebuilt-read:analyze?api-version=2024-02-29-preview"
     headers = {
         "Ocp-Apim-Subscription-Key": DOC_KEY,
         "Content-Type": "application/pdf"
     }
+    client = llm_client.get_async_client()
+    return await client.post(submit_url, headers=headers, content=file_data, timeout=30)
+
+async def poll_document_analysis(operation_url: str, timeout: float = DOC_POLL_TIMEOUT) -> dict:
+    """
+    Poll a Document Intelligence operation until it succeeds or fails.
+    Sleeps with exponential backoff (honouring Retry-After) and gives up after
+    `timeout` seconds, returning {"status": "timeout"}.
+    """
+    client = llm_client.get_async_client()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = DOC_POLL_INITIAL_DELAY
     
+    while True:
+        result = await client.get(operation_url, headers={"Ocp-Apim-Subscription-Key": DOC_KEY}, timeout=10)
+        data = result.json()
+        if data.get("status") in ["succeeded", "failed"]:
+            return data
+        
+        retry_after = result.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return {"status": "timeout", "lastStatus": data.get("status")}
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, DOC_POLL_MAX_DELAY)
+
+async def extract_text_from_pdf(file_data: bytes):
+    """
+    Use Azure Document Intelligence to extract raw text from PDF
+    """
     try:
-        resp = requests.post(submit_url, headers=headers, data=file_data, timeout=30)
+        resp = await submit_document(file_data)
         if resp.status_code != 202:
             return {"error": f"Document submission failed: {resp.text}"}
             
-        operation_url = resp.headers["Operation-Location"]
+        data = await poll_document_analysis(resp.headers["Operation-Location"])
+        status = data.get("status")
         
-        # Poll for completion (max 30 seconds)
-        for _ in range(30):
-            result = requests.get(operation_url, headers={"Ocp-Apim-Subscription-Key": DOC_KEY}, timeout=10)
-            data = result.json()
-            status = data.get("status")
-            
-            if status == "succeeded":
-                content = data.get("analyzeResult", {}).get("content", "")
-                return {"fullText": content}
-            if status == "failed":
-                return {"error": "Document analysis failed"}
-                
-            time.sleep(1)
+        if status == "succeeded":
+            content = data.get("analyzeResult", {}).get("content", "")
+            return {"fullText": content}
+        if status == "failed":
+            return {"error": "Document analysis failed"}
         return {"error": "Document analysis timeout"}
     except Exception as e:
         return {"error": f"Document extraction error: {str(e)}"}
 
-def analyze_with_gpt4_full(resume_text: str):
+async def analyze_with_gpt4_full(resume_text: str):
     """
     Send extracted text to GPT-4 Full for complete analysis:
     - Parse all sections (skills, experience, education, etc.)
@@ -134,27 +161,18 @@ SUGGESTION GUIDELINES:
 
 Respond ONLY with valid JSON, no markdown formatting."""
 
+    response_text = ""
     try:
-        url = f"{AZURE_OPENAI_ENDPOINT}/openai/v1/chat/completions"
-        headers = {
-            "api-key": AZURE_OPENAI_KEY,
-            "Content-Type": "application/json"
-        }
-        body = {
-            "model": GPT_FULL_MODEL,
-            "messages": [
-                {"role": "system", "content": "You are an expert ATS analyzer and HR professional. Always respond with valid JSON only."},
-                {"role": "user", "content": analysis_prompt}
-            ],
-            "temperature": 0.4,
-            "max_tokens": 2000
-        }
+        messages = [
+            {"role": "system", "content": "You are an expert ATS analyzer and HR professional. Always respond with valid JSON only."},
+            {"role": "user", "content": analysis_prompt}
+        ]
         
-        r = requests.post(url, headers=headers, json=body, timeout=60)
-        if r.status_code != 200:
-            return {"error": f"GPT-4 API error: {r.text}"}
+        resp = await aget_gpt_response(messages, model=GPT_FULL_MODEL, max_tokens=2000, temperature=0.4, priority="batch")
+        if not resp or 'choices' not in resp:
+            return {"error": "GPT-4 API error: no response from Azure OpenAI"}
         
-        response_text = r.json()["choices"][0]["message"]["content"].strip()
+        response_text = resp["choices"][0]["message"]["content"].strip()
         
         # Clean markdown if present
         if response_text.startswith("```json"):
@@ -0,0 +1,325 @@
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Optional dependency: only needed when SESSION_BACKEND=redis
+try:
+    import redis.asyncio as redis_asyncio
+    from redis.exceptions import WatchError
+except ImportError:
+    redis_asyncio = None
+    WatchError = None
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "speakup_sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "speakup:session")
+
+# (rev, data): data is None when the caller's known revision is still current
+Loaded = Tuple[int, Optional[str]]
+# (sessionId, reason) pairs removed by a sweep
+Evicted = List[Tuple[str, str]]
+
+
+class SessionConflict(Exception):
+    """A session was saved from a stale revision (someone else updated it first)"""
+    def __init__(self, sessionId: str):
+        super().__init__(f"Session {sessionId} was modified concurrently")
+        self.sessionId = sessionId
+
+
+class SessionBackend:
+    """
+    Storage for serialized sessions with a revision number per session.
+    save() only succeeds if the stored revision still equals expected_rev
+    (0 = must not exist yet) and returns the new revision. Reads and writes
+    both push the idle expiry out by ttl_seconds.
+    """
+    def __init__(self, namespace: str, ttl_seconds: float, max_sessions: int):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+
+    async def load(self, sessionId: str, known_rev: Optional[int] = None) -> Optional[Loaded]:
+        raise NotImplementedError
+
+    async def save(self, sessionId: str, data: str, expected_rev: int) -> int:
+        raise NotImplementedError
+
+    async def delete(self, sessionId: str):
+        raise NotImplementedError
+
+    async def sweep(self) -> Evicted:
+        """Remove expired (and over-capacity) sessions"""
+        return []
+
+    def take_evicted(self) -> Evicted:
+        """Sessions evicted outside a sweep (e.g. by an over-capacity save) since the last call"""
+        return []
+
+    async def stats(self) -> Tuple[int, Optional[int]]:
+        """(live session count, approximate stored bytes or None if unknown)"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(SessionBackend):
+    """Per-process backend (single worker, and the in-process stand-in for tests)"""
+    def __init__(self, namespace: str, ttl_seconds: float, max_sessions: int):
+        super().__init__(namespace, ttl_seconds, max_sessions)
+        # sessionId -> [rev, data, expires], least recently used first
+        self._rows: "OrderedDict[str, list]" = OrderedDict()
+        self._evicted: Evicted = []
+
+    def _live_row(self, sessionId: str, now: float) -> Optional[list]:
+        row = self._rows.get(sessionId)
+        if row is None or row[2] < now:
+            return None
+        row[2] = now + self.ttl_seconds
+        self._rows.move_to_end(sessionId)
+        return row
+
+    async def load(self, sessionId, known_rev=None):
+        row = self._live_row(sessionId, time.time())
+        if row is None:
+            return None
+        return row[0], (None if row[0] == known_rev else row[1])
+
+    async def save(self, sessionId, data, expected_rev):
+        now = time.time()
+        row = self._live_row(sessionId, now)
+        if (row[0] if row else 0) != expected_rev:
+            raise SessionConflict(sessionId)
+        rev = expected_rev + 1
+        self._rows[sessionId] = [rev, data, now + self.ttl_seconds]
+        self._rows.move_to_end(sessionId)
+        while len(self._rows) > self.max_sessions:
+            oldest, _ = self._rows.popitem(last=False)
+            self._evicted.append((oldest, "lru"))
+        return rev
+
+    async def delete(self, sessionId):
+        self._rows.pop(sessionId, None)
+
+    def take_evicted(self):
+        evicted, self._evicted = self._evicted, []
+        return evicted
+
+    async def sweep(self):
+        now = time.time()
+        evicted = self.take_evicted()
+        # Rows are kept in access order, so expired ones are at the front
+        for sessionId, row in list(self._rows.items()):
+            if row[2] >= now:
+                break
+            del self._rows[sessionId]
+            evicted.append((sessionId, "ttl"))
+        return evicted
+
+    async def stats(self):
+        return len(self._rows), sum(len(row[1]) for row in self._rows.values())
+
+
+class SqliteBackend(SessionBackend):
+    """
+    Single-file backend shared by every worker on one host (WAL mode).
+    Calls run in a worker thread so lock waits never block the event loop.
+    """
+    def __init__(self, namespace: str, ttl_seconds: float, max_sessions: int, path: str = SESSION_SQLITE_PATH):
+        super().__init__(namespace, ttl_seconds, max_sessions)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                rev INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (namespace, id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (namespace, expires)")
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    def _load(self, sessionId, known_rev):
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT rev, CASE WHEN rev = ? THEN NULL ELSE data END FROM sessions "
+            "WHERE namespace = ? AND id = ? AND expires >= ?",
+            (known_rev, self.namespace, sessionId, now)
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE sessions SET expires = ? WHERE namespace = ? AND id = ?",
+            (now + self.ttl_seconds, self.namespace, sessionId)
+        )
+        return row[0], row[1]
+
+    def _save(self, sessionId, data, expected_rev):
+        now = time.time()
+        expires = now + self.ttl_seconds
+        if expected_rev == 0:
+            # An expired row that has not been swept yet does not count as existing
+            self._conn.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND id = ? AND expires < ?",
+                (self.namespace, sessionId, now)
+            )
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions (namespace, id, rev, data, expires) VALUES (?, ?, 1, ?, ?)",
+                    (self.namespace, sessionId, data, expires)
+                )
+            except sqlite3.IntegrityError:
+                raise SessionConflict(sessionId)
+            return 1
+        cur = self._conn.execute(
+            "UPDATE sessions SET rev = rev + 1, data = ?, expires = ? "
+            "WHERE namespace = ? AND id = ? AND rev = ? AND expires >= ?",
+            (data, expires, self.namespace, sessionId, expected_rev, now)
+        )
+        if cur.rowcount != 1:
+            raise SessionConflict(sessionId)
+        return expected_rev + 1
+
+    def _sweep(self):
+        now = time.time()
+        evicted = [(row[0], "ttl") for row in self._conn.execute(
+            "DELETE FROM sessions WHERE namespace = ? AND expires < ? RETURNING id",
+            (self.namespace, now)
+        ).fetchall()]
+        count = self._conn.execute("SELECT COUNT(*) FROM sessions WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        if count > self.max_sessions:
+            # Expiry is last access + TTL, so the earliest expiring rows are least recently used
+            evicted += [(row[0], "lru") for row in self._conn.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND id IN ("
+                "SELECT id FROM sessions WHERE namespace = ? ORDER BY expires LIMIT ?) RETURNING id",
+                (self.namespace, self.namespace, count - self.max_sessions)
+            ).fetchall()]
+        return evicted
+
+    def _stats(self):
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+        return count, size
+
+    async def load(self, sessionId, known_rev=None):
+        return await self._run(self._load, sessionId, known_rev)
+
+    async def save(self, sessionId, data, expected_rev):
+        return await self._run(self._save, sessionId, data, expected_rev)
+
+    async def delete(self, sessionId):
+        await self._run(
+            self._conn.execute, "DELETE FROM sessions WHERE namespace = ? AND id = ?", (self.namespace, sessionId)
+        )
+
+    async def sweep(self):
+        return await self._run(self._sweep)
+
+    async def stats(self):
+        return await self._run(self._stats)
+
+    async def close(self):
+        self._conn.close()
+
+
+_redis_client = None
+
+def get_redis_client():
+    """Lazily build the client shared by every Redis-backed store"""
+    global _redis_client
+    if _redis_client is None:
+        if redis_asyncio is None:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package")
+        _redis_client = redis_asyncio.from_url(REDIS_URL)
+    return _redis_client
+
+
+class RedisBackend(SessionBackend):
+    """
+    Backend for multiple hosts, speaking the Redis protocol through a
+    redis.asyncio-compatible client (inject e.g. fakeredis for tests).
+    Each session is a hash {rev, data}; Redis expires idle keys itself and
+    the server's maxmemory policy is the capacity bound.
+    """
+    def __init__(self, namespace: str, ttl_seconds: float, max_sessions: int, client=None):
+        super().__init__(namespace, ttl_seconds, max_sessions)
+        self.client = client or get_redis_client()
+        self.ttl_ms = int(ttl_seconds * 1000)
+
+    def _key(self, sessionId: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{self.namespace}:{sessionId}"
+
+    async def load(self, sessionId, known_rev=None):
+        key = self._key(sessionId)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hget(key, "rev")
+            pipe.pexpire(key, self.ttl_ms)
+            rev, _ = await pipe.execute()
+        if rev is None:
+            return None
+        if int(rev) == known_rev:
+            return known_rev, None
+        # Changed: read revision and data together so they always match
+        rev, data = await self.client.hmget(key, "rev", "data")
+        if rev is None:
+            return None
+        return int(rev), data.decode() if isinstance(data, bytes) else data
+
+    async def save(self, sessionId, data, expected_rev):
+        key = self._key(sessionId)
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                current = await pipe.hget(key, "rev")
+                if int(current or 0) != expected_rev:
+                    raise SessionConflict(sessionId)
+                pipe.multi()
+                pipe.hset(key, mapping={"rev": expected_rev + 1, "data": data})
+                pipe.pexpire(key, self.ttl_ms)
+                await pipe.execute()
+            except WatchError:
+                raise SessionConflict(sessionId)
+        return expected_rev + 1
+
+    async def delete(self, sessionId):
+        await self.client.delete(self._key(sessionId))
+
+    async def stats(self):
+        count = 0
+        async for _ in self.client.scan_iter(match=f"{REDIS_KEY_PREFIX}:{self.namespace}:*", count=500):
+            count += 1
+        return count, None
+
+    async def close(self):
+        global _redis_client
+        if self.client is _redis_client:
+            _redis_client = None
+        await self.client.aclose()
+
+
+def create_backend(namespace: str, ttl_seconds: float, max_sessions: int) -> SessionBackend:
+    """Backend selected by SESSION_BACKEND (memory, sqlite or redis)"""
+    if SESSION_BACKEND == "sqlite":
+        return SqliteBackend(namespace, ttl_seconds, max_sessions)
+    if SESSION_BACKEND == "redis":
+        return RedisBackend(namespace, ttl_seconds, max_sessions)
+    return MemoryBackend(namespace, ttl_seconds, max_sessions)
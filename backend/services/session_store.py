@@ -0,0 +1,182 @@
+import os
+import json
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+from services import metrics
+from services.background import spawn
+from services.session_backends import Evicted, SessionBackend, SessionConflict, create_backend
+
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_UPDATE_RETRIES = 3
+
+metrics.describe("sessions_live", "Sessions held by the session backend (as of the last sweep)")
+metrics.describe("sessions_approx_bytes", "Serialized size of live sessions (as of the last sweep)")
+metrics.describe("sessions_cached", "Encoded sessions cached in this worker")
+metrics.describe("sessions_evicted_total", "Sessions evicted by idle TTL or max-size LRU")
+metrics.describe("session_conflicts_total", "Session saves rejected because of a concurrent update")
+
+# Every store, so one sweeper task can serve them all
+STORES: List["SessionStore"] = []
+_sweeper: Optional[asyncio.Task] = None
+
+
+def get_rev(session: Any) -> int:
+    if isinstance(session, dict):
+        return session.get("_rev", 0)
+    return getattr(session, "_rev", 0)
+
+def set_rev(session: Any, rev: int):
+    if isinstance(session, dict):
+        session["_rev"] = rev
+    else:
+        session._rev = rev
+
+
+class SessionStore:
+    """
+    Sessions kept in a pluggable backend (memory, SQLite or Redis, see
+    session_backends) so any worker can serve any session.
+
+    Every session carries the revision it was loaded at; save() fails with
+    SessionConflict if another request saved in between. update() reloads
+    and re-applies a mutation until it lands. get() always returns a fresh
+    copy, so concurrent requests in one worker never share a session
+    object; the encoded form is cached per worker and only re-read from the
+    backend when the revision moved.
+    `encode`/`decode` convert sessions to and from JSON-compatible data;
+    `on_evict(sessionId)` lets a service release process-local state when a
+    session is evicted (by the sweeper, or by the save that pushed it over
+    max_sessions).
+    """
+    def __init__(self, name: str, ttl_seconds: float, max_sessions: int,
+                 on_evict: Optional[Callable[[str], None]] = None,
+                 encode: Callable[[Any], Any] = None, decode: Callable[[Any], Any] = None,
+                 backend: Optional[SessionBackend] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.on_evict = on_evict
+        self.encode = encode or (lambda session: {k: v for k, v in session.items() if k != "_rev"})
+        self.decode = decode or (lambda data: data)
+        self.backend = backend or create_backend(name, ttl_seconds, max_sessions)
+        # sessionId -> (rev, encoded data)
+        self._cache: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        labels = {"store": name}
+        metrics.set_gauge("sessions_live", 0, labels)
+        metrics.set_gauge("sessions_approx_bytes", 0, labels)
+        metrics.gauge_callback("sessions_cached", lambda: len(self._cache), labels)
+        STORES.append(self)
+
+    def use_backend(self, backend: SessionBackend):
+        """Swap the backend (e.g. an in-process stand-in for tests) and drop the local cache"""
+        self.backend = backend
+        self._cache.clear()
+
+    async def get(self, sessionId: str) -> Optional[Any]:
+        """Current session (a copy owned by the caller), or None if it does not exist (or expired)"""
+        cached = self._cache.get(sessionId)
+        loaded = await self.backend.load(sessionId, cached[0] if cached is not None else None)
+        if loaded is None:
+            self._cache.pop(sessionId, None)
+            return None
+        rev, data = loaded
+        if data is None:
+            # Unchanged since we cached it (the entry may have been evicted while we awaited the backend)
+            data = cached[1]
+        session = self.decode(json.loads(data))
+        set_rev(session, rev)
+        self._remember(sessionId, rev, data)
+        return session
+
+    async def create(self, sessionId: str, session: Any):
+        set_rev(session, 0)
+        await self.save(sessionId, session)
+
+    async def save(self, sessionId: str, session: Any):
+        """Write a session loaded at revision r; raises SessionConflict if it moved past r"""
+        data = json.dumps(self.encode(session), default=str)
+        try:
+            rev = await self.backend.save(sessionId, data, get_rev(session))
+        except SessionConflict:
+            metrics.inc("session_conflicts_total", labels={"store": self.name})
+            raise
+        set_rev(session, rev)
+        self._remember(sessionId, rev, data)
+        # A save over capacity may have pushed out the least recently used session: report it now
+        evicted = self.backend.take_evicted()
+        if evicted:
+            self._release(evicted)
+
+    async def update(self, sessionId: str, mutate: Callable[[Any], Any], retries: int = SESSION_UPDATE_RETRIES) -> Optional[Any]:
+        """Apply mutate(session) to the latest revision and save it, retrying on conflicts"""
+        for attempt in range(retries + 1):
+            session = await self.get(sessionId)
+            if session is None:
+                return None
+            mutate(session)
+            try:
+                await self.save(sessionId, session)
+                return session
+            except SessionConflict:
+                if attempt == retries:
+                    raise
+                # Our cached copy is stale: force a full reload
+                self._cache.pop(sessionId, None)
+
+    async def delete(self, sessionId: str):
+        self._cache.pop(sessionId, None)
+        await self.backend.delete(sessionId)
+
+    async def sweep(self) -> int:
+        """Evict idle sessions and refresh the gauges; returns the number evicted"""
+        evicted = await self.backend.sweep()
+        self._release(evicted)
+
+        count, size = await self.backend.stats()
+        labels = {"store": self.name}
+        metrics.set_gauge("sessions_live", count, labels)
+        if size is not None:
+            metrics.set_gauge("sessions_approx_bytes", size, labels)
+        return len(evicted)
+
+    def _release(self, evicted: Evicted):
+        """Count evicted sessions and let the service drop its process-local state for them"""
+        for sessionId, reason in evicted:
+            self._cache.pop(sessionId, None)
+            metrics.inc("sessions_evicted_total", labels={"store": self.name, "reason": reason})
+            if self.on_evict:
+                try:
+                    self.on_evict(sessionId)
+                except Exception as e:
+                    print(f"⚠️ {self.name}: eviction hook failed for {sessionId}: {e}")
+
+    def _remember(self, sessionId: str, rev: int, data: str):
+        self._cache[sessionId] = (rev, data)
+        self._cache.move_to_end(sessionId)
+        while len(self._cache) > self.max_sessions:
+            self._cache.popitem(last=False)
+
+
+async def _sweep_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        for store in list(STORES):
+            try:
+                evicted = await store.sweep()
+            except Exception as e:
+                print(f"⚠️ {store.name}: session sweep failed: {e}")
+                continue
+            if evicted:
+                print(f"🧹 {store.name}: evicted {evicted} idle session(s)")
+
+def start_sweeper(interval: float = SESSION_SWEEP_INTERVAL):
+    """Start the background sweeper for all stores (called on application startup)"""
+    global _sweeper
+    if _sweeper is None or _sweeper.done():
+        _sweeper = spawn(_sweep_forever(interval), name="session-sweeper")
+
+async def close_all():
+    """Release backend connections (called on application shutdown)"""
+    for store in STORES:
+        await store.backend.close()
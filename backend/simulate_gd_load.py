@@ -0,0 +1,312 @@
+"""
+GD Load Simulator - How many concurrent GD rooms can one worker hold?
+
+Starts a local stand-in for the Azure chat-completions endpoint (replies are
+synthetic, latency follows a log-normal distribution), then drives N
+synthetic users concurrently through the real GD service:
+
+    start_gd_session -> start -> process_message x turns
+    (speak / silence_break / pause+resume) -> generate_gd_end_summary
+
+and reports per-turn latency percentiles, LLM calls per turn (by kind), the
+handoff-LLM fallback rate and memory per live session.
+
+Usage:
+    python simulate_gd_load.py [--users 50] [--turns 8] [--think 1.0]
+                               [--latency-median 0.6] [--latency-sigma 0.4]
+                               [--tracemalloc] [--persist]
+
+Runs from the backend directory with the usual firebase-service-account.json.
+Results are not written to Firestore unless --persist is given.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter
+
+sys.path.append(os.path.dirname(__file__))
+
+# ---------- FAKE AZURE OPENAI ----------
+
+CLAIMS = [
+    "the long-term costs matter more than the short-term gains",
+    "regulation has to keep pace with the technology",
+    "the data from other countries points the other way",
+    "we should look at who actually benefits here",
+    "education is the real lever in this debate",
+    "the ethical questions cannot be an afterthought",
+]
+
+class FakeAzure:
+    """Synthetic chat completions with configurable latency, counting calls by kind"""
+    def __init__(self, latency_median: float, latency_sigma: float, seed: int):
+        self.latency_mu = math.log(max(latency_median, 1e-3))
+        self.latency_sigma = latency_sigma
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+
+    def latency(self) -> float:
+        return self.rng.lognormvariate(self.latency_mu, self.latency_sigma)
+
+    def sentence(self, target: str) -> str:
+        text = f"I think {self.rng.choice(CLAIMS)}."
+        roll = self.rng.random()
+        if target in ("none", ""):
+            return text
+        name = target.capitalize()
+        if roll < 0.6:
+            return f"{text} {name}, what do you think?"
+        if roll < 0.8:
+            return f"{text} I'd like to hear from {name} on this."
+        # Mentions that need the classifier (and sometimes the LLM) to decide
+        return f"As {name} said, {text[2:]} Maybe {name} sees it differently"
+
+    def reply(self, body: dict):
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        last = messages[-1]["content"] if messages else ""
+
+        if '"nextSpeaker"' in system:
+            options = re.search(r"<one of: ([^>]*)>", system)
+            target = self.rng.choice(options.group(1).split(", ")) if options else "none"
+            return "turn", json.dumps({"message": self.sentence(target), "nextSpeaker": target})
+        if "GD Monitor Bot" in last:
+            names = re.findall(r'- "(\w+)" if addressing', last)
+            return "handoff", self.rng.choice(names + ["none"])
+        if "running summary" in system:
+            return "summary", "The group weighed costs against benefits; the User argued for education and regulation."
+        if "group discussion evaluator" in system:
+            scores = {k: self.rng.randint(55, 90) for k in (
+                "verbalAbility", "confidence", "interactivity", "argumentQuality",
+                "topicRelevance", "leadership", "overallScore")}
+            scores.update(feedback="Clear and confident.", strengths=["Structure"], improvements=["Use examples"])
+            return "scoring", json.dumps(scores)
+        return "reply", self.sentence(self.rng.choice(["user", "alex", "sarah", "mike", "none"]))
+
+    def build_app(self):
+        from fastapi import FastAPI, Request, Response
+        from fastapi.responses import StreamingResponse
+        from starlette.requests import ClientDisconnect
+
+        app = FastAPI()
+
+        @app.post("/openai/v1/chat/completions")
+        async def chat(request: Request):
+            try:
+                body = await request.json()
+            except ClientDisconnect:
+                # The simulator cancelled the call (e.g. a discarded speculation at shutdown)
+                return Response(status_code=499)
+            kind, content = self.reply(body)
+            self.calls[kind] += 1
+            delay = self.latency()
+            usage = {"prompt_tokens": sum(len(m["content"]) for m in body["messages"]) // 4,
+                     "completion_tokens": len(content) // 4}
+            if body.get("stream"):
+                async def chunks():
+                    pieces = [content[i:i + 12] for i in range(0, len(content), 12)] or [""]
+                    for piece in pieces:
+                        await asyncio.sleep(delay / len(pieces))
+                        yield "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}) + "\n\n"
+                    yield "data: [DONE]\n\n"
+                return StreamingResponse(chunks(), media_type="text/event-stream")
+            await asyncio.sleep(delay)
+            return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+
+        return app
+
+def serve_fake(fake: FakeAzure, port: int):
+    """Run the fake endpoint on its own event loop in a daemon thread"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(fake.build_app(), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+# ---------- SYNTHETIC PARTICIPANTS ----------
+
+USER_LINES = [
+    "I believe {claim}.",
+    "{name}, I disagree: {claim}.",
+    "Building on that point, {claim}. What do you think, {name}?",
+    "Honestly I am not sure, but {claim}.",
+    "I agree with {name} that {claim}.",
+    "Maybe {name} has seen this too, since {claim}",
+]
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.turns = 0
+        self.errors = Counter()
+
+    def record(self, action: str, seconds: float):
+        self.latencies.setdefault(action, []).append(seconds)
+        if action in ("speak", "silence_break"):
+            self.turns += 1
+
+async def timed(stats: Stats, action: str, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    except Exception as e:
+        stats.errors[f"{action}: {type(e).__name__}"] += 1
+        return None
+    finally:
+        stats.record(action, time.perf_counter() - start)
+
+async def run_user(gd_service, index: int, args, stats: Stats, rng: random.Random,
+                   turns_done: asyncio.Event, remaining: list):
+    userId = f"sim-user-{index}"
+    started = await timed(stats, "start_session", gd_service.start_gd_session(userId, rng.choice(args.topics), "medium"))
+    if not started:
+        return
+    sessionId = started["sessionId"]
+    await timed(stats, "start", gd_service.process_message(sessionId, userId, "", "start"))
+
+    for _ in range(args.turns):
+        await asyncio.sleep(rng.expovariate(1 / args.think) if args.think > 0 else 0)
+        roll = rng.random()
+        if roll < 0.7:
+            line = rng.choice(USER_LINES).format(claim=rng.choice(CLAIMS), name=rng.choice(["Alex", "Sarah", "Mike"]))
+            await timed(stats, "speak", gd_service.process_message(sessionId, userId, line, "speak"))
+        elif roll < 0.9:
+            await timed(stats, "silence_break", gd_service.process_message(sessionId, userId, "", "silence_break"))
+        else:
+            await timed(stats, "pause", gd_service.process_message(sessionId, userId, "", "pause"))
+            await asyncio.sleep(rng.uniform(0.2, 1.0))
+            await timed(stats, "resume", gd_service.process_message(sessionId, userId, "", "resume"))
+
+    # Every room stays open until all have finished talking, so memory is measured at peak
+    remaining[0] -= 1
+    if remaining[0] == 0:
+        turns_done.set()
+    await turns_done.wait()
+    await asyncio.sleep(rng.uniform(0, 0.5))
+    await timed(stats, "end", gd_service.generate_gd_end_summary(sessionId, userId, []))
+
+# ---------- REPORT ----------
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+def rss_kib() -> int:
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return 0
+
+async def simulate(args):
+    fake = FakeAzure(args.latency_median, args.latency_sigma, args.seed)
+    server = serve_fake(fake, args.port)
+
+    os.environ.update(
+        AZURE_OPENAI_ENDPOINT=f"http://127.0.0.1:{args.port}",
+        AZURE_OPENAI_KEY="simulated",
+        GPT_MINI_MODEL="sim-mini",
+        GPT_FULL_MODEL="sim-full",
+    )
+    if args.tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+
+    from services import gd_service, metrics, llm_client, background
+    if not args.persist:
+        gd_service.save_result = lambda result: None
+
+    rng = random.Random(args.seed)
+    stats = Stats()
+    turns_done = asyncio.Event()
+    remaining = [args.users]
+
+    rss_before = rss_kib()
+    heap_before = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+    print(f"🚀 Simulating {args.users} GD rooms x {args.turns} user actions "
+          f"(LLM latency median {args.latency_median}s, sigma {args.latency_sigma})")
+    wall = time.perf_counter()
+
+    users = [asyncio.create_task(run_user(gd_service, i, args, stats, rng, turns_done, remaining))
+             for i in range(args.users)]
+    await turns_done.wait()
+
+    live, stored_bytes = await gd_service.GD_SESSIONS.backend.stats()
+    heap_peak = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+    rss_peak = rss_kib()
+
+    await asyncio.gather(*users)
+    wall = time.perf_counter() - wall
+    await background.cancel_all()
+    await llm_client.aclose()
+    server.should_exit = True
+
+    # ---- report ----
+    print(f"\n📊 Done in {wall:.1f}s, {stats.turns} bot-producing turns")
+    print(f"{'action':<14}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for action, values in stats.latencies.items():
+        print(f"{action:<14}{len(values):>7}{percentile(values, 50):>8.2f}s{percentile(values, 95):>8.2f}s{percentile(values, 99):>8.2f}s")
+
+    total_calls = sum(fake.calls.values())
+    turn_calls = total_calls - fake.calls["scoring"] - fake.calls["summary"]
+    print(f"\n🤖 LLM calls: {total_calls} total, {turn_calls / max(stats.turns, 1):.2f} per turn "
+          f"(turn-path calls incl. speculation and openings)")
+    for kind, count in fake.calls.most_common():
+        print(f"   {kind:<10}{count:>7}")
+
+    decisions = {source: metrics.get_value("gd_handoff_decisions_total", {"source": source})
+                 for source in ("pattern", "classifier", "fallback_regex", "none", "llm")}
+    decided = sum(decisions.values())
+    print(f"\n🔀 Handoff decisions: {int(decided)}, LLM fallback rate {decisions['llm'] / max(decided, 1):.1%} "
+          + ", ".join(f"{k}={int(v)}" for k, v in decisions.items()))
+    spec_hits = metrics.get_value("gd_speculations_total", {"outcome": "hit"})
+    spec_misses = metrics.get_value("gd_speculations_total", {"outcome": "miss"})
+    spec_skipped = metrics.get_value("gd_speculations_total", {"outcome": "skipped"})
+    print(f"🔮 Speculative replies: {int(spec_hits)} hit, {int(spec_misses)} miss, "
+          f"{int(spec_skipped)} skipped before generating")
+
+    print(f"\n💾 Memory at peak ({live} live sessions):")
+    if stored_bytes is not None:
+        print(f"   serialized session  {stored_bytes / max(live, 1) / 1024:8.1f} KiB/session")
+    if args.tracemalloc:
+        print(f"   python heap growth  {(heap_peak - heap_before) / max(args.users, 1) / 1024:8.1f} KiB/session")
+    if rss_peak:
+        print(f"   max RSS growth      {(rss_peak - rss_before) / max(args.users, 1):8.1f} KiB/session")
+
+    if stats.errors:
+        print("\n❌ Errors:")
+        for error, count in stats.errors.most_common():
+            print(f"   {error}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the GD service against a fake LLM endpoint")
+    parser.add_argument("--users", type=int, default=50, help="concurrent synthetic participants (one room each)")
+    parser.add_argument("--turns", type=int, default=8, help="user actions per room")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a user's actions")
+    parser.add_argument("--latency-median", type=float, default=0.6, help="median fake LLM latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="log-normal sigma of the fake LLM latency")
+    parser.add_argument("--topics", nargs="+", default=["Impact of AI on Job Security", "Social Media and Mental Health"])
+    parser.add_argument("--port", type=int, default=8799, help="port for the fake Azure endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tracemalloc", action="store_true", help="measure Python heap per session (slower)")
+    parser.add_argument("--persist", action="store_true", help="write results to Firestore")
+    args = parser.parse_args()
+    asyncio.run(simulate(args))
+
+
+if __name__ == "__main__":
+    main()
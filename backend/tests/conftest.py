@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the backend packages (services, models) the way main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
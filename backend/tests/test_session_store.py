@@ -0,0 +1,129 @@
+import json
+import asyncio
+import itertools
+import pytest
+from services import metrics, session_backends
+from services.session_backends import MemoryBackend, SessionConflict
+from services.session_store import SessionStore
+
+_names = itertools.count()
+
+
+def make_store(max_sessions=10, ttl_seconds=3600, backend=None, on_evict=None):
+    name = f"test-{next(_names)}"
+    store = SessionStore(name, ttl_seconds, max_sessions, on_evict=on_evict)
+    store.use_backend(backend or MemoryBackend(name, ttl_seconds, max_sessions))
+    return store
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class InterleavingBackend(MemoryBackend):
+    """Lets another writer's save land right before each of the next `writes` saves"""
+    def __init__(self, *args, writes=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = writes
+
+    async def save(self, sessionId, data, expected_rev):
+        if self.writes:
+            self.writes -= 1
+            rev, stored = await self.load(sessionId)
+            other = json.loads(stored)
+            other["other"] = other.get("other", 0) + 1
+            await super().save(sessionId, json.dumps(other), rev)
+        return await super().save(sessionId, data, expected_rev)
+
+
+def test_get_returns_independent_copies():
+    async def scenario():
+        store = make_store()
+        await store.create("s", {"count": 0})
+        first, second = await store.get("s"), await store.get("s")
+        first["count"] = 5
+        assert second["count"] == 0
+        assert (await store.get("s"))["count"] == 0
+    run(scenario())
+
+def test_stale_save_raises_conflict():
+    async def scenario():
+        store = make_store()
+        await store.create("s", {"count": 0})
+        first, second = await store.get("s"), await store.get("s")
+        first["count"] = 1
+        await store.save("s", first)
+        second["count"] = 2
+        before = metrics.get_value("session_conflicts_total", {"store": store.name})
+        with pytest.raises(SessionConflict):
+            await store.save("s", second)
+        assert metrics.get_value("session_conflicts_total", {"store": store.name}) == before + 1
+        assert (await store.get("s"))["count"] == 1
+    run(scenario())
+
+def test_create_existing_session_conflicts():
+    async def scenario():
+        store = make_store()
+        await store.create("s", {"count": 0})
+        with pytest.raises(SessionConflict):
+            await store.create("s", {"count": 1})
+    run(scenario())
+
+def test_update_reapplies_mutation_after_conflict():
+    async def scenario():
+        backend = InterleavingBackend("interleaving", 3600, 10, writes=0)
+        store = make_store(backend=backend)
+        await store.create("s", {"count": 0})
+        backend.writes = 2
+        calls = []
+        def bump(session):
+            calls.append(session.get("other", 0))
+            session["count"] += 1
+        session = await store.update("s", bump)
+        assert calls == [0, 1, 2]
+        assert session["count"] == 1 and session["other"] == 2
+        assert (await store.get("s"))["count"] == 1
+    run(scenario())
+
+def test_update_gives_up_after_retries():
+    async def scenario():
+        backend = InterleavingBackend("interleaving", 3600, 10, writes=0)
+        store = make_store(backend=backend)
+        await store.create("s", {"count": 0})
+        backend.writes = 10
+        with pytest.raises(SessionConflict):
+            await store.update("s", lambda session: None, retries=2)
+    run(scenario())
+
+def test_update_missing_session_returns_none():
+    async def scenario():
+        store = make_store()
+        assert await store.update("missing", lambda session: None) is None
+    run(scenario())
+
+def test_lru_eviction_is_reported_on_save():
+    async def scenario():
+        evicted = []
+        store = make_store(max_sessions=2, on_evict=evicted.append)
+        for i in range(3):
+            await store.create(f"s{i}", {"i": i})
+        assert evicted == ["s0"]
+        assert metrics.get_value("sessions_evicted_total", {"store": store.name, "reason": "lru"}) == 1
+        assert await store.get("s0") is None
+        assert await store.sweep() == 0
+    run(scenario())
+
+def test_sweep_evicts_idle_sessions(monkeypatch):
+    async def scenario():
+        evicted = []
+        store = make_store(ttl_seconds=60, on_evict=evicted.append)
+        await store.create("idle", {})
+        now = session_backends.time.time()
+        monkeypatch.setattr(session_backends.time, "time", lambda: now + 30)
+        await store.create("fresh", {})
+        monkeypatch.setattr(session_backends.time, "time", lambda: now + 61)
+        assert await store.sweep() == 1
+        assert evicted == ["idle"]
+        assert metrics.get_value("sessions_evicted_total", {"store": store.name, "reason": "ttl"}) == 1
+        assert await store.get("idle") is None
+        assert await store.get("fresh") is not None
+    run(scenario())
@@ -0,0 +1,125 @@
+"""
+Handoff Model Trainer - Fit the GD handoff classifier offline
+
+Builds a labelled set of group-discussion sentences from templates (one
+label per participant-name mention: is this person being handed the
+floor?), fits a logistic regression on the features from
+services/handoff.py and writes the weights to data/handoff_model.json.
+
+Usage:
+    python train_handoff_model.py [--epochs 400] [--seed 7]
+
+Rerun it whenever the feature list in services/handoff.py changes.
+"""
+
+import os
+import sys
+import json
+import math
+import re
+import random
+import argparse
+
+sys.path.append(os.path.dirname(__file__))
+from services.handoff import FEATURES, HANDOFF_MODEL_PATH, mention_features, normalize_message, score
+
+NAMES = ["user", "alex", "sarah", "mike", "priya", "john", "emma", "raj"]
+
+# {a} = addressee (positive mention), {o} = someone merely mentioned (negative mention)
+TEMPLATES = [
+    "{a}, what do you think about this?",
+    "What is your take on this, {a}?",
+    "I would like to hear from {a} on this point.",
+    "I'd like to ask {a} whether this scales to rural areas.",
+    "{a} could you share your view on the costs?",
+    "Over to you, {a}.",
+    "Let me turn to {a} for a different perspective.",
+    "How do you see it, {a}?",
+    "{a}, do you agree with that?",
+    "That is a fair concern. {a}, how would you address it?",
+    "I agree with {o}, but {a}, what is your opinion?",
+    "As {o} said, regulation matters. What do you think {a}?",
+    "{o} made a good point. {a}, would you add anything?",
+    "Building on what {o} mentioned, I want to ask {a} about funding.",
+    "I'd love to hear {a}'s thoughts on this.",
+    "Maybe {a} can tell us how this works in practice?",
+    "I agree with {o} on this point.",
+    "As {o} said, the impact on jobs is real.",
+    "{o} made a strong argument earlier.",
+    "Building on what {o} mentioned, education is key.",
+    "I disagree with {o} here because the data says otherwise.",
+    "Like {o}, I believe that privacy comes first.",
+    "According to {o}, the costs are too high.",
+    "{o}'s point about inequality is important.",
+    "{o} and I both think this needs more research.",
+    "I think {o} is right about the timeline.",
+    "Unlike {o}, I see more benefits than risks.",
+    "Going back to {o}'s example, it shows the problem clearly.",
+    "{o} raised the issue of cost, which I want to expand on.",
+    "I want to add to what {o} was saying about ethics.",
+]
+
+
+def build_dataset(rng: random.Random, samples_per_template: int = 12):
+    X, y = [], []
+    for template in TEMPLATES:
+        for _ in range(samples_per_template):
+            a, o = rng.sample(NAMES, 2)
+            text = template.format(a=a, o=o)
+            if rng.random() < 0.3:
+                text = text.rstrip("?.") + rng.choice(["", ".", "?"])
+            # Features must see the text exactly as HandoffDetector.detect() does
+            text = normalize_message(text)
+            for name, label in ((a, 1), (o, 0)):
+                if "{" + ("a" if label else "o") + "}" not in template:
+                    continue
+                mention = re.search(rf"\b{re.escape(name)}\b", text)
+                X.append(mention_features(text, mention.start(), mention.end()))
+                y.append(label)
+    return X, y
+
+
+def train(X, y, epochs: int, lr: float = 0.5, l2: float = 0.001):
+    weights = [0.0] * len(FEATURES)
+    n = len(X)
+    for _ in range(epochs):
+        grad = [0.0] * len(weights)
+        for features, label in zip(X, y):
+            err = score(features, weights) - label
+            for j, f in enumerate(features):
+                grad[j] += err * f
+        weights = [w - lr * (g / n + l2 * w) for w, g in zip(weights, grad)]
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the GD handoff classifier")
+    parser.add_argument("--epochs", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    X, y = build_dataset(rng)
+    order = list(range(len(X)))
+    rng.shuffle(order)
+    split = int(len(order) * 0.8)
+    train_idx, test_idx = order[:split], order[split:]
+
+    weights = train([X[i] for i in train_idx], [y[i] for i in train_idx], args.epochs)
+    accuracy = sum((score(X[i], weights) >= 0.5) == bool(y[i]) for i in test_idx) / max(len(test_idx), 1)
+    print(f"📊 Trained on {len(train_idx)} mentions, held-out accuracy {accuracy:.1%}")
+
+    model = {
+        "features": FEATURES,
+        "weights": [round(w, 4) for w in weights],
+        "heldOutAccuracy": round(accuracy, 4),
+        "seed": args.seed,
+        "epochs": args.epochs
+    }
+    with open(HANDOFF_MODEL_PATH, "w", encoding="utf-8") as f:
+        json.dump(model, f, indent=2)
+    print(f"✅ Wrote {os.path.normpath(HANDOFF_MODEL_PATH)}")
+
+
+if __name__ == "__main__":
+    main()